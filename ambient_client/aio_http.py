@@ -0,0 +1,222 @@
+"""Minimal asyncio HTTP/1.1 client for streaming POST requests."""
+import asyncio
+import socket
+import ssl
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+_MAX_HEADER_LINE = 65536
+
+
+class AsyncRequestError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncResponse:
+    def __init__(
+        self,
+        url: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        status_code: int,
+        reason: str,
+        headers: Dict[str, str],
+        read_timeout: Optional[float],
+        timing: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.url = url
+        # perf_counter marks: dns_started, resolved, connected, tls_done (HTTPS), request_sent.
+        self.timing = timing or {}
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+        self._read_timeout = read_timeout
+
+    async def _read(self, coro):
+        try:
+            return await asyncio.wait_for(coro, timeout=self._read_timeout)
+        except asyncio.TimeoutError as exc:
+            raise AsyncRequestError(f"Read timed out. (read timeout={self._read_timeout})") from exc
+        except asyncio.IncompleteReadError as exc:
+            raise AsyncRequestError("Connection closed mid-response.") from exc
+        except OSError as exc:
+            raise AsyncRequestError(f"Connection error: {exc}") from exc
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        transfer_encoding = self.headers.get("transfer-encoding", "").lower()
+        if "chunked" in transfer_encoding:
+            while True:
+                size_line = await self._read(self._reader.readline())
+                if not size_line:
+                    raise AsyncRequestError("Connection closed mid-response.")
+                try:
+                    size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                except ValueError as exc:
+                    raise AsyncRequestError("Invalid chunked encoding.") from exc
+                if size == 0:
+                    break
+                chunk = await self._read(self._reader.readexactly(size))
+                await self._read(self._reader.readexactly(2))
+                yield chunk
+            return
+        length = self.headers.get("content-length")
+        if length is not None:
+            try:
+                remaining = int(length)
+            except ValueError as exc:
+                raise AsyncRequestError(f"Invalid Content-Length: {length!r}") from exc
+            if remaining < 0:
+                raise AsyncRequestError(f"Invalid Content-Length: {length!r}")
+            while remaining > 0:
+                chunk = await self._read(self._reader.read(min(remaining, 65536)))
+                if not chunk:
+                    raise AsyncRequestError("Connection closed mid-response.")
+                remaining -= len(chunk)
+                yield chunk
+            return
+        while True:
+            chunk = await self._read(self._reader.read(65536))
+            if not chunk:
+                return
+            yield chunk
+
+    async def read(self) -> bytes:
+        parts = [chunk async for chunk in self.iter_chunks()]
+        return b"".join(parts)
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 600:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise AsyncRequestError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                status_code=self.status_code,
+            )
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+async def _connect(
+    host: str,
+    port: int,
+    use_tls: bool,
+    timing: Dict[str, float],
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    # Resolve, connect and handshake as separate steps so each can be timed.
+    loop = asyncio.get_running_loop()
+    timing["dns_started"] = time.perf_counter()
+    infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    timing["resolved"] = time.perf_counter()
+    sock: Optional[socket.socket] = None
+    for index, (family, kind, proto, _, address) in enumerate(infos):
+        sock = socket.socket(family, kind, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+            break
+        except OSError:
+            sock.close()
+            if index == len(infos) - 1:
+                raise
+        except BaseException:
+            # Cancelled (e.g. by the connect timeout); do not try the next address.
+            sock.close()
+            raise
+    timing["connected"] = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection(
+            sock=sock,
+            ssl=ssl.create_default_context() if use_tls else None,
+            server_hostname=host if use_tls else None,
+            limit=_MAX_HEADER_LINE,
+        )
+    except BaseException:
+        sock.close()
+        raise
+    if use_tls:
+        timing["tls_done"] = time.perf_counter()
+    return reader, writer
+
+
+async def open_stream(
+    url: str,
+    headers: Dict[str, str],
+    body: bytes,
+    timeout: Optional[float] = 60,
+) -> AsyncResponse:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise AsyncRequestError(f"Invalid URL '{url}'")
+    use_tls = parts.scheme == "https"
+    port = parts.port or (443 if use_tls else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+
+    timing: Dict[str, float] = {}
+    try:
+        reader, writer = await asyncio.wait_for(
+            _connect(parts.hostname, port, use_tls, timing),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError as exc:
+        raise AsyncRequestError(f"Connection to {parts.hostname} timed out.") from exc
+    except OSError as exc:
+        raise AsyncRequestError(f"Connection error: {exc}") from exc
+
+    request_headers = {
+        "Host": host_header,
+        "Content-Length": str(len(body)),
+        "Connection": "close",
+        "User-Agent": "ambient-client",
+    }
+    request_headers.update(headers)
+    head = [f"POST {target} HTTP/1.1"]
+    head.extend(f"{key}: {value}" for key, value in request_headers.items())
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    try:
+        await asyncio.wait_for(writer.drain(), timeout=timeout)
+        timing["request_sent"] = time.perf_counter()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        version, _, rest = status_line.decode("latin-1").strip().partition(" ")
+        code, _, reason = rest.partition(" ")
+        if not version.startswith("HTTP/") or not code.isdigit():
+            raise AsyncRequestError(f"Invalid HTTP status line from {parts.hostname}.")
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+    except asyncio.TimeoutError as exc:
+        writer.close()
+        raise AsyncRequestError(f"Read timed out. (read timeout={timeout})") from exc
+    except (OSError, ValueError) as exc:
+        writer.close()
+        raise AsyncRequestError(f"Connection error: {exc}") from exc
+    except AsyncRequestError:
+        writer.close()
+        raise
+
+    return AsyncResponse(
+        url,
+        reader,
+        writer,
+        int(code),
+        reason,
+        response_headers,
+        timeout,
+        timing,
+    )
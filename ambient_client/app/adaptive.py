@@ -0,0 +1,184 @@
+"""AIMD concurrency limits per provider for the thread-pool runner."""
+from collections import deque
+from dataclasses import dataclass
+import os
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+
+from shared.stats import percentile
+
+from ..cache import CACHE_HIT
+from ..streaming import StreamResult
+from ..utils import is_enabled
+
+SIGNAL_OK = "ok"
+SIGNAL_THROTTLED = "throttled"
+SIGNAL_SERVER_ERROR = "server_error"
+SIGNAL_TTFT_INFLATION = "ttft_inflation"
+SIGNAL_TTFT_DEADLINE = "ttft_deadline"
+
+# Signals that mean the provider is past its capacity.
+OVERLOAD_SIGNALS = (SIGNAL_THROTTLED, SIGNAL_SERVER_ERROR, SIGNAL_TTFT_INFLATION, SIGNAL_TTFT_DEADLINE)
+
+# TTFTs needed before the median is trusted as a baseline.
+MIN_BASELINE_SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class AdaptiveSettings:
+    enabled: bool = False
+    initial: float = 1.0
+    backoff: float = 0.5
+    ttft_tolerance: float = 2.0
+    ttft_persistence: int = 3
+    baseline_window: int = 50
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "initial": self.initial,
+            "backoff": self.backoff,
+            "ttft_tolerance": self.ttft_tolerance,
+            "ttft_persistence": self.ttft_persistence,
+            "baseline_window": self.baseline_window,
+        }
+
+
+def _float_env(key: str, default: float, minimum: float, maximum: Optional[float] = None) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default
+    if value < minimum or (maximum is not None and value >= maximum):
+        print(f"Warning: {key}={raw} is out of range, using default.")
+        return default
+    return value
+
+
+def load_adaptive_settings() -> AdaptiveSettings:
+    if not is_enabled(os.getenv("RUN_ADAPTIVE", "0")):
+        return AdaptiveSettings()
+    return AdaptiveSettings(
+        enabled=True,
+        initial=_float_env("ADAPTIVE_INITIAL", AdaptiveSettings.initial, 1.0),
+        backoff=_float_env("ADAPTIVE_BACKOFF", AdaptiveSettings.backoff, 0.05, 1.0),
+        ttft_tolerance=_float_env("ADAPTIVE_TTFT_TOLERANCE", AdaptiveSettings.ttft_tolerance, 1.0),
+        ttft_persistence=int(
+            _float_env("ADAPTIVE_TTFT_PERSISTENCE", AdaptiveSettings.ttft_persistence, 1.0)
+        ),
+    )
+
+
+def classify_result(result: StreamResult) -> Optional[str]:
+    """Maps a finished stream to a congestion signal; None means it says nothing about load."""
+    if result.cache == CACHE_HIT:
+        return None
+    # Retried attempts count too; transport failures have no status and say nothing here.
+    statuses = [status for status in [result.status_code, *(result.retry_statuses or [])] if status is not None]
+    if 429 in statuses:
+        return SIGNAL_THROTTLED
+    if any(status >= 500 for status in statuses):
+        return SIGNAL_SERVER_ERROR
+    if result.cancel_reason == SIGNAL_TTFT_DEADLINE:
+        return SIGNAL_TTFT_DEADLINE
+    if not result.success:
+        return None
+    return SIGNAL_OK
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease cap on one provider's in-flight streams.
+
+    A healthy completion while the limit was in use raises it by ``1 / limit``
+    (about +1 per limit's worth of completions). A 429, a 5xx, a TTFT deadline
+    or ``ttft_persistence`` healthy completions in a row with TTFT above
+    ``ttft_tolerance`` times the recent median multiply it by ``backoff``. Only streams started after the last decrease can trigger the
+    next one, so a single overload episode backs off once.
+    """
+
+    def __init__(self, provider: str, settings: AdaptiveSettings, max_limit: int) -> None:
+        self.provider = provider
+        self.settings = settings
+        self.max_limit = max_limit
+        self.limit = min(float(max_limit), max(1.0, settings.initial))
+        self.in_flight = 0
+        self.history: List[Dict[str, object]] = []
+        self._epoch = 0
+        self._ttfts: Deque[float] = deque(maxlen=settings.baseline_window)
+        self._inflated = 0
+        self._cond = threading.Condition()
+        self._start = time.perf_counter()
+        self._record("initial")
+
+    def _record(self, reason: str) -> None:
+        self.history.append(
+            {
+                "t_ms": round((time.perf_counter() - self._start) * 1000, 3),
+                "limit": round(self.limit, 3),
+                "in_flight": self.in_flight,
+                "reason": reason,
+            }
+        )
+
+    def acquire(self) -> Dict[str, object]:
+        """Blocks until a slot is free; returns the ticket to pass to ``release``."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return {"epoch": self._epoch, "limit": int(self.limit), "in_flight": self.in_flight}
+
+    def release(self, ticket: Dict[str, object], result: Optional[StreamResult]) -> Optional[str]:
+        with self._cond:
+            self.in_flight -= 1
+            signal = classify_result(result) if result is not None else None
+            if signal == SIGNAL_OK:
+                signal = self._check_ttft(result.ttfb_seconds)
+            if signal in OVERLOAD_SIGNALS:
+                if ticket["epoch"] == self._epoch:
+                    self._epoch += 1
+                    self._inflated = 0
+                    self.limit = max(1.0, self.limit * self.settings.backoff)
+                    self._record(str(signal))
+            elif signal == SIGNAL_OK and int(ticket["in_flight"]) >= int(ticket["limit"]):
+                # Only grow when the limit was actually the constraint.
+                previous = int(self.limit)
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                if int(self.limit) != previous:
+                    self._record("increase")
+            self._cond.notify_all()
+            return signal
+
+    def _check_ttft(self, ttft: float) -> Optional[str]:
+        # The median absorbs lucky outliers and mixed prompt lengths; a single slow
+        # stream only counts once the inflation persists.
+        baseline = percentile(self._ttfts, 0.5) if len(self._ttfts) >= MIN_BASELINE_SAMPLES else None
+        self._ttfts.append(ttft)
+        if baseline is None or ttft <= baseline * self.settings.ttft_tolerance:
+            self._inflated = 0
+            return SIGNAL_OK
+        self._inflated += 1
+        if self._inflated < self.settings.ttft_persistence:
+            # Slow but not yet persistent: neither grow nor back off.
+            return None
+        return SIGNAL_TTFT_INFLATION
+
+    def as_record(self) -> Dict[str, object]:
+        with self._cond:
+            limits = [float(item["limit"]) for item in self.history] + [self.limit]
+            return {
+                "type": "concurrency",
+                "provider": self.provider,
+                "settings": self.settings.as_dict(),
+                "max_limit": self.max_limit,
+                "final_limit": round(self.limit, 3),
+                "min_limit_seen": round(min(limits), 3),
+                "max_limit_seen": round(max(limits), 3),
+                "decreases": sum(1 for item in self.history if item["reason"] in OVERLOAD_SIGNALS),
+                "history": list(self.history),
+            }
@@ -2,10 +2,20 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 import json
 from pathlib import Path
-from typing import Dict, List, Optional
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
 
 from ..streaming import StreamResult
 from .provider_utils import ProviderSettings
+from .workload import Workload, WorkloadPrompt
+
+
+SCHEDULE_SEQUENTIAL = "sequential"
+SCHEDULE_ROUND_ROBIN = "round_robin"
+SCHEDULE_RANDOM = "random"
+
+ALLOWED_SCHEDULES = (SCHEDULE_SEQUENTIAL, SCHEDULE_ROUND_ROBIN, SCHEDULE_RANDOM)
 
 
 @dataclass(frozen=True)
@@ -14,25 +24,38 @@ class RunSpec:
     total: int
     is_warmup: bool
     label_suffix: str
+    prompt: Optional[WorkloadPrompt] = None
 
 
 class BenchRecorder:
     def __init__(self, path: Path) -> None:
         self.path = path
+        self._lock = threading.Lock()
 
     def write(self, record: Dict[str, object]) -> None:
+        # Serialize outside the lock; the lock keeps concurrent runs' lines whole.
+        line = json.dumps(record, sort_keys=True) + "\n"
         try:
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-            with self.path.open("a", encoding="utf-8") as handle:
-                handle.write(json.dumps(record, sort_keys=True))
-                handle.write("\n")
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as handle:
+                    handle.write(line)
         except OSError as exc:
             print(f"Warning: Unable to write bench record: {exc}")
 
 
-def iter_run_specs(bench_enabled: bool, warmup: int, runs: int) -> List[RunSpec]:
+def iter_run_specs(
+    bench_enabled: bool,
+    warmup: int,
+    runs: int,
+    workload: Optional[Workload] = None,
+) -> List[RunSpec]:
     if not bench_enabled:
         return [RunSpec(index=1, total=1, is_warmup=False, label_suffix="")]
+    prompts: List[Optional[WorkloadPrompt]] = []
+    if workload is not None:
+        prompts.extend(workload.schedule(warmup, runs))
+        runs = len(prompts) - warmup
     total = warmup + runs
     specs: List[RunSpec] = []
     for idx in range(total):
@@ -42,17 +65,65 @@ def iter_run_specs(bench_enabled: bool, warmup: int, runs: int) -> List[RunSpec]
         else:
             run_number = idx - warmup + 1
             suffix = f" run {run_number}/{runs}"
+        prompt = prompts[idx] if prompts else None
+        if prompt is not None:
+            suffix += f" [{prompt.prompt_id}]"
         specs.append(
             RunSpec(
                 index=idx + 1,
                 total=total,
                 is_warmup=is_warmup,
                 label_suffix=suffix,
+                prompt=prompt,
             )
         )
     return specs
 
 
+def schedule_runs(
+    models: List[Tuple[str, str]],
+    specs: List[RunSpec],
+    order: str,
+    seed: int = 0,
+) -> List[Tuple[int, RunSpec]]:
+    """Orders the provider x model x run matrix as ``(model index, run spec)`` pairs.
+
+    ``sequential`` runs each model's warmups and runs back to back. Otherwise
+    every model's warmups run first, back to back per model, and measured runs
+    are interleaved in rounds: run 1 of every model, then run 2, and so on.
+    ``random`` shuffles the model order within each round with ``seed``, so
+    drift is spread evenly and each model's runs keep their own order.
+    """
+    if order == SCHEDULE_SEQUENTIAL:
+        return [(index, spec) for index in range(len(models)) for spec in specs]
+    warmups = [spec for spec in specs if spec.is_warmup]
+    measured = [spec for spec in specs if not spec.is_warmup]
+    schedule = [(index, spec) for index in range(len(models)) for spec in warmups]
+    rng = random.Random(seed)
+    for spec in measured:
+        indexes = list(range(len(models)))
+        if order == SCHEDULE_RANDOM:
+            rng.shuffle(indexes)
+        schedule.extend((index, spec) for index in indexes)
+    return schedule
+
+
+def schedule_meta(
+    models: List[Tuple[str, str]],
+    schedule: List[Tuple[int, RunSpec]],
+    order: str,
+    seed: int,
+) -> Dict[str, object]:
+    return {
+        "order": order,
+        "seed": seed if order == SCHEDULE_RANDOM else None,
+        "sequence": [
+            f"{models[index][0]}:{models[index][1]}#{spec.index}"
+            for index, spec in schedule
+        ],
+    }
+
+
 def build_bench_meta(
     bench_warmup: int,
     bench_runs: int,
@@ -62,6 +133,20 @@ def build_bench_meta(
     content_mode: str,
     on_error: str,
     prompt_file: Optional[str],
+    http_pool: Optional[Dict[str, object]] = None,
+    chunk_trace: Optional[Dict[str, object]] = None,
+    deadlines: Optional[Dict[str, object]] = None,
+    hedge: Optional[Dict[str, object]] = None,
+    retry: Optional[Dict[str, object]] = None,
+    response_cache: Optional[Dict[str, object]] = None,
+    concurrency: Optional[Dict[str, object]] = None,
+    load: Optional[Dict[str, object]] = None,
+    workload: Optional[Dict[str, object]] = None,
+    rate_limits: Optional[Dict[str, object]] = None,
+    route: Optional[Dict[str, object]] = None,
+    circuit_breaker: Optional[Dict[str, object]] = None,
+    schedule: Optional[Dict[str, object]] = None,
+    gateway: Optional[Dict[str, object]] = None,
 ) -> Dict[str, object]:
     return {
         "type": "meta",
@@ -76,6 +161,20 @@ def build_bench_meta(
         "request_params": request_params,
         "content_mode": content_mode,
         "on_error": on_error,
+        "http_pool": http_pool,
+        "chunk_trace": chunk_trace,
+        "deadlines": deadlines,
+        "hedge": hedge,
+        "retry": retry,
+        "response_cache": response_cache,
+        "concurrency": concurrency,
+        "load": load,
+        "workload": workload,
+        "rate_limits": rate_limits,
+        "route": route,
+        "circuit_breaker": circuit_breaker,
+        "schedule": schedule,
+        "gateway": gateway,
     }
 
 
@@ -85,7 +184,7 @@ def build_bench_record(
     prompt_sha256: str,
     run_spec: RunSpec,
 ) -> Dict[str, object]:
-    return {
+    record: Dict[str, object] = {
         "type": "run",
         "provider": settings.name,
         "model": model,
@@ -95,12 +194,17 @@ def build_bench_record(
         "run_index": run_spec.index,
         "run_total": run_spec.total,
     }
+    if run_spec.prompt is not None:
+        record["prompt_sha256"] = run_spec.prompt.prompt_sha256
+        record.update(run_spec.prompt.as_record())
+    return record
 
 
 def attach_result_metrics(
     record: Dict[str, object],
     result: StreamResult,
     content_mode: str,
+    include_chunk_trace: bool = False,
 ) -> Dict[str, object]:
     record.update(
         {
@@ -118,8 +222,27 @@ def attach_result_metrics(
             "status_code": result.status_code,
             "started_at": result.started_at,
             "content_mode": content_mode,
+            "connection_reused": result.connection_reused,
+            "output_backpressure_ms": round(result.output_backpressure_seconds * 1000, 3),
+            "output_drain_ms": round(result.output_drain_seconds * 1000, 3),
+            "cancel_reason": result.cancel_reason,
+            "failure_phase": result.failure_phase,
+            "attempts": result.attempts,
+            "backoff_ms": round(result.backoff_seconds * 1000, 3),
+            "rate_limit_wait_ms": round(result.rate_limit_wait_seconds * 1000, 3),
+            "circuit": result.circuit,
+            "short_circuited": result.short_circuited,
+            "retry_errors": result.retry_errors,
+            "retry_statuses": result.retry_statuses,
+            "cache": result.cache,
         }
     )
+    if result.phases is not None:
+        record.update(result.phases)
+    if result.chunk_trace is not None:
+        record.update(result.chunk_trace.metrics(result.usage))
+        if include_chunk_trace:
+            record["chunk_trace"] = result.chunk_trace.as_dict()
     if result.receipt_path:
         record["receipt_path"] = result.receipt_path
     return record
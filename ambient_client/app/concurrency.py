@@ -0,0 +1,142 @@
+"""Settings and per-stream output handling for the thread-pool runner."""
+from dataclasses import dataclass, field
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from ..streaming import _safe_write
+from .adaptive import AdaptiveSettings, load_adaptive_settings
+from .provider_utils import ProviderSettings
+
+OUTPUT_PREFIX = "prefix"
+OUTPUT_CAPTURE = "capture"
+
+_OUTPUT_LOCK = threading.Lock()
+
+
+def _positive_int_env(key: str) -> Optional[int]:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', ignoring.")
+        return None
+    if value < 1:
+        print(f"Warning: {key} must be >= 1, ignoring.")
+        return None
+    return value
+
+
+@dataclass(frozen=True)
+class ConcurrencySettings:
+    workers: int = 1
+    per_provider: Dict[str, int] = field(default_factory=dict)
+    output_mode: str = OUTPUT_PREFIX
+    adaptive: AdaptiveSettings = AdaptiveSettings()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def limit_for(self, provider: str) -> int:
+        return min(self.workers, self.per_provider.get(provider, self.workers))
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "workers": self.workers,
+            "per_provider": self.per_provider,
+            "output_mode": self.output_mode,
+            "adaptive": self.adaptive.as_dict() if self.adaptive.enabled else None,
+        }
+
+
+def load_concurrency_settings(providers: List[ProviderSettings]) -> ConcurrencySettings:
+    workers = _positive_int_env("RUN_CONCURRENCY") or 1
+    per_provider: Dict[str, int] = {}
+    for settings in providers:
+        limit = _positive_int_env(f"{settings.name.upper()}_CONCURRENCY")
+        if limit is not None:
+            per_provider[settings.name] = limit
+    output_mode = os.getenv("RUN_OUTPUT", "").strip().lower() or OUTPUT_PREFIX
+    if output_mode not in (OUTPUT_PREFIX, OUTPUT_CAPTURE):
+        print(f"Warning: Invalid RUN_OUTPUT='{output_mode}', using {OUTPUT_PREFIX}.")
+        output_mode = OUTPUT_PREFIX
+    adaptive = load_adaptive_settings()
+    if adaptive.enabled and workers < 2:
+        print("Warning: RUN_ADAPTIVE needs RUN_CONCURRENCY > 1; ignoring.")
+        adaptive = AdaptiveSettings()
+    return ConcurrencySettings(
+        workers=workers,
+        per_provider=per_provider,
+        output_mode=output_mode,
+        adaptive=adaptive,
+    )
+
+
+class StreamOutput:
+    """Keeps one stream's text readable while other streams write to the same terminal.
+
+    ``prefix`` writes each completed line tagged with the stream label; ``capture``
+    holds everything and writes it as one block when the stream closes.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        mode: str = OUTPUT_PREFIX,
+        write: Callable[[str], None] = _safe_write,
+        max_line_chars: int = 160,
+    ) -> None:
+        self.label = label
+        self.mode = mode
+        self._write = write
+        self._max_line_chars = max_line_chars
+        self._pending = ""
+        self._captured: List[str] = []
+
+    def __call__(self, text: str) -> None:
+        if self.mode == OUTPUT_CAPTURE:
+            self._captured.append(text)
+            return
+        self._pending += text
+        lines = self._pending.split("\n")
+        self._pending = lines.pop()
+        # Streams without newlines would otherwise stay invisible until they end.
+        while len(self._pending) >= self._max_line_chars:
+            lines.append(self._pending[: self._max_line_chars])
+            self._pending = self._pending[self._max_line_chars:]
+        if lines:
+            self._emit_lines(lines)
+
+    def log(self, message: str) -> None:
+        if self.mode == OUTPUT_CAPTURE:
+            if self._captured and not self._captured[-1].endswith("\n"):
+                self._captured.append("\n")
+            self._captured.append(f"{message}\n")
+            return
+        lines = []
+        if self._pending:
+            lines.append(self._pending)
+            self._pending = ""
+        lines.extend(message.split("\n"))
+        self._emit_lines(lines)
+
+    def close(self) -> None:
+        if self.mode == OUTPUT_CAPTURE:
+            block = "".join(self._captured)
+            if block and not block.endswith("\n"):
+                block += "\n"
+            with _OUTPUT_LOCK:
+                self._write(f"\n{self.label} stream:\n{block}")
+            return
+        if self._pending:
+            self._emit_lines([self._pending])
+            self._pending = ""
+
+    def _emit_lines(self, lines: List[str]) -> None:
+        prefix = f"[{self.label}] "
+        text = "".join(f"{prefix}{line}\n" for line in lines)
+        with _OUTPUT_LOCK:
+            self._write(text)
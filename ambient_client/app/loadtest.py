@@ -0,0 +1,230 @@
+"""Load-test mode: closed-loop virtual users or open-loop Poisson arrivals."""
+from dataclasses import dataclass, field
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from shared.stats import percentile
+
+from ..cache import CACHE_HIT
+from ..streaming import StreamResult
+
+MODE_CLOSED = "closed"
+MODE_OPEN = "open"
+
+# A closed-loop user pauses this long after a failed request, so instant
+# failures (refused connections, 401s) do not spin the event loop.
+FAILURE_PAUSE_SECONDS = 0.5
+# A level stops early once this many requests have been sent and all failed.
+ABORT_AFTER_FAILURES = 20
+
+# Sends one request described by its load info and records it; returns the result.
+Sender = Callable[[Dict[str, object]], Awaitable[StreamResult]]
+
+
+@dataclass(frozen=True)
+class LoadSettings:
+    mode: Optional[str] = None
+    levels: List[float] = field(default_factory=list)
+    duration_seconds: float = 30.0
+    max_in_flight: int = 64
+    seed: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None and bool(self.levels)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "mode": self.mode,
+            "levels": self.levels,
+            "duration_s": self.duration_seconds,
+            "max_in_flight": self.max_in_flight,
+            "seed": self.seed,
+        }
+
+
+def load_label(mode: str, level: float) -> str:
+    if mode == MODE_CLOSED:
+        return f"closed {level:g} VU"
+    return f"open {level:g} rps"
+
+
+def _float_env(key: str, default: float) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default
+    return value if value > 0 else default
+
+
+def load_load_settings() -> LoadSettings:
+    mode = os.getenv("LOAD_MODE", "").strip().lower()
+    if not mode:
+        return LoadSettings()
+    if mode not in (MODE_CLOSED, MODE_OPEN):
+        print(f"Warning: Invalid LOAD_MODE='{mode}', expected closed or open; load mode disabled.")
+        return LoadSettings()
+    default_levels = "1,2,4,8" if mode == MODE_CLOSED else "0.5,1,2,4"
+    levels: List[float] = []
+    for item in (os.getenv("LOAD_LEVELS", "").strip() or default_levels).split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            value = float(item)
+        except ValueError:
+            print(f"Warning: Invalid LOAD_LEVELS entry '{item}', skipping.")
+            continue
+        if value > 0:
+            levels.append(int(value) if mode == MODE_CLOSED else value)
+    raw_seed = os.getenv("LOAD_SEED", "").strip()
+    seed = None
+    if raw_seed:
+        try:
+            seed = int(raw_seed)
+        except ValueError:
+            print(f"Warning: Invalid LOAD_SEED='{raw_seed}', ignoring.")
+    return LoadSettings(
+        mode=mode,
+        levels=levels,
+        duration_seconds=_float_env("LOAD_DURATION_S", 30.0),
+        max_in_flight=int(_float_env("LOAD_MAX_IN_FLIGHT", 64)),
+        seed=seed,
+    )
+
+
+def _ms(values: List[float], quantile: float) -> Optional[float]:
+    value = percentile(values, quantile)
+    return None if value is None else round(value * 1000, 3)
+
+
+class _LevelStats:
+    # Only timings are kept; the sender records each full result itself.
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.ttfb_seconds: List[float] = []
+        self.ttc_seconds: List[float] = []
+        self.queue_seconds: List[float] = []
+
+    def add(self, result: StreamResult, queue_seconds: float) -> None:
+        self.requests += 1
+        self.queue_seconds.append(queue_seconds)
+        if not result.success:
+            self.errors += 1
+            return
+        if result.cache == CACHE_HIT:
+            # Replayed locally; it completes but its timing is not the provider's.
+            return
+        self.ttfb_seconds.append(result.ttfb_seconds)
+        self.ttc_seconds.append(result.ttc_seconds)
+
+    @property
+    def all_failing(self) -> bool:
+        return self.requests >= ABORT_AFTER_FAILURES and self.errors == self.requests
+
+    def summary(self, elapsed: float) -> Dict[str, object]:
+        completed = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "completed": completed,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else None,
+            "elapsed_s": round(elapsed, 3),
+            "achieved_rps": round(completed / elapsed, 4) if elapsed > 0 else None,
+            "queue_ms_p50": _ms(self.queue_seconds, 0.5),
+            "queue_ms_p90": _ms(self.queue_seconds, 0.9),
+            "ttfb_ms_p50": _ms(self.ttfb_seconds, 0.5),
+            "ttfb_ms_p90": _ms(self.ttfb_seconds, 0.9),
+            "ttc_ms_p50": _ms(self.ttc_seconds, 0.5),
+            "ttc_ms_p90": _ms(self.ttc_seconds, 0.9),
+            "aborted": self.all_failing,
+        }
+
+
+async def run_level(
+    mode: str,
+    level: float,
+    settings: LoadSettings,
+    send: Sender,
+) -> Dict[str, object]:
+    """Drives one load level for ``settings.duration_seconds`` and returns its summary.
+
+    Closed loop: ``level`` virtual users each send their next request as soon as
+    the previous one ends, or ``FAILURE_PAUSE_SECONDS`` after it fails. Open loop: requests arrive as a Poisson process at
+    ``level`` per second regardless of completions; arrivals beyond
+    ``max_in_flight`` wait, and that wait is the recorded queueing delay. Either
+    way the level stops early once its first ``ABORT_AFTER_FAILURES`` requests
+    have all failed.
+    """
+    import asyncio
+
+    stats = _LevelStats()
+    start = time.perf_counter()
+    deadline = start + settings.duration_seconds
+    counter = [0]
+
+    async def issue(scheduled_at: float, user: Optional[int]) -> StreamResult:
+        counter[0] += 1
+        index = counter[0]
+        queue_seconds = time.perf_counter() - scheduled_at
+        load: Dict[str, object] = {
+            "mode": mode,
+            "level": level,
+            "label": load_label(mode, level),
+            "request_index": index,
+            "user": user,
+            "scheduled_offset_ms": round((scheduled_at - start) * 1000, 3),
+            "queue_ms": round(queue_seconds * 1000, 3),
+        }
+        result = await send(load)
+        stats.add(result, queue_seconds)
+        return result
+
+    if mode == MODE_CLOSED:
+
+        async def user_loop(user: int) -> None:
+            while time.perf_counter() < deadline and not stats.all_failing:
+                result = await issue(time.perf_counter(), user)
+                if not result.success:
+                    await asyncio.sleep(min(FAILURE_PAUSE_SECONDS, max(0.0, deadline - time.perf_counter())))
+
+        await asyncio.gather(*(user_loop(user) for user in range(1, int(level) + 1)))
+    else:
+        rng = random.Random(settings.seed)
+        slots = asyncio.Semaphore(settings.max_in_flight)
+        tasks = []
+
+        async def arrival(scheduled_at: float) -> None:
+            async with slots:
+                await issue(scheduled_at, None)
+
+        next_at = start + rng.expovariate(level)
+        while next_at < deadline and not stats.all_failing:
+            wait = next_at - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            tasks.append(asyncio.ensure_future(arrival(next_at)))
+            next_at += rng.expovariate(level)
+        await asyncio.gather(*tasks)
+
+    elapsed = time.perf_counter() - start
+    summary = stats.summary(elapsed)
+    # A closed loop offers whatever rate its users manage to issue.
+    offered = level if mode == MODE_OPEN else stats.requests / elapsed if elapsed > 0 else None
+    summary.update(
+        {
+            "mode": mode,
+            "level": level,
+            "label": load_label(mode, level),
+            "duration_s": settings.duration_seconds,
+            "offered_rps": round(offered, 4) if offered is not None else None,
+        }
+    )
+    return summary
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import os
+from pathlib import Path
 import re
 from typing import List, Optional
 
@@ -30,6 +31,17 @@ class ProviderSettings:
         return None
 
 
+def receipt_dir_for(settings: ProviderSettings) -> Optional[Path]:
+    if settings.name != "Ambient":
+        return None
+    if not is_enabled(os.getenv("AMBIENT_RECEIPT_SAVE"), default=True):
+        return None
+    dir_value = os.getenv("AMBIENT_RECEIPT_DIR", "data").strip()
+    if not dir_value:
+        return None
+    return Path(dir_value)
+
+
 def build_chat_completions_url(explicit_url: str, base_url: str, default_url: str) -> str:
     explicit_url = explicit_url.strip()
     if explicit_url:
@@ -55,11 +67,15 @@ def parse_models(raw_models: str) -> List[str]:
     return models
 
 
-def model_flag_env_key(prefix: str, model: str) -> str:
+def model_env_key(prefix: str, model: str, suffix: str) -> str:
     token = re.sub(r"[^A-Za-z0-9]+", "_", model).strip("_").upper()
     if not token:
         token = "MODEL"
-    return f"{prefix}_MODEL_{token}_ENABLED"
+    return f"{prefix}_MODEL_{token}_{suffix}"
+
+
+def model_flag_env_key(prefix: str, model: str) -> str:
+    return model_env_key(prefix, model, "ENABLED")
 
 
 def filter_enabled_models(prefix: str, models: List[str]) -> List[str]:
@@ -0,0 +1,303 @@
+"""Latency-aware routing: each run goes to the provider/model expected to answer fastest."""
+from collections import deque
+from dataclasses import dataclass, field
+import os
+import random
+from typing import Deque, Dict, List, Optional, Tuple
+
+from shared.stats import percentile
+
+from ..cache import CACHE_HIT
+from ..streaming import StreamResult
+from ..utils import is_enabled
+from .provider_utils import ProviderSettings, model_env_key
+
+METRIC_TTFT = "ttft"
+METRIC_TTC = "ttc"
+METRIC_FIELDS = {METRIC_TTFT: "ttfb_ms", METRIC_TTC: "ttc_ms"}
+
+OBJECTIVE_LATENCY = "latency"
+OBJECTIVE_LATENCY_COST = "latency_cost"
+
+ESTIMATES = ("ewma", "p50", "p90")
+
+REASON_WARMUP = "warmup"
+REASON_UNSEEN = "unseen"
+REASON_EXPLORE = "explore"
+REASON_EXPLOIT = "exploit"
+
+# Floor on the success-rate divisor so a burst of failures cannot make a
+# candidate's score infinite and stop it from ever being retried.
+MIN_SUCCESS_RATE = 0.05
+
+
+@dataclass(frozen=True)
+class RouteCandidate:
+    settings: ProviderSettings
+    model: str
+    price: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.settings.name}:{self.model}"
+
+
+@dataclass(frozen=True)
+class RouteSettings:
+    enabled: bool = False
+    metric: str = METRIC_TTC
+    objective: str = OBJECTIVE_LATENCY
+    estimate: str = "ewma"
+    alpha: float = 0.3
+    explore: float = 0.1
+    window: int = 100
+    history: List[str] = field(default_factory=list)
+    seed: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "metric": self.metric,
+            "objective": self.objective,
+            "estimate": self.estimate,
+            "alpha": self.alpha,
+            "explore": self.explore,
+            "window": self.window,
+            "history": self.history,
+            "seed": self.seed,
+        }
+
+
+def _choice_env(key: str, allowed: Tuple[str, ...], default: str) -> str:
+    value = os.getenv(key, "").strip().lower() or default
+    if value not in allowed:
+        print(f"Warning: Invalid {key}='{value}', using {default}.")
+        return default
+    return value
+
+
+def _fraction_env(key: str, default: float, allow_zero: bool) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default
+    if not (0 <= value <= 1 if allow_zero else 0 < value <= 1):
+        print(f"Warning: {key} must be between 0 and 1, using default.")
+        return default
+    return value
+
+
+def load_route_settings() -> RouteSettings:
+    if not is_enabled(os.getenv("ROUTE_ENABLED", "0")):
+        return RouteSettings()
+    window = RouteSettings.window
+    raw_window = os.getenv("ROUTE_WINDOW", "").strip()
+    if raw_window:
+        try:
+            window = max(1, int(raw_window))
+        except ValueError:
+            print(f"Warning: Invalid ROUTE_WINDOW='{raw_window}', using default.")
+    seed = None
+    raw_seed = os.getenv("ROUTE_SEED", "").strip()
+    if raw_seed:
+        try:
+            seed = int(raw_seed)
+        except ValueError:
+            print(f"Warning: Invalid ROUTE_SEED='{raw_seed}', ignoring.")
+    return RouteSettings(
+        enabled=True,
+        metric=_choice_env("ROUTE_METRIC", (METRIC_TTFT, METRIC_TTC), RouteSettings.metric),
+        objective=_choice_env(
+            "ROUTE_OBJECTIVE", (OBJECTIVE_LATENCY, OBJECTIVE_LATENCY_COST), RouteSettings.objective
+        ),
+        estimate=_choice_env("ROUTE_ESTIMATE", ESTIMATES, RouteSettings.estimate),
+        alpha=_fraction_env("ROUTE_EWMA_ALPHA", RouteSettings.alpha, allow_zero=False),
+        explore=_fraction_env("ROUTE_EXPLORE", RouteSettings.explore, allow_zero=True),
+        window=window,
+        history=[item.strip() for item in os.getenv("ROUTE_HISTORY", "").split(",") if item.strip()],
+        seed=seed,
+    )
+
+
+def _price_env(settings: ProviderSettings, model: str) -> Optional[float]:
+    key = model_env_key(settings.name.upper(), model, "PRICE")
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', ignoring.")
+        return None
+    if value <= 0:
+        print(f"Warning: {key} must be > 0, ignoring.")
+        return None
+    return value
+
+
+def route_candidates(providers: List[ProviderSettings]) -> List[RouteCandidate]:
+    return [
+        RouteCandidate(settings, model, _price_env(settings, model))
+        for settings in providers
+        if settings.enabled and settings.validation_error() is None
+        for model in settings.models
+    ]
+
+
+class LatencyEstimate:
+    """EWMA plus a sliding window of one candidate's latencies, and an EWMA of its failure rate."""
+
+    def __init__(self, alpha: float, window: int) -> None:
+        self.alpha = alpha
+        self.ewma_ms: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.observed = 0
+        self.failures = 0
+
+    def observe(self, latency_ms: Optional[float]) -> None:
+        """Adds one run; ``None`` records a failure."""
+        self.observed += 1
+        if latency_ms is None:
+            self.failures += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            return
+        self.error_rate *= 1 - self.alpha
+        if self.ewma_ms is None:
+            self.ewma_ms = latency_ms
+        else:
+            self.ewma_ms = self.alpha * latency_ms + (1 - self.alpha) * self.ewma_ms
+        self.samples.append(latency_ms)
+
+    def expected_ms(self, estimate: str) -> Optional[float]:
+        if estimate == "ewma":
+            return self.ewma_ms
+        return percentile(list(self.samples), 0.5 if estimate == "p50" else 0.9)
+
+    def as_dict(self, estimate: str) -> Dict[str, object]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 3)
+
+        return {
+            "observed": self.observed,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 4),
+            "ewma_ms": rounded(self.ewma_ms),
+            "p50_ms": rounded(percentile(list(self.samples), 0.5)),
+            "p90_ms": rounded(percentile(list(self.samples), 0.9)),
+            "expected_ms": rounded(self.expected_ms(estimate)),
+        }
+
+
+class Router:
+    """Epsilon-greedy choice over candidates ranked by expected latency.
+
+    Candidates with no observations are tried first. After that, with
+    probability ``explore`` a random candidate is picked so stale estimates get
+    refreshed; otherwise the lowest score wins. The score is the expected
+    latency divided by the recent success rate, times the price under the
+    ``latency_cost`` objective.
+    """
+
+    def __init__(self, settings: RouteSettings, candidates: List[RouteCandidate]) -> None:
+        self.settings = settings
+        self.candidates = candidates
+        self.estimates = {
+            candidate.key: LatencyEstimate(settings.alpha, settings.window) for candidate in candidates
+        }
+        self.picks: Dict[str, int] = {candidate.key: 0 for candidate in candidates}
+        self._rng = random.Random(settings.seed)
+        self._warmups = 0
+
+    def seed_from_history(self, paths: List[str]) -> int:
+        """Feeds past measured bench runs into the estimates; returns how many were used."""
+        from report_tools.io_utils import load_run_records
+
+        field_name = METRIC_FIELDS[self.settings.metric]
+        used = 0
+        for record in load_run_records(paths, include_warmup=False):
+            key = f"{record.get('provider')}:{record.get('model')}"
+            estimate = self.estimates.get(key)
+            # A hedged run the backup won measured the backup, not this model, and a
+            # cache hit measured a local replay.
+            if estimate is None or (record.get("hedge") or {}).get("winner") == "backup":
+                continue
+            if record.get("cache") == CACHE_HIT:
+                continue
+            value = record.get(field_name)
+            estimate.observe(float(value) if record.get("success") and value is not None else None)
+            used += 1
+        return used
+
+    def score(self, candidate: RouteCandidate) -> Optional[float]:
+        estimate = self.estimates[candidate.key]
+        expected = estimate.expected_ms(self.settings.estimate)
+        if expected is None:
+            return None
+        value = expected / max(MIN_SUCCESS_RATE, 1.0 - estimate.error_rate)
+        if self.settings.objective == OBJECTIVE_LATENCY_COST:
+            value *= candidate.price or 1.0
+        return value
+
+    def choose(self, warmup: bool = False) -> Tuple[RouteCandidate, Dict[str, object]]:
+        scores = {candidate.key: self.score(candidate) for candidate in self.candidates}
+        unseen = [c for c in self.candidates if self.estimates[c.key].observed == 0]
+        if warmup:
+            # Warmups rotate through every candidate and never update estimates.
+            chosen = self.candidates[self._warmups % len(self.candidates)]
+            self._warmups += 1
+            reason = REASON_WARMUP
+        elif unseen:
+            chosen, reason = unseen[0], REASON_UNSEEN
+        elif self._rng.random() < self.settings.explore:
+            chosen, reason = self._rng.choice(self.candidates), REASON_EXPLORE
+        else:
+            chosen = min(
+                self.candidates,
+                key=lambda c: float("inf") if scores[c.key] is None else float(scores[c.key]),
+            )
+            reason = REASON_EXPLOIT
+        if not warmup:
+            self.picks[chosen.key] += 1
+        expected = self.estimates[chosen.key].expected_ms(self.settings.estimate)
+        decision = {
+            "chosen": chosen.key,
+            "reason": reason,
+            "metric": self.settings.metric,
+            "expected_ms": None if expected is None else round(expected, 3),
+            "scores": {key: None if value is None else round(value, 3) for key, value in scores.items()},
+        }
+        return chosen, decision
+
+    def observe(self, candidate: RouteCandidate, result: StreamResult) -> Optional[float]:
+        """Updates the candidate's estimate; returns the realized latency in ms (None on failure).
+
+        Cache hits are replayed locally, so they are returned but not learned from.
+        """
+        if not result.success:
+            self.estimates[candidate.key].observe(None)
+            return None
+        seconds = result.ttfb_seconds if self.settings.metric == METRIC_TTFT else result.ttc_seconds
+        realized = round(seconds * 1000, 3)
+        if result.cache != CACHE_HIT:
+            self.estimates[candidate.key].observe(realized)
+        return realized
+
+    def as_record(self) -> Dict[str, object]:
+        return {
+            "type": "route_summary",
+            "settings": self.settings.as_dict(),
+            "candidates": [
+                dict(
+                    self.estimates[candidate.key].as_dict(self.settings.estimate),
+                    provider=candidate.settings.name,
+                    model=candidate.model,
+                    price=candidate.price,
+                    picks=self.picks[candidate.key],
+                )
+                for candidate in self.candidates
+            ],
+        }
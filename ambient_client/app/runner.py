@@ -4,23 +4,71 @@ import hashlib
 import json
 import os
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
+from ..cache import CACHE_HIT, get_response_cache, is_deterministic
+from ..circuit import get_circuit_breakers
 from ..config import load_env_file
-from ..streaming import stream_chat
+from ..deadlines import StreamDeadlines, load_stream_deadlines
+from ..hedging import HedgeLeg, HedgeResult, hedge_delay_from_bench, hedged_stream_chat
+from ..metrics import start_metrics_exporter
+from ..ratelimit import get_rate_limiter
+from ..retry import RetryPolicy, load_retry_policy
+from ..sessions import get_session_pool
+from ..streaming import StreamResult, stream_chat
 from ..utils import is_enabled
+from .adaptive import AdaptiveLimiter
 from .ambient import get_ambient_settings
 from .bench import (
+    ALLOWED_SCHEDULES,
+    SCHEDULE_RANDOM,
+    SCHEDULE_SEQUENTIAL,
     BenchRecorder,
+    RunSpec,
     attach_result_metrics,
     build_bench_meta,
     build_bench_record,
     iter_run_specs,
+    schedule_meta,
+    schedule_runs,
 )
+from .concurrency import (
+    ConcurrencySettings,
+    StreamOutput,
+    load_concurrency_settings,
+)
+from .loadtest import LoadSettings, load_label, load_load_settings, run_level
 from .openai import get_openai_settings
 from .openrouter import get_openrouter_settings
 from .prompt import load_prompt
-from .provider_utils import ProviderSettings
+from .provider_utils import ProviderSettings, receipt_dir_for
+from .router import (
+    OBJECTIVE_LATENCY_COST,
+    REASON_WARMUP,
+    Router,
+    load_route_settings,
+    route_candidates,
+)
+from .workload import Workload, load_workload
+
+
+@dataclass(frozen=True)
+class HedgeConfig:
+    backup: HedgeLeg
+    delay_seconds: float
+    history: List[str]
+    quantile: float
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "backup_provider": self.backup.provider,
+            "backup_model": self.backup.model,
+            "delay_ms": round(self.delay_seconds * 1000, 3),
+            "history": self.history,
+            "percentile": round(self.quantile * 100, 3),
+        }
+
 
 @dataclass(frozen=True)
 class EnvConfig:
@@ -33,9 +81,20 @@ class EnvConfig:
     bench_recorder: Optional["BenchRecorder"]
     prompt_sha256: str
     stall_threshold_seconds: Optional[float]
+    async_enabled: bool = False
+    chunk_trace: bool = False
+    chunk_trace_raw: bool = False
+    deadlines: StreamDeadlines = StreamDeadlines()
+    retry_policy: RetryPolicy = RetryPolicy()
+    hedge: Optional[HedgeConfig] = None
+    concurrency: ConcurrencySettings = ConcurrencySettings()
+    load: LoadSettings = LoadSettings()
+    workload: Optional[Workload] = None
+    router: Optional[Router] = None
+    schedule_order: str = SCHEDULE_SEQUENTIAL
+    schedule_seed: int = 0
 
 
-@dataclass(frozen=True)
 ALLOWED_REQUEST_PARAMS = {
     "temperature",
     "max_tokens",
@@ -57,17 +116,6 @@ ALLOWED_ON_ERROR = {
 }
 
 
-def _receipt_dir_for(settings: ProviderSettings) -> Optional[Path]:
-    if settings.name != "Ambient":
-        return None
-    if not is_enabled(os.getenv("AMBIENT_RECEIPT_SAVE"), default=True):
-        return None
-    dir_value = os.getenv("AMBIENT_RECEIPT_DIR", "data").strip()
-    if not dir_value:
-        return None
-    return Path(dir_value)
-
-
 def _int_env(key: str, default: Optional[int] = None) -> Optional[int]:
     raw = os.getenv(key, "").strip()
     if not raw:
@@ -184,6 +232,134 @@ def _bench_settings() -> Tuple[bool, int, int]:
     return True, warmup, runs
 
 
+def _load_schedule() -> Tuple[str, int]:
+    order = os.getenv("BENCH_SCHEDULE", "").strip().lower() or SCHEDULE_SEQUENTIAL
+    if order not in ALLOWED_SCHEDULES:
+        print(
+            "Warning: BENCH_SCHEDULE must be one of "
+            f"{', '.join(ALLOWED_SCHEDULES)}; using {SCHEDULE_SEQUENTIAL}."
+        )
+        order = SCHEDULE_SEQUENTIAL
+    seed = _int_env("BENCH_SCHEDULE_SEED", default=0)
+    return order, 0 if seed is None else seed
+
+
+def _load_hedge_config(providers: List[ProviderSettings]) -> Optional[HedgeConfig]:
+    raw = os.getenv("HEDGE_BACKUP", "").strip()
+    if not raw:
+        return None
+    provider_name, _, model = raw.partition(":")
+    model = model.strip()
+    settings = next(
+        (item for item in providers if item.name.lower() == provider_name.strip().lower()),
+        None,
+    )
+    if settings is None or not model:
+        print("Warning: HEDGE_BACKUP must look like '<Provider>:<model>'; hedging disabled.")
+        return None
+    if not settings.api_key:
+        print(f"Warning: HEDGE_BACKUP needs {settings.key_env_hint}; hedging disabled.")
+        return None
+    delay_ms = _int_env("HEDGE_DELAY_MS", default=2000)
+    if delay_ms is None or delay_ms < 0:
+        delay_ms = 2000
+    history = [item.strip() for item in os.getenv("HEDGE_HISTORY", "").split(",") if item.strip()]
+    percentile_value = _float_env("HEDGE_PERCENTILE", default=90.0)
+    if percentile_value is None or not 0 < percentile_value <= 100:
+        percentile_value = 90.0
+    return HedgeConfig(
+        backup=HedgeLeg(
+            provider=settings.name,
+            api_url=settings.api_url,
+            api_key=settings.api_key,
+            model=model,
+            receipt_dir=receipt_dir_for(settings),
+        ),
+        delay_seconds=delay_ms / 1000.0,
+        history=history,
+        quantile=percentile_value / 100.0,
+    )
+
+
+def _hedge_plan(
+    hedge: Optional[HedgeConfig],
+    settings: ProviderSettings,
+    model: str,
+) -> Optional[Tuple[HedgeLeg, float]]:
+    if hedge is None:
+        return None
+    if hedge.backup.provider == settings.name and hedge.backup.model == model:
+        return None
+    delay_seconds = hedge.delay_seconds
+    if hedge.history:
+        learned = hedge_delay_from_bench(hedge.history, settings.name, model, hedge.quantile)
+        if learned is not None:
+            delay_seconds = learned
+    return hedge.backup, delay_seconds
+
+
+def _print_hedge(
+    hedged: HedgeResult,
+    backup: HedgeLeg,
+    log: Callable[[str], None] = print,
+) -> None:
+    if not hedged.fired:
+        return
+    winner = "primary" if hedged.winner == "primary" else f"backup {backup.provider} ({backup.model})"
+    log(f"Hedge fired after {hedged.delay_seconds * 1000:.0f} ms; winner: {winner}")
+
+
+def _rate_limit_meta(providers: List[ProviderSettings]) -> Optional[Dict[str, object]]:
+    limiter = get_rate_limiter()
+    buckets: Dict[Tuple[str, str], Dict[str, object]] = {}
+    for settings in providers:
+        if not settings.enabled:
+            continue
+        for model in settings.models:
+            for bucket in limiter.buckets_for(settings.name, model):
+                buckets[(bucket.scope, bucket.kind)] = bucket.as_dict()
+    if not buckets:
+        return None
+    return dict(limiter.settings.as_dict(), buckets=list(buckets.values()))
+
+
+def _load_router(providers: List[ProviderSettings]) -> Optional[Router]:
+    settings = load_route_settings()
+    if not settings.enabled:
+        return None
+    candidates = route_candidates(providers)
+    if not candidates:
+        print("Warning: ROUTE_ENABLED needs at least one enabled provider/model; routing disabled.")
+        return None
+    if settings.objective == OBJECTIVE_LATENCY_COST:
+        unpriced = [candidate.key for candidate in candidates if candidate.price is None]
+        if unpriced:
+            print(
+                "Warning: ROUTE_OBJECTIVE=latency_cost has no <PROVIDER>_MODEL_<NAME>_PRICE for "
+                f"{', '.join(unpriced)}; treating their price as 1."
+            )
+    router = Router(settings, candidates)
+    seeded = router.seed_from_history(settings.history) if settings.history else 0
+    print(
+        f"Routing: {len(candidates)} candidate(s), metric={settings.metric}, "
+        f"objective={settings.objective}, estimate={settings.estimate}, "
+        f"explore={settings.explore:g}, seeded from {seeded} bench run(s)"
+    )
+    return router
+
+
+def _route_meta(router: Optional[Router]) -> Optional[Dict[str, object]]:
+    if router is None:
+        return None
+    return dict(
+        router.settings.as_dict(),
+        candidates=[
+            {"key": candidate.key, "price": candidate.price, "seeded_runs": router.estimates[candidate.key].observed}
+            for candidate in router.candidates
+        ],
+    )
+
+
 def _bench_output_path() -> Optional[Path]:
     dir_value = os.getenv("BENCH_OUTPUT_DIR", "data").strip()
     if not dir_value:
@@ -193,6 +369,27 @@ def _bench_output_path() -> Optional[Path]:
     return bench_dir / f"bench_{timestamp}.jsonl"
 
 
+def _run_specs(config: EnvConfig) -> List[RunSpec]:
+    return iter_run_specs(
+        config.bench_enabled,
+        config.bench_warmup,
+        config.bench_runs,
+        config.workload,
+    )
+
+
+def _run_prompt(
+    run_spec: RunSpec,
+    prompt: str,
+    config: EnvConfig,
+) -> Tuple[str, Optional[Dict[str, object]]]:
+    """Prompt text and request params for one run; workload prompts are read from disk here."""
+    item = run_spec.prompt
+    if item is None:
+        return prompt, config.request_params or None
+    return item.read(), dict(config.request_params, **item.request_params) or None
+
+
 def _run_stream(
     label: str,
     api_url: str,
@@ -200,103 +397,685 @@ def _run_stream(
     prompt: str,
     model: str,
     receipt_dir: Optional[Path],
-    receipt_label: str,
+    provider: str,
     request_params: Optional[Dict[str, object]] = None,
     bench_recorder: Optional[BenchRecorder] = None,
     bench_record: Optional[Dict[str, object]] = None,
     stall_threshold_seconds: Optional[float] = None,
     content_mode: str = "content_or_reasoning",
+    chunk_trace: bool = False,
+    chunk_trace_raw: bool = False,
+    deadlines: Optional[StreamDeadlines] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    hedge: Optional[Tuple[HedgeLeg, float]] = None,
+    output_handler: Optional[Callable[[str], None]] = None,
+    error_handler: Optional[Callable[[str], None]] = None,
+    log: Callable[[str], None] = print,
+    on_result: Optional[Callable[[StreamResult], None]] = None,
 ) -> bool:
-    print(f"{label} stream:")
-    result = stream_chat(
-        api_url,
-        api_key,
-        prompt,
-        model,
-        receipt_dir=receipt_dir,
-        receipt_label=receipt_label,
-        request_params=request_params,
-        stall_threshold_seconds=stall_threshold_seconds,
-        content_mode=content_mode,
+    if hedge is not None:
+        import asyncio
+
+        backup, delay_seconds = hedge
+        primary = HedgeLeg(provider, api_url, api_key, model, receipt_dir)
+        hedged = asyncio.run(
+            hedged_stream_chat(
+                primary,
+                backup,
+                prompt,
+                delay_seconds,
+                output_handler=output_handler,
+                error_handler=error_handler,
+                request_params=request_params,
+                stall_threshold_seconds=stall_threshold_seconds,
+                content_mode=content_mode,
+                trace_chunks=chunk_trace,
+                deadlines=deadlines,
+                retry_policy=retry_policy,
+            )
+        )
+        result = hedged.result
+        _print_hedge(hedged, backup, log)
+        if bench_record is not None:
+            bench_record = dict(bench_record, hedge=hedged.as_dict(primary, backup, prompt))
+    else:
+        result = stream_chat(
+            api_url,
+            api_key,
+            prompt,
+            model,
+            receipt_dir=receipt_dir,
+            receipt_label=provider,
+            provider=provider,
+            request_params=request_params,
+            stall_threshold_seconds=stall_threshold_seconds,
+            content_mode=content_mode,
+            output_handler=output_handler,
+            error_handler=error_handler,
+            trace_chunks=chunk_trace,
+            deadlines=deadlines,
+            retry_policy=retry_policy,
+        )
+    if on_result is not None:
+        on_result(result)
+    return _report_result(
+        result, bench_recorder, bench_record, content_mode, chunk_trace_raw, log
     )
-    success = result.success
+
+
+def _report_result(
+    result: StreamResult,
+    bench_recorder: Optional[BenchRecorder],
+    bench_record: Optional[Dict[str, object]],
+    content_mode: str,
+    chunk_trace_raw: bool = False,
+    log: Callable[[str], None] = print,
+) -> bool:
     if bench_recorder is not None and bench_record is not None:
-        record = attach_result_metrics(dict(bench_record), result, content_mode)
+        record = attach_result_metrics(
+            dict(bench_record),
+            result,
+            content_mode,
+            include_chunk_trace=chunk_trace_raw,
+        )
         bench_recorder.write(record)
-    if not success:
+    if result.attempts > 1:
+        log(
+            f"Attempts: {result.attempts} "
+            f"(backoff {result.backoff_seconds * 1000:.0f} ms, excluded from timings)"
+        )
+    if result.rate_limit_wait_seconds > 0:
+        log(f"Rate limit wait: {result.rate_limit_wait_seconds * 1000:.0f} ms (excluded from timings)")
+    if result.cache is not None:
+        note = " (replayed from disk, no API call)" if result.cache == CACHE_HIT else ""
+        log(f"Cache: {result.cache}{note}")
+    if not result.success:
         return False
-    print(f"Time to first token: {result.ttfb_seconds * 1000:.0f} ms")
-    print(f"Time to completion: {result.ttc_seconds * 1000:.0f} ms")
+    log(f"Time to first token: {result.ttfb_seconds * 1000:.0f} ms")
+    log(f"Time to completion: {result.ttc_seconds * 1000:.0f} ms")
     if result.receipt_path:
-        print(f"Receipt saved to: {result.receipt_path}")
+        log(f"Receipt saved to: {result.receipt_path}")
     return True
 
 
-def _run_provider(
+async def _run_model_async(
     settings: ProviderSettings,
+    model: str,
     prompt: str,
-    had_output: bool,
+    receipt_dir: Optional[Path],
     config: EnvConfig,
-) -> Tuple[bool, bool]:
-    if not settings.enabled:
-        return True, had_output
-    error = settings.validation_error()
-    if error:
-        print(error)
-        return False, had_output
-    receipt_dir = _receipt_dir_for(settings)
-    for model in settings.models:
-        for run_spec in iter_run_specs(config.bench_enabled, config.bench_warmup, config.bench_runs):
-            if had_output:
-                print("")
-            label = f"{settings.name} ({model}){run_spec.label_suffix}"
-            bench_record = None
-            if config.bench_recorder is not None:
-                bench_record = build_bench_record(
-                    settings,
-                    model,
-                    config.prompt_sha256,
-                    run_spec,
-                )
-            if not _run_stream(
+) -> bool:
+    from ..async_streaming import async_stream_chat
+
+    hedge = _hedge_plan(config.hedge, settings, model)
+    for run_spec in _run_specs(config):
+        label = f"{settings.name} ({model}){run_spec.label_suffix}"
+        bench_record = None
+        if config.bench_recorder is not None:
+            bench_record = build_bench_record(settings, model, config.prompt_sha256, run_spec)
+        run_prompt, request_params = _run_prompt(run_spec, prompt, config)
+        output: List[str] = []
+        errors: List[str] = []
+        stream_kwargs = dict(
+            request_params=request_params,
+            stall_threshold_seconds=config.stall_threshold_seconds,
+            content_mode=config.content_mode,
+            output_handler=output.append,
+            error_handler=errors.append,
+            trace_chunks=config.chunk_trace,
+            deadlines=config.deadlines,
+            retry_policy=config.retry_policy,
+        )
+        hedged: Optional[HedgeResult] = None
+        if hedge is not None:
+            backup, delay_seconds = hedge
+            primary = HedgeLeg(settings.name, settings.api_url, settings.api_key, model, receipt_dir)
+            hedged = await hedged_stream_chat(
+                primary, backup, run_prompt, delay_seconds, **stream_kwargs
+            )
+            result = hedged.result
+            if bench_record is not None:
+                bench_record = dict(bench_record, hedge=hedged.as_dict(primary, backup, run_prompt))
+        else:
+            result = await async_stream_chat(
+                settings.api_url,
+                settings.api_key,
+                run_prompt,
+                model,
+                receipt_dir=receipt_dir,
+                receipt_label=settings.name,
+                provider=settings.name,
+                **stream_kwargs,
+            )
+        # Streams finish out of order, so each one is printed as a block on completion.
+        print(f"\n{label} stream:")
+        print("".join(output), end="")
+        for message in errors:
+            print(message)
+        if hedged is not None and hedge is not None:
+            _print_hedge(hedged, hedge[0])
+        if not _report_result(
+            result,
+            config.bench_recorder,
+            bench_record,
+            config.content_mode,
+            config.chunk_trace_raw,
+        ):
+            if config.on_error == "continue":
+                continue
+            return False
+    return True
+
+
+async def _run_all_async(
+    providers: List[ProviderSettings],
+    prompt: str,
+    config: EnvConfig,
+) -> bool:
+    jobs = []
+    for settings in providers:
+        if not settings.enabled:
+            continue
+        error = settings.validation_error()
+        if error:
+            print(error)
+            return False
+        receipt_dir = receipt_dir_for(settings)
+        for model in settings.models:
+            jobs.append(_run_model_async(settings, model, prompt, receipt_dir, config))
+    import asyncio
+
+    results = await asyncio.gather(*jobs)
+    return all(results)
+
+
+def _enabled_providers(providers: List[ProviderSettings]) -> Optional[List[ProviderSettings]]:
+    """Enabled providers in order, or None (after printing why) if one is misconfigured."""
+    enabled: List[ProviderSettings] = []
+    for settings in providers:
+        if not settings.enabled:
+            continue
+        error = settings.validation_error()
+        if error:
+            print(error)
+            return None
+        enabled.append(settings)
+    return enabled
+
+
+def _schedule(
+    enabled: List[ProviderSettings],
+    config: EnvConfig,
+) -> Tuple[List[Tuple[ProviderSettings, str]], List[Tuple[int, RunSpec]]]:
+    models = [(settings, model) for settings in enabled for model in settings.models]
+    schedule = schedule_runs(
+        [(settings.name, model) for settings, model in models],
+        _run_specs(config),
+        config.schedule_order,
+        config.schedule_seed,
+    )
+    return models, schedule
+
+
+def _run_scheduled(
+    providers: List[ProviderSettings],
+    prompt: str,
+    config: EnvConfig,
+) -> bool:
+    enabled = _enabled_providers(providers)
+    if enabled is None:
+        return False
+    models, schedule = _schedule(enabled, config)
+    hedges = {
+        (settings.name, model): _hedge_plan(config.hedge, settings, model) for settings, model in models
+    }
+    success = True
+    for position, (index, run_spec) in enumerate(schedule, start=1):
+        settings, model = models[index]
+        if position > 1:
+            print("")
+        label = f"{settings.name} ({model}){run_spec.label_suffix}"
+        bench_record = None
+        if config.bench_recorder is not None:
+            bench_record = build_bench_record(
+                settings,
+                model,
+                config.prompt_sha256,
+                run_spec,
+            )
+            bench_record["schedule_index"] = position
+        run_prompt, request_params = _run_prompt(run_spec, prompt, config)
+        print(f"{label} stream:")
+        if not _run_stream(
+            label,
+            settings.api_url,
+            settings.api_key,
+            run_prompt,
+            model,
+            receipt_dir_for(settings),
+            settings.name,
+            request_params=request_params,
+            bench_recorder=config.bench_recorder,
+            bench_record=bench_record,
+            stall_threshold_seconds=config.stall_threshold_seconds,
+            content_mode=config.content_mode,
+            chunk_trace=config.chunk_trace,
+            chunk_trace_raw=config.chunk_trace_raw,
+            deadlines=config.deadlines,
+            retry_policy=config.retry_policy,
+            hedge=hedges[(settings.name, model)],
+        ):
+            success = False
+            if config.on_error != "continue":
+                break
+    return success
+
+
+def _run_job(
+    settings: ProviderSettings,
+    model: str,
+    run_spec: RunSpec,
+    prompt: str,
+    config: EnvConfig,
+    hedge: Optional[Tuple[HedgeLeg, float]],
+    limit: threading.BoundedSemaphore,
+    abort: threading.Event,
+    adaptive: Optional[AdaptiveLimiter] = None,
+    schedule_index: Optional[int] = None,
+) -> bool:
+    with limit:
+        ticket = adaptive.acquire() if adaptive is not None else None
+        if abort.is_set():
+            if adaptive is not None and ticket is not None:
+                adaptive.release(ticket, None)
+            return True
+        label = f"{settings.name} ({model}){run_spec.label_suffix}"
+        output = StreamOutput(label, config.concurrency.output_mode)
+        bench_record = None
+        if config.bench_recorder is not None:
+            bench_record = build_bench_record(settings, model, config.prompt_sha256, run_spec)
+            bench_record["schedule_index"] = schedule_index
+            if ticket is not None:
+                bench_record["concurrency_limit"] = ticket["limit"]
+                bench_record["in_flight"] = ticket["in_flight"]
+        run_prompt, request_params = _run_prompt(run_spec, prompt, config)
+        results: List[StreamResult] = []
+        try:
+            return _run_stream(
                 label,
                 settings.api_url,
                 settings.api_key,
-                prompt,
+                run_prompt,
                 model,
-                receipt_dir,
+                receipt_dir_for(settings),
                 settings.name,
-                request_params=config.request_params or None,
+                request_params=request_params,
                 bench_recorder=config.bench_recorder,
                 bench_record=bench_record,
                 stall_threshold_seconds=config.stall_threshold_seconds,
                 content_mode=config.content_mode,
-            ):
-                had_output = True
-                if config.on_error == "continue":
-                    continue
-                return False, had_output
-            had_output = True
-    return True, had_output
+                chunk_trace=config.chunk_trace,
+                chunk_trace_raw=config.chunk_trace_raw,
+                deadlines=config.deadlines,
+                retry_policy=config.retry_policy,
+                hedge=hedge,
+                output_handler=output,
+                error_handler=output.log,
+                log=output.log,
+                on_result=results.append,
+            )
+        finally:
+            if adaptive is not None and ticket is not None:
+                adaptive.release(ticket, results[0] if results else None)
+            output.close()
+
+
+def _run_all_concurrent(
+    providers: List[ProviderSettings],
+    prompt: str,
+    config: EnvConfig,
+) -> bool:
+    enabled = _enabled_providers(providers)
+    if enabled is None:
+        return False
+    limits = {
+        settings.name: threading.BoundedSemaphore(config.concurrency.limit_for(settings.name))
+        for settings in enabled
+    }
+    adaptive: Dict[str, AdaptiveLimiter] = {}
+    if config.concurrency.adaptive.enabled:
+        adaptive = {
+            settings.name: AdaptiveLimiter(
+                settings.name,
+                config.concurrency.adaptive,
+                config.concurrency.limit_for(settings.name),
+            )
+            for settings in enabled
+        }
+    models, schedule = _schedule(enabled, config)
+    hedges = {
+        (settings.name, model): _hedge_plan(config.hedge, settings, model) for settings, model in models
+    }
+    # Every warmup finishes before any measured run starts, so warm connections
+    # and caches are in place no matter how the jobs interleave. Jobs are
+    # submitted in schedule order.
+    positions = list(enumerate(schedule, start=1))
+    phases = [
+        [item for item in positions if item[1][1].is_warmup],
+        [item for item in positions if not item[1][1].is_warmup],
+    ]
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    abort = threading.Event()
+    success = True
+    with ThreadPoolExecutor(
+        max_workers=config.concurrency.workers,
+        thread_name_prefix="run",
+    ) as executor:
+        for phase in phases:
+            futures = []
+            for position, (index, run_spec) in phase:
+                settings, model = models[index]
+                futures.append(
+                    executor.submit(
+                        _run_job,
+                        settings,
+                        model,
+                        run_spec,
+                        prompt,
+                        config,
+                        hedges[(settings.name, model)],
+                        limits[settings.name],
+                        abort,
+                        adaptive.get(settings.name),
+                        position,
+                    )
+                )
+            for future in as_completed(futures):
+                if not future.result():
+                    success = False
+                    if config.on_error != "continue":
+                        abort.set()
+            if abort.is_set():
+                break
+    for limiter in adaptive.values():
+        record = limiter.as_record()
+        print(
+            f"\nAdaptive concurrency {limiter.provider}: final limit {record['final_limit']:g} "
+            f"(range {record['min_limit_seen']:g}-{record['max_limit_seen']:g} of {limiter.max_limit}, "
+            f"{record['decreases']} decrease(s))"
+        )
+        if config.bench_recorder is not None:
+            config.bench_recorder.write(record)
+    return success
+
+
+def _run_routed(router: Router, prompt: str, config: EnvConfig) -> bool:
+    had_output = False
+    success = True
+    for run_spec in _run_specs(config):
+        candidate, decision = router.choose(warmup=run_spec.is_warmup)
+        settings, model = candidate.settings, candidate.model
+        if had_output:
+            print("")
+        label = f"{settings.name} ({model}){run_spec.label_suffix}"
+        bench_record = None
+        if config.bench_recorder is not None:
+            bench_record = build_bench_record(settings, model, config.prompt_sha256, run_spec)
+            # Shared with the hedge copy _run_stream may make, so realized_ms lands in both.
+            bench_record["route"] = decision
+        run_prompt, request_params = _run_prompt(run_spec, prompt, config)
+        expected = decision["expected_ms"]
+        print(
+            f"Route: {candidate.key} [{decision['reason']}], expected {router.settings.metric} "
+            f"{'?' if expected is None else f'{expected:.0f}'} ms"
+        )
+
+        def observe(result: StreamResult) -> None:
+            if decision["reason"] != REASON_WARMUP:
+                decision["realized_ms"] = router.observe(candidate, result)
+
+        print(f"{label} stream:")
+        ok = _run_stream(
+            label,
+            settings.api_url,
+            settings.api_key,
+            run_prompt,
+            model,
+            receipt_dir_for(settings),
+            settings.name,
+            request_params=request_params,
+            bench_recorder=config.bench_recorder,
+            bench_record=bench_record,
+            stall_threshold_seconds=config.stall_threshold_seconds,
+            content_mode=config.content_mode,
+            chunk_trace=config.chunk_trace,
+            chunk_trace_raw=config.chunk_trace_raw,
+            deadlines=config.deadlines,
+            retry_policy=config.retry_policy,
+            hedge=_hedge_plan(config.hedge, settings, model),
+            on_result=observe,
+        )
+        had_output = True
+        if decision.get("realized_ms") is not None:
+            print(f"Route realized {router.settings.metric}: {decision['realized_ms']:.0f} ms")
+        if not ok:
+            success = False
+            if config.on_error != "continue":
+                break
+    summary = router.as_record()
+    print("\nRouting summary:")
+    for item in summary["candidates"]:
+        expected = item["expected_ms"]
+        print(
+            f"  {item['provider']}:{item['model']}: {item['picks']} pick(s), "
+            f"expected {'?' if expected is None else f'{expected:.0f}'} ms, "
+            f"error rate {item['error_rate']:.2f}"
+        )
+    if config.bench_recorder is not None:
+        config.bench_recorder.write(summary)
+    return success
 
 
-def _load_env_config(prompt: str) -> EnvConfig:
+def _report_circuits(config: EnvConfig) -> None:
+    for record in get_circuit_breakers().as_records():
+        if not record["transitions"] and not record["short_circuits"]:
+            continue
+        print(
+            f"\nCircuit {record['provider']}/{record['model']}: {record['state']}, "
+            f"{record['short_circuits']} short-circuited, {len(record['transitions'])} transition(s)"
+        )
+        if config.bench_recorder is not None:
+            config.bench_recorder.write(record)
+
+
+def _discard(_: str) -> None:
+    return None
+
+
+def _load_sender(
+    settings: ProviderSettings,
+    model: str,
+    prompt: str,
+    config: EnvConfig,
+) -> Callable[[Dict[str, object]], Awaitable[StreamResult]]:
+    from ..async_streaming import async_stream_chat
+
+    draw = config.workload.sampler() if config.workload is not None else None
+
+    async def send(load_info: Dict[str, object]) -> StreamResult:
+        run_spec = RunSpec(
+            index=int(load_info["request_index"]),
+            total=0,
+            is_warmup=False,
+            label_suffix="",
+            prompt=draw() if draw is not None else None,
+        )
+        run_prompt, request_params = _run_prompt(run_spec, prompt, config)
+        # Load runs skip receipts and printing; results only feed bench records.
+        result = await async_stream_chat(
+            settings.api_url,
+            settings.api_key,
+            run_prompt,
+            model,
+            receipt_label=settings.name,
+            provider=settings.name,
+            request_params=request_params,
+            stall_threshold_seconds=config.stall_threshold_seconds,
+            content_mode=config.content_mode,
+            output_handler=_discard,
+            error_handler=_discard,
+            trace_chunks=config.chunk_trace,
+            deadlines=config.deadlines,
+            retry_policy=config.retry_policy,
+        )
+        if config.bench_recorder is not None:
+            bench_record = build_bench_record(settings, model, config.prompt_sha256, run_spec)
+            bench_record["load"] = load_info
+            config.bench_recorder.write(
+                attach_result_metrics(bench_record, result, config.content_mode)
+            )
+        return result
+
+    return send
+
+
+async def _run_load(
+    providers: List[ProviderSettings],
+    prompt: str,
+    config: EnvConfig,
+) -> bool:
+    load = config.load
+    completed = 0
+    for settings in providers:
+        if not settings.enabled:
+            continue
+        error = settings.validation_error()
+        if error:
+            print(error)
+            return False
+        for model in settings.models:
+            for level in load.levels:
+                label = load_label(load.mode, level)
+                print(f"{settings.name} ({model}) load {label} for {load.duration_seconds:g}s...")
+                # A fresh sender per level replays the same seeded prompt sequence.
+                send = _load_sender(settings, model, prompt, config)
+                summary = await run_level(load.mode, level, load, send)
+                if config.bench_recorder is not None:
+                    config.bench_recorder.write(
+                        dict(summary, type="load_level", provider=settings.name, model=model)
+                    )
+                print(
+                    f"  offered {summary['offered_rps']} rps, achieved {summary['achieved_rps']} rps, "
+                    f"errors {summary['errors']}/{summary['requests']}, "
+                    f"queue p90 {summary['queue_ms_p90']} ms, "
+                    f"TTFT p50/p90 {summary['ttfb_ms_p50']}/{summary['ttfb_ms_p90']} ms"
+                )
+                if summary["aborted"]:
+                    print(f"  stopped early: the first {summary['requests']} requests all failed")
+                completed += int(summary["completed"])
+    # The run fails only when no level completed a single request.
+    return completed > 0
+
+
+def _load_env_config(
+    prompt: str,
+    providers: List[ProviderSettings],
+    workload: Optional[Workload] = None,
+    dry_run: bool = False,
+) -> EnvConfig:
     request_params = _load_request_params()
     bench_enabled, bench_warmup, bench_runs = _bench_settings()
+    load = load_load_settings()
+    if load.enabled:
+        # Load mode always records; its requests replace the warmup/run schedule.
+        bench_enabled = True
     content_mode = _load_content_mode()
     on_error = _load_on_error(bench_enabled)
+    if workload is not None and not bench_enabled:
+        print("Warning: BENCH_WORKLOAD needs BENCH_ENABLED=1 or LOAD_MODE; using the single prompt.")
+        workload = None
     prompt_sha256 = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    async_enabled = _bool_env("RUN_ASYNC", default=False)
+    deadlines = load_stream_deadlines()
+    retry_policy = load_retry_policy()
+    cache_settings = get_response_cache().settings
+    if cache_settings.enabled and not is_deterministic(request_params):
+        print("Warning: RESPONSE_CACHE needs REQUEST_TEMPERATURE=0 and REQUEST_SEED; caching skipped.")
+    hedge = _load_hedge_config(providers)
+    concurrency = load_concurrency_settings(providers)
+    router = _load_router(providers)
+    if router is not None and load.enabled:
+        print("Warning: LOAD_MODE takes precedence; ROUTE_ENABLED is ignored.")
+        router = None
+    elif router is not None and (async_enabled or concurrency.enabled):
+        mode = "RUN_ASYNC" if async_enabled else "RUN_CONCURRENCY"
+        print(f"Warning: ROUTE_ENABLED runs sequentially; {mode} is ignored.")
+    rate_limits = _rate_limit_meta(providers)
+    circuit_settings = get_circuit_breakers().settings
+    if circuit_settings.enabled:
+        print(
+            f"Circuit breaker: open after {circuit_settings.consecutive_failures} consecutive failures "
+            f"or {circuit_settings.error_rate:.0%} errors over {circuit_settings.window} requests, "
+            f"probe after {circuit_settings.open_seconds:g}s"
+        )
+    if rate_limits is not None:
+        limits = ", ".join(
+            f"{bucket['scope']} {bucket['per_minute']:g} {'rpm' if bucket['kind'] == 'requests' else 'tpm'}"
+            for bucket in rate_limits["buckets"]
+        )
+        print(f"Rate limits: {limits}")
+    if concurrency.enabled and async_enabled:
+        print("Warning: RUN_ASYNC=1 takes precedence; RUN_CONCURRENCY is ignored.")
     bench_recorder: Optional[BenchRecorder] = None
     stall_threshold_seconds = None
-    if bench_enabled:
+    chunk_trace = False
+    chunk_trace_raw = False
+    if load.enabled:
+        print(
+            f"Load mode: {load.mode} loop, levels={','.join(f'{level:g}' for level in load.levels)}, "
+            f"{load.duration_seconds:g}s each"
+        )
+    elif bench_enabled:
         print(f"Bench mode: warmup={bench_warmup}, runs={bench_runs}")
+    schedule_order, schedule_seed = _load_schedule()
+    scheduled = bench_enabled and not load.enabled and router is None and not async_enabled
+    if schedule_order != SCHEDULE_SEQUENTIAL:
+        if scheduled:
+            seed_note = f", seed={schedule_seed}" if schedule_order == SCHEDULE_RANDOM else ""
+            print(f"Schedule: {schedule_order}{seed_note}")
+        else:
+            print("Warning: BENCH_SCHEDULE applies to sequential and RUN_CONCURRENCY bench runs; ignoring.")
+            schedule_order = SCHEDULE_SEQUENTIAL
+    if workload is not None:
+        print(
+            f"Workload: {workload.path} ({len(workload.prompts)} prompts, "
+            f"order={workload.order}, seed={workload.seed})"
+        )
+    if bench_enabled:
         bench_path = _bench_output_path()
         stall_threshold_ms = _int_env("BENCH_STALL_THRESHOLD_MS", default=2000)
         if stall_threshold_ms is None:
             stall_threshold_ms = 2000
         stall_threshold_seconds = stall_threshold_ms / 1000.0
+        chunk_trace = _bool_env("BENCH_CHUNK_TRACE", default=True)
+        chunk_trace_raw = chunk_trace and _bool_env("BENCH_CHUNK_TRACE_RAW", default=False)
         if bench_path is not None:
-            bench_recorder = BenchRecorder(bench_path)
+            schedule = None
+            if scheduled:
+                models = [
+                    (settings.name, model)
+                    for settings in providers
+                    if settings.enabled and settings.validation_error() is None
+                    for model in settings.models
+                ]
+                specs = iter_run_specs(bench_enabled, bench_warmup, bench_runs, workload)
+                schedule = schedule_meta(
+                    models,
+                    schedule_runs(models, specs, schedule_order, schedule_seed),
+                    schedule_order,
+                    schedule_seed,
+                )
             meta = build_bench_meta(
                 bench_warmup,
                 bench_runs,
@@ -306,9 +1085,27 @@ def _load_env_config(prompt: str) -> EnvConfig:
                 content_mode,
                 on_error,
                 os.getenv("AMBIENT_PROMPT_FILE", "").strip() or None,
+                http_pool=get_session_pool().settings.as_dict(),
+                chunk_trace={"enabled": chunk_trace, "raw": chunk_trace_raw},
+                deadlines=deadlines.as_dict(),
+                retry=retry_policy.as_dict(),
+                response_cache=cache_settings.as_dict(),
+                hedge=hedge.as_dict() if hedge is not None else None,
+                concurrency=concurrency.as_dict(),
+                load=load.as_dict() if load.enabled else None,
+                workload=workload.as_dict() if workload is not None else None,
+                rate_limits=rate_limits,
+                route=_route_meta(router),
+                circuit_breaker=circuit_settings.as_dict() if circuit_settings.enabled else None,
+                schedule=schedule,
             )
-            bench_recorder.write(meta)
-            print(f"Bench output: {bench_path}")
+            if dry_run:
+                print(f"Bench output (dry run, not written): {bench_path}")
+                print(json.dumps(meta, indent=2, sort_keys=True))
+            else:
+                bench_recorder = BenchRecorder(bench_path)
+                bench_recorder.write(meta)
+                print(f"Bench output: {bench_path}")
     return EnvConfig(
         request_params=request_params,
         content_mode=content_mode,
@@ -319,22 +1116,82 @@ def _load_env_config(prompt: str) -> EnvConfig:
         bench_recorder=bench_recorder,
         prompt_sha256=prompt_sha256,
         stall_threshold_seconds=stall_threshold_seconds,
+        async_enabled=async_enabled,
+        chunk_trace=chunk_trace,
+        chunk_trace_raw=chunk_trace_raw,
+        deadlines=deadlines,
+        retry_policy=retry_policy,
+        hedge=hedge,
+        concurrency=concurrency,
+        load=load,
+        workload=workload,
+        router=router,
+        schedule_order=schedule_order,
+        schedule_seed=schedule_seed,
     )
 
 
-def run() -> None:
+def _print_plan(providers: List[ProviderSettings], config: EnvConfig) -> None:
+    specs = _run_specs(config)
+    if config.router is not None:
+        keys = ", ".join(candidate.key for candidate in config.router.candidates)
+        print(f"Route: {len(specs)} run(s) across {keys}")
+        return
+    for settings in providers:
+        if not settings.enabled:
+            continue
+        error = settings.validation_error()
+        if error:
+            print(error)
+            continue
+        for model in settings.models:
+            if config.load.enabled:
+                levels = ", ".join(load_label(config.load.mode, level) for level in config.load.levels)
+                print(f"{settings.name} ({model}): load {levels}")
+            else:
+                print(f"{settings.name} ({model}): {len(specs)} run(s) -> {settings.api_url}")
+
+
+def run(dry_run: bool = False) -> None:
+    """Runs the configured streams; ``dry_run`` only resolves and prints the plan.
+
+    The HTTP and asyncio stacks are imported inside the paths that use them, so
+    a dry run (and anything else that only reads config) starts without them.
+    """
     load_env_file()
     prompt = load_prompt()
     if prompt is None:
         return
 
-    config = _load_env_config(prompt)
-    had_output = False
-    for settings in (
+    providers = [
         get_ambient_settings(),
         get_openai_settings(),
         get_openrouter_settings(),
-    ):
-        success, had_output = _run_provider(settings, prompt, had_output, config)
-        if not success:
+    ]
+    workload = None
+    if os.getenv("BENCH_WORKLOAD", "").strip():
+        workload = load_workload(ALLOWED_REQUEST_PARAMS)
+        if workload is None:
             return
+    config = _load_env_config(prompt, providers, workload, dry_run)
+    if dry_run:
+        _print_plan(providers, config)
+        return
+    import asyncio
+
+    exporter = start_metrics_exporter()
+    try:
+        if config.load.enabled:
+            asyncio.run(_run_load(providers, prompt, config))
+        elif config.router is not None:
+            _run_routed(config.router, prompt, config)
+        elif config.async_enabled:
+            asyncio.run(_run_all_async(providers, prompt, config))
+        elif config.concurrency.enabled:
+            _run_all_concurrent(providers, prompt, config)
+        else:
+            _run_scheduled(providers, prompt, config)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+    _report_circuits(config)
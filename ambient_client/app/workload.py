@@ -0,0 +1,210 @@
+"""Multi-prompt bench workloads: a JSONL file or a directory of prompt files.
+
+Only an index (id, hash, weight, tags, overrides, where to find the text) is
+kept in memory; each prompt's text is read back from disk when its run starts.
+"""
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import random
+from typing import Callable, Collection, Dict, Iterable, List, Optional
+
+ORDER_SAMPLE = "sample"
+ORDER_ALL = "all"
+
+DEFAULT_SEED = 0
+
+
+@dataclass(frozen=True)
+class WorkloadPrompt:
+    prompt_id: str
+    prompt_sha256: str
+    weight: float
+    tags: List[str]
+    request_params: Dict[str, object]
+    path: Path
+    # Byte offset of the JSONL line holding the prompt; None means the whole
+    # file at ``path`` is the prompt.
+    offset: Optional[int] = None
+
+    def read(self) -> str:
+        if self.offset is None:
+            return self.path.read_text(encoding="utf-8")
+        with self.path.open("rb") as handle:
+            handle.seek(self.offset)
+            entry = json.loads(handle.readline())
+        return _entry_text(entry, self.path.parent)
+
+    def as_record(self) -> Dict[str, object]:
+        return {
+            "prompt_id": self.prompt_id,
+            "prompt_tags": self.tags,
+            "prompt_weight": self.weight,
+            "prompt_params": self.request_params or None,
+        }
+
+
+def _entry_text(entry: Dict[str, object], base_dir: Path) -> str:
+    if isinstance(entry.get("prompt"), str):
+        return str(entry["prompt"])
+    return (base_dir / str(entry["prompt_file"])).read_text(encoding="utf-8")
+
+
+def _sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _parse_tags(value: object) -> List[str]:
+    if isinstance(value, str):
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    if isinstance(value, list):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    return []
+
+
+def _scan_jsonl(path: Path, allowed_params: Collection[str]) -> Iterable[WorkloadPrompt]:
+    with path.open("rb") as handle:
+        line_number = 0
+        while True:
+            offset = handle.tell()
+            raw = handle.readline()
+            if not raw:
+                return
+            line_number += 1
+            if not raw.strip():
+                continue
+            where = f"{path}:{line_number}"
+            try:
+                entry = json.loads(raw)
+            except json.JSONDecodeError:
+                print(f"Warning: Invalid JSON at {where}, skipping.")
+                continue
+            if not isinstance(entry, dict) or not (
+                isinstance(entry.get("prompt"), str) or isinstance(entry.get("prompt_file"), str)
+            ):
+                print(f"Warning: {where} needs a 'prompt' or 'prompt_file' string, skipping.")
+                continue
+            try:
+                text = _entry_text(entry, path.parent)
+            except OSError as exc:
+                print(f"Warning: Unable to read prompt for {where}: {exc}, skipping.")
+                continue
+            try:
+                weight = float(entry.get("weight", 1.0))
+            except (TypeError, ValueError):
+                print(f"Warning: Invalid weight at {where}, using 1.")
+                weight = 1.0
+            if weight <= 0:
+                continue
+            params = entry.get("params") or {}
+            if not isinstance(params, dict):
+                print(f"Warning: 'params' at {where} must be an object, ignoring.")
+                params = {}
+            for key in sorted(set(params) - set(allowed_params)):
+                print(f"Warning: Unsupported request param '{key}' at {where} ignored.")
+                params.pop(key)
+            yield WorkloadPrompt(
+                prompt_id=str(entry.get("id") or f"line{line_number}"),
+                prompt_sha256=_sha256_text(text),
+                weight=weight,
+                tags=_parse_tags(entry.get("tags")),
+                request_params=params,
+                path=path,
+                offset=offset,
+            )
+
+
+def _scan_directory(root: Path) -> Iterable[WorkloadPrompt]:
+    # Each file is one prompt; its subdirectories under the root become its tags.
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root)
+        if not path.is_file() or any(part.startswith(".") for part in relative.parts):
+            continue
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as exc:
+            print(f"Warning: Unable to read prompt file {path}: {exc}, skipping.")
+            continue
+        yield WorkloadPrompt(
+            prompt_id=relative.with_suffix("").as_posix(),
+            prompt_sha256=_sha256_text(text),
+            weight=1.0,
+            tags=list(relative.parts[:-1]),
+            request_params={},
+            path=path,
+        )
+
+
+class Workload:
+    def __init__(self, path: Path, prompts: List[WorkloadPrompt], order: str, seed: int) -> None:
+        self.path = path
+        self.prompts = prompts
+        self.order = order
+        self.seed = seed
+
+    def schedule(self, warmup: int, runs: int) -> List[WorkloadPrompt]:
+        """Prompts for one model's warmups then measured runs.
+
+        The schedule depends only on the workload and seed, so every model is
+        measured on the same prompt sequence.
+        """
+        if self.order == ORDER_ALL:
+            warmups = [self.prompts[idx % len(self.prompts)] for idx in range(warmup)]
+            return warmups + [item for item in self.prompts for _ in range(runs)]
+        draw = self.sampler()
+        return [draw() for _ in range(warmup + runs)]
+
+    def sampler(self) -> Callable[[], WorkloadPrompt]:
+        rng = random.Random(self.seed)
+        weights = [item.weight for item in self.prompts]
+
+        def draw() -> WorkloadPrompt:
+            return rng.choices(self.prompts, weights=weights)[0]
+
+        return draw
+
+    def as_dict(self) -> Dict[str, object]:
+        tags: Dict[str, int] = {}
+        digest = hashlib.sha256()
+        for item in self.prompts:
+            digest.update(f"{item.prompt_id}\0{item.prompt_sha256}\0{item.weight}\n".encode("utf-8"))
+            for tag in item.tags:
+                tags[tag] = tags.get(tag, 0) + 1
+        return {
+            "path": str(self.path),
+            "prompts": len(self.prompts),
+            "order": self.order,
+            "seed": self.seed,
+            "total_weight": round(sum(item.weight for item in self.prompts), 6),
+            "tags": tags,
+            "sha256": digest.hexdigest(),
+        }
+
+
+def load_workload(allowed_params: Collection[str]) -> Optional[Workload]:
+    raw_path = os.getenv("BENCH_WORKLOAD", "").strip()
+    path = Path(raw_path)
+    if not path.exists():
+        print(f"Error: BENCH_WORKLOAD '{raw_path}' does not exist.")
+        return None
+    order = os.getenv("BENCH_WORKLOAD_ORDER", "").strip().lower() or ORDER_SAMPLE
+    if order not in (ORDER_SAMPLE, ORDER_ALL):
+        print(f"Warning: Invalid BENCH_WORKLOAD_ORDER='{order}', using {ORDER_SAMPLE}.")
+        order = ORDER_SAMPLE
+    seed = DEFAULT_SEED
+    raw_seed = os.getenv("BENCH_WORKLOAD_SEED", "").strip()
+    if raw_seed:
+        try:
+            seed = int(raw_seed)
+        except ValueError:
+            print(f"Warning: Invalid BENCH_WORKLOAD_SEED='{raw_seed}', using {DEFAULT_SEED}.")
+    if path.is_dir():
+        prompts = list(_scan_directory(path))
+    else:
+        prompts = list(_scan_jsonl(path, allowed_params))
+    if not prompts:
+        print(f"Error: BENCH_WORKLOAD '{raw_path}' has no usable prompts.")
+        return None
+    return Workload(path, prompts, order, seed)
@@ -0,0 +1,301 @@
+import asyncio
+import json
+from pathlib import Path
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .aio_http import AsyncRequestError, AsyncResponse, open_stream
+from .cache import (
+    CACHE_HIT,
+    CACHE_MISS,
+    REPLAY_TIMING,
+    CachedResponse,
+    ResponseCache,
+    get_response_cache,
+)
+from .circuit import CircuitBreakers, get_circuit_breakers
+from .deadlines import (
+    CANCEL_HEDGE_LOST,
+    StreamDeadlines,
+    cancel_message,
+    load_stream_deadlines,
+)
+from .metrics import MetricsRegistry, get_metrics_registry
+from .output import OutputSettings
+from .ratelimit import RateLimiter, get_rate_limiter
+from .receipts import ReceiptWriter
+from .retry import RetryPolicy, load_retry_policy
+from .streaming import (
+    READ_TIMEOUT_SECONDS,
+    StreamResult,
+    _StreamState,
+    _abandon_attempt,
+    _admit_circuit,
+    _build_headers,
+    _build_payload,
+    _cache_header,
+    _fail_stream,
+    _finish_stream,
+    _observe_metrics,
+    _open_output,
+    _open_receipt,
+    _provider_name,
+    _record_circuit,
+    _retry_delay,
+    _safe_write,
+    _settle_reservation,
+    _short_circuit,
+    _with_attempts,
+)
+from .sse import SSEEvent, SSEParser
+
+
+async def _aiter_sse_events(
+    response: AsyncResponse,
+    receipt: Optional[ReceiptWriter],
+) -> AsyncIterator[SSEEvent]:
+    parser = SSEParser()
+    async for chunk in response.iter_chunks():
+        received_at = time.perf_counter()
+        for event in parser.feed(chunk, received_at):
+            if receipt is not None:
+                receipt.add_raw_event(event.data)
+            yield event
+    for event in parser.flush():
+        if receipt is not None:
+            receipt.add_raw_event(event.data)
+        yield event
+
+
+async def _read_stream(
+    state: _StreamState,
+    api_url: str,
+    headers: Dict[str, str],
+    body: bytes,
+) -> None:
+    response: Optional[AsyncResponse] = None
+    try:
+        response = await open_stream(api_url, headers, body, timeout=READ_TIMEOUT_SECONDS)
+        state.headers_at = time.perf_counter()
+        state.connection_timing = dict(response.timing)
+        state.status_code = response.status_code
+        state.retry_after = response.headers.get("retry-after")
+        state.connection_reused = False
+        response.raise_for_status()
+        async for event in _aiter_sse_events(
+            response,
+            state.receipt,
+        ):
+            if not state.feed(event.data, event.received_at):
+                break
+    finally:
+        if response is not None:
+            await response.close()
+
+
+async def _supervise(
+    stream: Awaitable[None],
+    state: _StreamState,
+    deadlines: StreamDeadlines,
+    cancel_event: Optional[asyncio.Event] = None,
+) -> None:
+    if not deadlines.enabled and cancel_event is None:
+        await stream
+        return
+    task = asyncio.ensure_future(stream)
+    waiter = asyncio.ensure_future(cancel_event.wait()) if cancel_event is not None else None
+    watched = {task} if waiter is None else {task, waiter}
+    try:
+        while True:
+            args = (state.start, state.first_token_at, state.last_token_at)
+            wait = deadlines.seconds_until_next(*args, time.perf_counter())
+            if wait is None and deadlines.stall_seconds is not None and state.first_token_at is None:
+                wait = 0.25
+            done, _ = await asyncio.wait(
+                watched,
+                timeout=wait,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if task in done:
+                task.result()
+                return
+            if waiter is not None and waiter in done:
+                state.cancel_reason = CANCEL_HEDGE_LOST
+            if state.check_deadlines(deadlines) is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if waiter is not None:
+            waiter.cancel()
+
+
+async def _replay_cached(
+    state: _StreamState,
+    cached: CachedResponse,
+    replay: str,
+) -> None:
+    state.cache = CACHE_HIT
+    state.status_code = 200
+    for offset, data in cached.events():
+        if replay == REPLAY_TIMING:
+            wait = state.start + offset - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        if not state.feed(data, time.perf_counter()):
+            break
+
+
+async def _backoff(delay: float, cancel_event: Optional[asyncio.Event]) -> None:
+    if cancel_event is None:
+        await asyncio.sleep(delay)
+        return
+    # A hedge leg that loses while backing off stops waiting straight away.
+    try:
+        await asyncio.wait_for(cancel_event.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def async_stream_chat(
+    api_url: str,
+    api_key: str,
+    prompt: str,
+    model: str = "zai-org/GLM-4.6",
+    receipt_dir: Optional[Path] = None,
+    receipt_label: str = "",
+    request_params: Optional[Dict[str, object]] = None,
+    stall_threshold_seconds: Optional[float] = None,
+    content_mode: str = "content_or_reasoning",
+    output_handler: Optional[Callable[[str], None]] = None,
+    error_handler: Optional[Callable[[str], None]] = None,
+    trace_chunks: bool = False,
+    output_settings: Optional[OutputSettings] = None,
+    deadlines: Optional[StreamDeadlines] = None,
+    cancel_event: Optional[asyncio.Event] = None,
+    first_token_handler: Optional[Callable[[], None]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    response_cache: Optional[ResponseCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breakers: Optional[CircuitBreakers] = None,
+    messages: Optional[List[Dict[str, object]]] = None,
+    event_handler: Optional[Callable[[str], bool]] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    attempt_handler: Optional[Callable[[int], None]] = None,
+    provider: Optional[str] = None,
+) -> StreamResult:
+    headers = _build_headers(api_key)
+    payload = _build_payload(model, prompt, request_params, messages)
+    provider = _provider_name(provider, api_url)
+    body = json.dumps(payload).encode("utf-8")
+    output = _open_output(output_handler, output_settings)
+    emit = output or output_handler or _safe_write
+    emit_error = error_handler or (lambda msg: print(msg))
+    if deadlines is None:
+        deadlines = load_stream_deadlines()
+    policy = retry_policy or load_retry_policy()
+    cache = response_cache or get_response_cache()
+    cache_key = cache.key_for(api_url, model, prompt, request_params)
+    cached = cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        state = _StreamState(
+            content_mode,
+            stall_threshold_seconds,
+            receipt=None,
+            emit=emit,
+            trace_chunks=trace_chunks,
+            output=output,
+            on_first_token=first_token_handler,
+            on_event=event_handler,
+        )
+        try:
+            await _replay_cached(state, cached, cache.settings.replay)
+        except (OSError, ValueError) as exc:
+            return _fail_stream(state, f"Unreadable cache entry {cached.path}: {exc}", emit_error)
+        return _finish_stream(state, receipt_label, model, api_url, prompt)
+
+    registry = metrics or get_metrics_registry()
+    breakers = circuit_breakers or get_circuit_breakers()
+    ticket = _admit_circuit(breakers, provider, model, emit_error)
+    if ticket is not None and ticket.rejected:
+        state = _StreamState(content_mode, stall_threshold_seconds, receipt=None, emit=emit, output=output)
+        result = _short_circuit(breakers, ticket, state, emit_error)
+        _observe_metrics(registry, provider, model, state, result)
+        return result
+    limiter = rate_limiter or get_rate_limiter()
+    attempt = 1
+    backoff_seconds = 0.0
+    rate_limit_wait = 0.0
+    retry_errors: List[str] = []
+    retry_statuses: List[Optional[int]] = []
+    try:
+        while True:
+            reservation = limiter.reserve(provider, model, prompt, request_params)
+            if reservation is not None and reservation.wait_seconds > 0:
+                started_wait = time.perf_counter()
+                await _backoff(reservation.wait_seconds, cancel_event)
+                rate_limit_wait += time.perf_counter() - started_wait
+            if cancel_event is not None and cancel_event.is_set():
+                # The hedge was decided while this leg waited for budget or a
+                # retry backoff; fail it without sending another request.
+                state = _StreamState(content_mode, stall_threshold_seconds, receipt=None, emit=emit, output=output)
+                state.cancel_reason = CANCEL_HEDGE_LOST
+                _settle_reservation(reservation, state)
+                result = _fail_stream(state, cancel_message(CANCEL_HEDGE_LOST, deadlines), emit_error)
+                break
+            if attempt_handler is not None:
+                attempt_handler(attempt)
+            state = _StreamState(
+                content_mode,
+                stall_threshold_seconds,
+                receipt=_open_receipt(receipt_dir, receipt_label, model),
+                emit=emit,
+                trace_chunks=trace_chunks,
+                output=output,
+                on_first_token=first_token_handler,
+                on_event=event_handler,
+                collect_gaps=registry.enabled,
+            )
+            if cache_key is not None:
+                state.cache = CACHE_MISS
+                state.recorder = cache.recorder(cache_key, _cache_header(api_url, model, state))
+            error: Optional[str] = None
+            try:
+                await _supervise(
+                    _read_stream(state, api_url, headers, body),
+                    state,
+                    deadlines,
+                    cancel_event,
+                )
+            except AsyncRequestError as exc:
+                if exc.status_code is not None:
+                    state.status_code = exc.status_code
+                error = str(exc)
+            _settle_reservation(reservation, state)
+            if state.cancel_reason is not None:
+                error = cancel_message(state.cancel_reason, deadlines)
+            if error is None:
+                result = _finish_stream(state, receipt_label, model, api_url, prompt)
+                break
+            delay = _retry_delay(state, policy, attempt)
+            if delay is None or (cancel_event is not None and cancel_event.is_set()):
+                result = _fail_stream(state, error, emit_error)
+                break
+            _abandon_attempt(
+                state, error, delay, attempt, policy, emit_error, registry, provider, model
+            )
+            retry_errors.append(error)
+            retry_statuses.append(state.status_code)
+            await _backoff(delay, cancel_event)
+            backoff_seconds += delay
+            attempt += 1
+    except BaseException:
+        # Covers cancellation of a load or hedge task; see ``stream_chat``.
+        breakers.release(ticket)
+        raise
+    result = _record_circuit(breakers, ticket, result, emit_error)
+    _observe_metrics(registry, provider, model, state, result)
+    return _with_attempts(result, attempt, backoff_seconds, retry_errors, retry_statuses, rate_limit_wait)
@@ -0,0 +1,227 @@
+"""Disk-backed LRU cache of deterministic streamed responses."""
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from shared.hashes import sha256_json
+
+from .utils import is_enabled
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+
+REPLAY_INSTANT = "instant"
+REPLAY_TIMING = "timing"
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    enabled: bool = False
+    directory: Path = Path("data") / "cache"
+    max_bytes: int = 256 * 1024 * 1024
+    replay: str = REPLAY_INSTANT
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "directory": str(self.directory),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 3),
+            "replay": self.replay,
+        }
+
+
+def load_cache_settings() -> CacheSettings:
+    enabled = is_enabled(os.getenv("RESPONSE_CACHE"), default=False)
+    directory = Path(os.getenv("RESPONSE_CACHE_DIR", "").strip() or CacheSettings.directory)
+    max_mb = 256.0
+    raw_max = os.getenv("RESPONSE_CACHE_MAX_MB", "").strip()
+    if raw_max:
+        try:
+            max_mb = float(raw_max)
+        except ValueError:
+            print(f"Warning: Invalid RESPONSE_CACHE_MAX_MB='{raw_max}', using default.")
+        if max_mb <= 0:
+            max_mb = 256.0
+    replay = os.getenv("RESPONSE_CACHE_REPLAY", "").strip().lower() or REPLAY_INSTANT
+    if replay not in (REPLAY_INSTANT, REPLAY_TIMING):
+        print(f"Warning: Invalid RESPONSE_CACHE_REPLAY='{replay}', using {REPLAY_INSTANT}.")
+        replay = REPLAY_INSTANT
+    return CacheSettings(
+        enabled=enabled,
+        directory=directory,
+        max_bytes=int(max_mb * 1024 * 1024),
+        replay=replay,
+    )
+
+
+def is_deterministic(request_params: Optional[Dict[str, object]]) -> bool:
+    """Only greedy, seeded requests can be expected to return the same stream."""
+    if not request_params:
+        return False
+    temperature = request_params.get("temperature")
+    return (
+        isinstance(temperature, (int, float))
+        and float(temperature) == 0.0
+        and request_params.get("seed") is not None
+    )
+
+
+def cache_key(
+    api_url: str,
+    model: str,
+    prompt: str,
+    request_params: Optional[Dict[str, object]],
+) -> str:
+    params = {key: value for key, value in (request_params or {}).items() if value is not None}
+    return sha256_json(
+        {
+            "api_url": api_url,
+            "model": model,
+            "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "request_params": params,
+        }
+    )
+
+
+class CachedResponse:
+    """A cached stream on disk; events are read lazily as ``(offset_seconds, data)``."""
+
+    def __init__(self, path: Path, header: Dict[str, object]) -> None:
+        self.path = path
+        self.header = header
+
+    def events(self) -> Iterator[Tuple[float, str]]:
+        with self.path.open("r", encoding="utf-8") as handle:
+            handle.readline()
+            for line in handle:
+                offset, data = json.loads(line)
+                yield float(offset), data
+
+
+class CacheRecorder:
+    """Spools a live stream's SSE data with arrival offsets, then publishes it."""
+
+    def __init__(self, cache: "ResponseCache", key: str, header: Dict[str, object]) -> None:
+        self._cache = cache
+        self._key = key
+        self._handle: Optional[TextIO] = None
+        try:
+            cache.settings.directory.mkdir(parents=True, exist_ok=True)
+            self._handle = tempfile.NamedTemporaryFile(
+                mode="w",
+                encoding="utf-8",
+                dir=cache.settings.directory,
+                prefix=".cache_",
+                suffix=".partial",
+                delete=False,
+            )
+            self._handle.write(json.dumps(dict(header, key=key), sort_keys=True))
+            self._handle.write("\n")
+        except OSError as exc:
+            print(f"Warning: Unable to write response cache: {exc}")
+            self.discard()
+
+    def add(self, offset_seconds: float, data: str) -> None:
+        if self._handle is None:
+            return
+        try:
+            self._handle.write(json.dumps([round(offset_seconds, 6), data], ensure_ascii=False))
+            self._handle.write("\n")
+        except OSError as exc:
+            print(f"Warning: Unable to write response cache: {exc}")
+            self.discard()
+
+    def commit(self) -> None:
+        if self._handle is None:
+            return
+        handle, self._handle = self._handle, None
+        try:
+            handle.close()
+            os.replace(handle.name, self._cache.path_for(self._key))
+        except OSError as exc:
+            print(f"Warning: Unable to write response cache: {exc}")
+            _unlink(Path(handle.name))
+            return
+        self._cache.evict()
+
+    def discard(self) -> None:
+        if self._handle is None:
+            return
+        handle, self._handle = self._handle, None
+        handle.close()
+        _unlink(Path(handle.name))
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class ResponseCache:
+    """One file per key; recency is the file mtime, refreshed on every hit."""
+
+    def __init__(self, settings: CacheSettings) -> None:
+        self.settings = settings
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.settings.directory / f"{key}.jsonl"
+
+    def key_for(
+        self,
+        api_url: str,
+        model: str,
+        prompt: str,
+        request_params: Optional[Dict[str, object]],
+    ) -> Optional[str]:
+        if not self.settings.enabled or not is_deterministic(request_params):
+            return None
+        return cache_key(api_url, model, prompt, request_params)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self.path_for(key)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                header = json.loads(handle.readline())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(path, header)
+
+    def recorder(self, key: str, header: Dict[str, object]) -> CacheRecorder:
+        return CacheRecorder(self, key, header)
+
+    def evict(self) -> None:
+        with self._lock:
+            try:
+                entries = [
+                    (entry.stat().st_mtime, entry.stat().st_size, entry)
+                    for entry in self.settings.directory.glob("*.jsonl")
+                ]
+            except OSError:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda item: item[0]):
+                if total <= self.settings.max_bytes:
+                    break
+                _unlink(entry)
+                total -= size
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(load_cache_settings())
+        return _default_cache
@@ -0,0 +1,262 @@
+"""Per-provider/model circuit breakers so unhealthy endpoints fail fast."""
+from collections import deque
+from dataclasses import dataclass
+import os
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .deadlines import CANCEL_CLIENT_CLOSED, CANCEL_HEDGE_LOST
+from .retry import RETRYABLE_STATUS_CODES
+from .utils import is_enabled
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_FAILURE = "failure"
+# Failures that say nothing about endpoint health (bad request, lost hedge, client gone).
+OUTCOME_NEUTRAL = "neutral"
+
+
+@dataclass(frozen=True)
+class CircuitSettings:
+    enabled: bool = False
+    consecutive_failures: int = 5
+    error_rate: float = 0.5
+    window: int = 20
+    open_seconds: float = 30.0
+    probes: int = 1
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": self.error_rate,
+            "window": self.window,
+            "open_ms": round(self.open_seconds * 1000, 3),
+            "probes": self.probes,
+        }
+
+
+def _positive_env(key: str, default: float, integer: bool = False) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw) if integer else float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default
+    if value <= 0:
+        print(f"Warning: {key} must be > 0, using default.")
+        return default
+    return value
+
+
+def load_circuit_settings() -> CircuitSettings:
+    if not is_enabled(os.getenv("CIRCUIT_BREAKER", "0")):
+        return CircuitSettings()
+    error_rate = _positive_env("CIRCUIT_ERROR_RATE", CircuitSettings.error_rate)
+    if error_rate > 1:
+        print("Warning: CIRCUIT_ERROR_RATE must be at most 1, using default.")
+        error_rate = CircuitSettings.error_rate
+    return CircuitSettings(
+        enabled=True,
+        consecutive_failures=int(
+            _positive_env("CIRCUIT_FAILURES", CircuitSettings.consecutive_failures, integer=True)
+        ),
+        error_rate=error_rate,
+        window=int(_positive_env("CIRCUIT_WINDOW", CircuitSettings.window, integer=True)),
+        open_seconds=_positive_env("CIRCUIT_OPEN_MS", CircuitSettings.open_seconds * 1000) / 1000.0,
+        probes=int(_positive_env("CIRCUIT_PROBES", CircuitSettings.probes, integer=True)),
+    )
+
+
+def classify_outcome(
+    error: Optional[str],
+    status_code: Optional[int],
+    cancel_reason: Optional[str],
+) -> str:
+    if error is None:
+        return OUTCOME_SUCCESS
+    if cancel_reason in (CANCEL_HEDGE_LOST, CANCEL_CLIENT_CLOSED):
+        return OUTCOME_NEUTRAL
+    if status_code is not None and 400 <= status_code < 500 and status_code not in RETRYABLE_STATUS_CODES:
+        return OUTCOME_NEUTRAL
+    return OUTCOME_FAILURE
+
+
+class Circuit:
+    """One endpoint's breaker.
+
+    Closed: requests pass; ``consecutive_failures`` failures in a row, or an
+    error rate of at least ``error_rate`` over a full window of ``window``
+    requests, opens it. Open: requests are rejected without touching the
+    network until ``open_seconds`` pass. Half-open: one probe at a time is let
+    through; ``probes`` successes close the circuit, any failure reopens it.
+    """
+
+    def __init__(self, provider: str, model: str, settings: CircuitSettings) -> None:
+        self.provider = provider
+        self.model = model
+        self.settings = settings
+        self.state = STATE_CLOSED
+        self.consecutive = 0
+        self.outcomes: Deque[bool] = deque(maxlen=settings.window)
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_successes = 0
+        self.short_circuits = 0
+        self.transitions: List[Dict[str, object]] = []
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+    def _move(self, state: str, reason: str, now: float) -> str:
+        self.transitions.append(
+            {
+                "at": round(now, 3),
+                "from": self.state,
+                "to": state,
+                "reason": reason,
+            }
+        )
+        self.state = state
+        if state == STATE_OPEN:
+            self.opened_at = now
+        if state == STATE_CLOSED:
+            self.consecutive = 0
+            self.outcomes.clear()
+        if state != STATE_HALF_OPEN:
+            self.probe_successes = 0
+        return f"Circuit {self.label} {state.replace('_', '-')}: {reason}"
+
+    def admit(self, now: float) -> Tuple[str, Optional[str]]:
+        """Returns the admission tag (closed, half_open probe, or open = rejected) and any transition note."""
+        note = None
+        if self.state == STATE_OPEN and now - self.opened_at >= self.settings.open_seconds:
+            note = self._move(STATE_HALF_OPEN, "cooldown elapsed, probing", now)
+        if self.state == STATE_CLOSED:
+            return STATE_CLOSED, note
+        if self.state == STATE_HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return STATE_HALF_OPEN, note
+        self.short_circuits += 1
+        return STATE_OPEN, note
+
+    def retry_in(self, now: float) -> float:
+        return max(0.0, self.settings.open_seconds - (now - self.opened_at))
+
+    def record(self, admitted: str, outcome: str, now: float) -> Optional[str]:
+        if admitted == STATE_HALF_OPEN:
+            self.probe_in_flight = False
+        if admitted == STATE_OPEN or outcome == OUTCOME_NEUTRAL:
+            return None
+        failed = outcome == OUTCOME_FAILURE
+        if self.state == STATE_HALF_OPEN:
+            if admitted != STATE_HALF_OPEN:
+                # A request admitted before the circuit opened; the probe decides.
+                return None
+            if failed:
+                return self._move(STATE_OPEN, "probe failed", now)
+            self.probe_successes += 1
+            if self.probe_successes >= self.settings.probes:
+                return self._move(STATE_CLOSED, f"{self.probe_successes} probe(s) succeeded", now)
+            return None
+        if self.state == STATE_OPEN:
+            return None
+        self.consecutive = self.consecutive + 1 if failed else 0
+        self.outcomes.append(failed)
+        if self.consecutive >= self.settings.consecutive_failures:
+            return self._move(STATE_OPEN, f"{self.consecutive} consecutive failures", now)
+        if len(self.outcomes) == self.outcomes.maxlen:
+            rate = sum(self.outcomes) / len(self.outcomes)
+            if rate >= self.settings.error_rate:
+                return self._move(STATE_OPEN, f"error rate {rate:.0%} over {len(self.outcomes)} requests", now)
+        return None
+
+    def as_record(self) -> Dict[str, object]:
+        return {
+            "type": "circuit",
+            "provider": self.provider,
+            "model": self.model,
+            "state": self.state,
+            "short_circuits": self.short_circuits,
+            "transitions": list(self.transitions),
+        }
+
+
+class CircuitTicket:
+    def __init__(self, circuit: Circuit, admitted: str) -> None:
+        self.circuit = circuit
+        self.admitted = admitted
+
+    @property
+    def rejected(self) -> bool:
+        return self.admitted == STATE_OPEN
+
+
+class CircuitBreakers:
+    def __init__(self, settings: CircuitSettings) -> None:
+        self.settings = settings
+        self._circuits: Dict[Tuple[str, str], Circuit] = {}
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def _now(self) -> float:
+        return time.monotonic() - self._start
+
+    def admit(self, provider: str, model: str) -> Tuple[Optional[CircuitTicket], Optional[str]]:
+        """Returns None when breakers are off; a rejected ticket means fail fast."""
+        if not self.settings.enabled:
+            return None, None
+        with self._lock:
+            key = (provider, model)
+            if key not in self._circuits:
+                self._circuits[key] = Circuit(provider, model, self.settings)
+            circuit = self._circuits[key]
+            admitted, note = circuit.admit(self._now())
+            return CircuitTicket(circuit, admitted), note
+
+    def rejection(self, ticket: CircuitTicket) -> str:
+        with self._lock:
+            wait = ticket.circuit.retry_in(self._now())
+        return f"Circuit open for {ticket.circuit.label}; short-circuited (next probe in {wait:.1f}s)"
+
+    def record(
+        self,
+        ticket: Optional[CircuitTicket],
+        error: Optional[str],
+        status_code: Optional[int],
+        cancel_reason: Optional[str],
+    ) -> Optional[str]:
+        if ticket is None:
+            return None
+        outcome = classify_outcome(error, status_code, cancel_reason)
+        with self._lock:
+            return ticket.circuit.record(ticket.admitted, outcome, self._now())
+
+    def release(self, ticket: Optional[CircuitTicket]) -> None:
+        """Frees an admission that ended in an exception instead of a result; counts as neutral."""
+        if ticket is None:
+            return
+        with self._lock:
+            ticket.circuit.record(ticket.admitted, OUTCOME_NEUTRAL, self._now())
+
+    def as_records(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [circuit.as_record() for circuit in self._circuits.values()]
+
+
+_default_breakers: Optional[CircuitBreakers] = None
+_default_lock = threading.Lock()
+
+
+def get_circuit_breakers() -> CircuitBreakers:
+    global _default_breakers
+    with _default_lock:
+        if _default_breakers is None:
+            _default_breakers = CircuitBreakers(load_circuit_settings())
+        return _default_breakers
@@ -0,0 +1,176 @@
+"""Time-to-first-token, total and stall deadlines for a single stream."""
+from dataclasses import dataclass
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+CANCEL_TTFT = "ttft_deadline"
+CANCEL_TOTAL = "total_deadline"
+CANCEL_STALL = "stall_deadline"
+CANCEL_HEDGE_LOST = "hedge_lost"
+# The consumer of raw events (e.g. a gateway client) went away.
+CANCEL_CLIENT_CLOSED = "client_closed"
+
+
+def _ms_env(key: str) -> Optional[float]:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', ignoring.")
+        return None
+    if value <= 0:
+        return None
+    return value / 1000.0
+
+
+@dataclass(frozen=True)
+class StreamDeadlines:
+    ttft_seconds: Optional[float] = None
+    total_seconds: Optional[float] = None
+    stall_seconds: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.ttft_seconds, self.total_seconds, self.stall_seconds)
+        )
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        def to_ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "ttft_ms": to_ms(self.ttft_seconds),
+            "total_ms": to_ms(self.total_seconds),
+            "stall_ms": to_ms(self.stall_seconds),
+        }
+
+    def _limits(
+        self,
+        start: float,
+        first_token_at: Optional[float],
+        last_token_at: Optional[float],
+    ) -> Iterator[Tuple[str, float]]:
+        if self.total_seconds is not None:
+            yield CANCEL_TOTAL, start + self.total_seconds
+        if first_token_at is None:
+            if self.ttft_seconds is not None:
+                yield CANCEL_TTFT, start + self.ttft_seconds
+        elif self.stall_seconds is not None and last_token_at is not None:
+            yield CANCEL_STALL, last_token_at + self.stall_seconds
+
+    def expired(
+        self,
+        start: float,
+        first_token_at: Optional[float],
+        last_token_at: Optional[float],
+        now: float,
+    ) -> Optional[str]:
+        for reason, limit in self._limits(start, first_token_at, last_token_at):
+            if now >= limit:
+                return reason
+        return None
+
+    def seconds_until_next(
+        self,
+        start: float,
+        first_token_at: Optional[float],
+        last_token_at: Optional[float],
+        now: float,
+    ) -> Optional[float]:
+        limits = [limit for _, limit in self._limits(start, first_token_at, last_token_at)]
+        if not limits:
+            return None
+        return max(0.0, min(limits) - now)
+
+    def limit_for(self, reason: str) -> Optional[float]:
+        return {
+            CANCEL_TTFT: self.ttft_seconds,
+            CANCEL_TOTAL: self.total_seconds,
+            CANCEL_STALL: self.stall_seconds,
+        }.get(reason)
+
+
+def load_stream_deadlines() -> StreamDeadlines:
+    return StreamDeadlines(
+        ttft_seconds=_ms_env("STREAM_TTFT_TIMEOUT_MS"),
+        total_seconds=_ms_env("STREAM_TOTAL_TIMEOUT_MS"),
+        stall_seconds=_ms_env("STREAM_STALL_ABORT_MS"),
+    )
+
+
+def cancel_message(reason: str, deadlines: StreamDeadlines) -> str:
+    limit = deadlines.limit_for(reason)
+    if limit is None:
+        return f"Cancelled: {reason}"
+    return f"Cancelled: {reason} exceeded ({limit * 1000:.0f} ms)"
+
+
+def _shutdown_response(response: object) -> None:
+    raw = getattr(response, "raw", None)
+    shutdown = getattr(raw, "shutdown", None)
+    if callable(shutdown):
+        shutdown()
+        return
+    connection = getattr(raw, "connection", None) or getattr(raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class StreamWatchdog:
+    """Background thread that aborts a blocking ``requests`` stream past its deadlines.
+
+    ``state`` is the stream's bookkeeping object; the watchdog reads ``start``,
+    ``first_token_at`` and ``last_token_at`` from it and sets ``cancel_reason``.
+    """
+
+    def __init__(self, state: object, deadlines: StreamDeadlines) -> None:
+        self._state = state
+        self._deadlines = deadlines
+        self._response: Optional[object] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="stream-watchdog", daemon=True)
+        self._thread.start()
+
+    def arm(self, response: object) -> None:
+        with self._lock:
+            self._response = response
+            cancelled = getattr(self._state, "cancel_reason", None) is not None
+        if cancelled:
+            _shutdown_response(response)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            state = self._state
+            now = time.perf_counter()
+            args = (state.start, state.first_token_at, state.last_token_at)
+            reason = self._deadlines.expired(*args, now)
+            if reason is not None:
+                with self._lock:
+                    state.cancel_reason = reason
+                    response = self._response
+                if response is not None:
+                    _shutdown_response(response)
+                return
+            wait = self._deadlines.seconds_until_next(*args, now)
+            if wait is None:
+                if self._deadlines.stall_seconds is None or state.first_token_at is not None:
+                    return
+                # Only a stall deadline is set: poll until the first token starts the clock.
+                wait = 0.25
+            self._stop.wait(min(wait, 1.0) + 0.001)
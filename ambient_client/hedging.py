@@ -0,0 +1,195 @@
+"""Hedged streaming: race a backup provider/model against a slow primary."""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from shared.stats import percentile
+
+from .cache import CACHE_HIT
+from .streaming import StreamResult, _safe_write
+
+PRIMARY = "primary"
+BACKUP = "backup"
+
+
+@dataclass(frozen=True)
+class HedgeLeg:
+    provider: str
+    api_url: str
+    api_key: str
+    model: str
+    receipt_dir: Optional[Path] = None
+
+
+@dataclass(frozen=True)
+class HedgeResult:
+    result: StreamResult
+    winner: str
+    fired: bool
+    delay_seconds: float
+    primary: StreamResult
+    backup: Optional[StreamResult] = None
+
+    @property
+    def loser(self) -> Optional[StreamResult]:
+        if not self.fired:
+            return None
+        return self.backup if self.winner == PRIMARY else self.primary
+
+    def as_dict(self, primary_leg: HedgeLeg, backup_leg: HedgeLeg, prompt: str) -> Dict[str, object]:
+        winner_leg = primary_leg if self.winner == PRIMARY else backup_leg
+        record: Dict[str, object] = {
+            "fired": self.fired,
+            "delay_ms": round(self.delay_seconds * 1000, 3),
+            "winner": self.winner,
+            "winner_provider": winner_leg.provider,
+            "winner_model": winner_leg.model,
+            "backup_provider": backup_leg.provider,
+            "backup_model": backup_leg.model,
+        }
+        loser = self.loser
+        if loser is not None:
+            # The prompt was sent twice; anything the loser generated before it
+            # was cancelled is also billed but never shown.
+            record.update(
+                {
+                    "loser_ttc_ms": round(loser.ttc_seconds * 1000, 3),
+                    "loser_cancel_reason": loser.cancel_reason,
+                    "duplicate_prompt_chars": len(prompt),
+                    "duplicate_output_chars": loser.content_chars + loser.reasoning_chars,
+                    "duplicate_usage": loser.usage,
+                }
+            )
+        return record
+
+
+def hedge_delay_from_bench(
+    paths: List[str],
+    provider: str,
+    model: str,
+    quantile: float,
+) -> Optional[float]:
+    """Learns the hedge delay as a TTFT percentile of past successful bench runs."""
+    from report_tools.io_utils import load_run_records
+
+    ttfb_ms = [
+        float(record["ttfb_ms"])
+        for record in load_run_records(paths, include_warmup=False)
+        if record.get("provider") == provider
+        and record.get("model") == model
+        and record.get("success")
+        and record.get("ttfb_ms") is not None
+        # A hedged run the backup won measured the backup, not this model.
+        and (record.get("hedge") or {}).get("winner") != BACKUP
+        # A cache hit measured a local replay.
+        and record.get("cache") != CACHE_HIT
+    ]
+    value = percentile(ttfb_ms, quantile)
+    return None if value is None else value / 1000.0
+
+
+async def hedged_stream_chat(
+    primary: HedgeLeg,
+    backup: HedgeLeg,
+    prompt: str,
+    delay_seconds: float,
+    output_handler: Optional[Callable[[str], None]] = None,
+    error_handler: Optional[Callable[[str], None]] = None,
+    **stream_kwargs: object,
+) -> HedgeResult:
+    """Streams from ``primary`` and fires ``backup`` if no token arrives within the delay.
+
+    The first leg to produce a token wins and is the only one whose text reaches
+    ``output_handler``; the other leg is cancelled with ``cancel_reason=hedge_lost``.
+    """
+    # The asyncio engine loads only when a hedge actually runs.
+    import asyncio
+
+    from .async_streaming import async_stream_chat
+
+    emit = output_handler or _safe_write
+    emit_error = error_handler or (lambda msg: print(msg))
+    winner: List[str] = []
+    errors: Dict[str, List[str]] = {PRIMARY: [], BACKUP: []}
+    cancel_events = {PRIMARY: asyncio.Event(), BACKUP: asyncio.Event()}
+    token_seen = asyncio.Event()
+
+    def first_token(name: str) -> Callable[[], None]:
+        def handler() -> None:
+            if not winner:
+                winner.append(name)
+                other = BACKUP if name == PRIMARY else PRIMARY
+                cancel_events[other].set()
+                token_seen.set()
+
+        return handler
+
+    def forward(name: str) -> Callable[[str], None]:
+        def handler(text: str) -> None:
+            if winner and winner[0] == name:
+                emit(text)
+
+        return handler
+
+    def start(name: str, leg: HedgeLeg) -> "asyncio.Task[StreamResult]":
+        return asyncio.ensure_future(
+            async_stream_chat(
+                leg.api_url,
+                leg.api_key,
+                prompt,
+                leg.model,
+                receipt_dir=leg.receipt_dir,
+                receipt_label=leg.provider,
+                provider=leg.provider,
+                output_handler=forward(name),
+                error_handler=lambda msg: errors[name].append(msg),
+                cancel_event=cancel_events[name],
+                first_token_handler=first_token(name),
+                **stream_kwargs,
+            )
+        )
+
+    primary_task = start(PRIMARY, primary)
+    backup_task: Optional["asyncio.Task[StreamResult]"] = None
+    token_waiter = asyncio.ensure_future(token_seen.wait())
+    try:
+        # Wait for the primary's first token, the primary finishing, or the delay.
+        await asyncio.wait(
+            {primary_task, token_waiter},
+            timeout=max(0.0, delay_seconds),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        token_waiter.cancel()
+        primary_failed = primary_task.done() and not primary_task.result().success
+        if not winner and (not primary_task.done() or primary_failed):
+            backup_task = start(BACKUP, backup)
+        tasks = [task for task in (primary_task, backup_task) if task is not None]
+        results = await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        token_waiter.cancel()
+        for task in (primary_task, backup_task):
+            if task is not None:
+                task.cancel()
+        raise
+
+    primary_result = results[0]
+    backup_result = results[1] if backup_task is not None else None
+    if winner:
+        name = winner[0]
+    elif primary_result.success or backup_result is None or not backup_result.success:
+        name = PRIMARY
+        emit("\n")
+    else:
+        name = BACKUP
+        emit("\n")
+    for message in errors[name]:
+        emit_error(message)
+    result = primary_result if name == PRIMARY else backup_result
+    return HedgeResult(
+        result=result,
+        winner=name,
+        fired=backup_task is not None,
+        delay_seconds=delay_seconds,
+        primary=primary_result,
+        backup=backup_result,
+    )
@@ -0,0 +1,278 @@
+"""In-process metrics registry for streams, exported as OpenMetrics text."""
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KIND_COUNTER = "counter"
+KIND_HISTOGRAM = "histogram"
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+GAP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RATE_BUCKETS = (5.0, 10.0, 25.0, 50.0, 100.0, 200.0, 400.0, 800.0)
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    name: str
+    kind: str
+    help: str
+    labels: Tuple[str, ...] = ("provider", "model")
+    buckets: Tuple[float, ...] = ()
+
+
+FAMILIES = (
+    MetricFamily("ambient_stream_ttft_seconds", KIND_HISTOGRAM, "Time to first token.", buckets=LATENCY_BUCKETS),
+    MetricFamily("ambient_stream_ttc_seconds", KIND_HISTOGRAM, "Time to completion.", buckets=LATENCY_BUCKETS),
+    MetricFamily(
+        "ambient_stream_chunk_gap_seconds",
+        KIND_HISTOGRAM,
+        "Gap between consecutive emitted chunks.",
+        buckets=GAP_BUCKETS,
+    ),
+    MetricFamily(
+        "ambient_stream_decode_tokens_per_second",
+        KIND_HISTOGRAM,
+        "Completion tokens after the first, over first-to-last token time (streams that report usage).",
+        buckets=RATE_BUCKETS,
+    ),
+    MetricFamily("ambient_stream_requests", KIND_COUNTER, "Finished streams.", ("provider", "model", "outcome")),
+    MetricFamily(
+        "ambient_stream_errors",
+        KIND_COUNTER,
+        "Failed attempts, retried ones included, by HTTP status, or cancel reason / transport when there is none.",
+        ("provider", "model", "status"),
+    ),
+    MetricFamily("ambient_stream_parse_errors", KIND_COUNTER, "SSE payloads that were not valid JSON."),
+    MetricFamily("ambient_stream_stalls", KIND_COUNTER, "Inter-chunk gaps at or above the stall threshold."),
+    MetricFamily("ambient_receipt_writes", KIND_COUNTER, "Receipt files written or failed.", ("provider", "model", "result")),
+)
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    file: Optional[Path] = None
+    port: Optional[int] = None
+    host: str = "127.0.0.1"
+    interval_seconds: float = 15.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.file is not None or self.port is not None
+
+
+def load_metrics_settings() -> MetricsSettings:
+    raw_file = os.getenv("METRICS_FILE", "").strip()
+    port = None
+    raw_port = os.getenv("METRICS_PORT", "").strip()
+    if raw_port:
+        try:
+            port = int(raw_port)
+        except ValueError:
+            print(f"Warning: Invalid METRICS_PORT='{raw_port}', metrics endpoint disabled.")
+        else:
+            if not 0 < port < 65536:
+                print("Warning: METRICS_PORT must be between 1 and 65535, metrics endpoint disabled.")
+                port = None
+    interval = MetricsSettings.interval_seconds
+    raw_interval = os.getenv("METRICS_INTERVAL_S", "").strip()
+    if raw_interval:
+        try:
+            interval = float(raw_interval)
+        except ValueError:
+            print(f"Warning: Invalid METRICS_INTERVAL_S='{raw_interval}', using default.")
+        if interval <= 0:
+            print("Warning: METRICS_INTERVAL_S must be > 0, using default.")
+            interval = MetricsSettings.interval_seconds
+    return MetricsSettings(
+        file=Path(raw_file) if raw_file else None,
+        port=port,
+        host=os.getenv("METRICS_HOST", "").strip() or MetricsSettings.host,
+        interval_seconds=interval,
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Counters and cumulative histograms keyed by label values.
+
+    Every update is a no-op while no export is configured, so the streaming
+    engines can report unconditionally.
+    """
+
+    def __init__(self, settings: MetricsSettings) -> None:
+        self.settings = settings
+        self.families = {family.name: family for family in FAMILIES}
+        # Counter series hold [value]; histogram series hold per-bucket counts, then sum and count.
+        self._series: Dict[str, Dict[Tuple[str, ...], List[float]]] = {name: {} for name in self.families}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def _slot(self, family: MetricFamily, labels: Tuple[str, ...]) -> List[float]:
+        series = self._series[family.name]
+        if labels not in series:
+            size = 1 if family.kind == KIND_COUNTER else len(family.buckets) + 2
+            series[labels] = [0.0] * size
+        return series[labels]
+
+    def inc(self, name: str, labels: Tuple[str, ...], amount: float = 1.0) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._slot(self.families[name], labels)[0] += amount
+
+    def observe(self, name: str, labels: Tuple[str, ...], values: List[float]) -> None:
+        if not self.enabled or not values:
+            return
+        family = self.families[name]
+        buckets = family.buckets
+        with self._lock:
+            slot = self._slot(family, labels)
+            for value in values:
+                for index, bound in enumerate(buckets):
+                    if value <= bound:
+                        slot[index] += 1
+                slot[-2] += value
+                slot[-1] += 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for family in FAMILIES:
+                series = self._series[family.name]
+                lines.append(f"# TYPE {family.name} {family.kind}")
+                lines.append(f"# HELP {family.name} {family.help}")
+                for labels in sorted(series):
+                    pairs = list(zip(family.labels, labels))
+                    slot = series[labels]
+                    if family.kind == KIND_COUNTER:
+                        lines.append(f"{family.name}_total{_format_labels(pairs)} {_format_value(slot[0])}")
+                        continue
+                    for index, bound in enumerate(family.buckets):
+                        bucket_labels = _format_labels(pairs + [("le", repr(bound))])
+                        lines.append(f"{family.name}_bucket{bucket_labels} {_format_value(slot[index])}")
+                    inf_labels = _format_labels(pairs + [("le", "+Inf")])
+                    lines.append(f"{family.name}_bucket{inf_labels} {_format_value(slot[-1])}")
+                    lines.append(f"{family.name}_count{_format_labels(pairs)} {_format_value(slot[-1])}")
+                    lines.append(f"{family.name}_sum{_format_labels(pairs)} {_format_value(slot[-2])}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Replaces ``path`` atomically so a scraper never reads a half-written file."""
+        temp = path.with_name(f".{path.name}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp.write_text(self.render(), encoding="utf-8")
+            os.replace(temp, path)
+        except OSError as exc:
+            print(f"Warning: Unable to write metrics file {path}: {exc}")
+
+
+class MetricsExporter:
+    """Serves ``/metrics`` and/or rewrites the metrics file every ``interval_seconds``."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.settings = registry.settings
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server: Optional["ThreadingHTTPServer"] = None
+
+    def start(self) -> None:
+        if self.settings.port is not None:
+            from http.server import ThreadingHTTPServer
+
+            try:
+                server = ThreadingHTTPServer((self.settings.host, self.settings.port), _handler_class(self.registry))
+            except OSError as exc:
+                print(f"Warning: Unable to serve metrics on {self.settings.host}:{self.settings.port}: {exc}")
+            else:
+                server.daemon_threads = True
+                self._server = server
+                self._spawn(server.serve_forever)
+                print(f"Metrics: http://{self.settings.host}:{self.settings.port}/metrics")
+        if self.settings.file is not None:
+            self._spawn(self._write_loop)
+            print(f"Metrics file: {self.settings.file} (every {self.settings.interval_seconds:g}s)")
+
+    def _spawn(self, target: Callable[[], None]) -> None:
+        thread = threading.Thread(target=target, name="metrics-export", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.settings.interval_seconds):
+            self.registry.write(self.settings.file)
+
+    def stop(self) -> None:
+        """Stops exporting; the file gets one last write with the final totals."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.settings.file is not None:
+            self.registry.write(self.settings.file)
+
+
+def _handler_class(registry: MetricsRegistry) -> Type["BaseHTTPRequestHandler"]:
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0].rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            data = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return MetricsHandler
+
+
+def start_metrics_exporter(registry: Optional[MetricsRegistry] = None) -> Optional[MetricsExporter]:
+    """Starts the configured exports; returns None when metrics are off."""
+    registry = registry or get_metrics_registry()
+    if not registry.enabled:
+        return None
+    exporter = MetricsExporter(registry)
+    exporter.start()
+    return exporter
+
+
+_default_registry: Optional[MetricsRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry(load_metrics_settings())
+        return _default_registry
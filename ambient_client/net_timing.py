@@ -0,0 +1,90 @@
+"""urllib3 connections that timestamp DNS, TCP connect, TLS and request send.
+
+Imported only by the session pool when it builds an HTTP session, so offline
+paths never load the HTTP stack.
+"""
+import socket
+import time
+from typing import Dict
+
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+
+class _TimedConnection:
+    """Keeps ``perf_counter`` marks for the latest connect and request in ``timing``.
+
+    Marks: ``dns_started``, ``resolved``, ``connected``, ``tls_done`` (HTTPS only)
+    and ``request_sent``. A reused connection keeps the connect marks of the
+    request that opened it, so readers compare them against their own start.
+    """
+
+    is_tls = False
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        super().__init__(*args, **kwargs)
+        self.timing: Dict[str, float] = {}
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        self.timing["dns_started"] = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 resolve again and raise its usual error.
+            return super()._new_conn()
+        self.timing["resolved"] = time.perf_counter()
+        # Connecting to the resolved addresses keeps the lookup out of the connect
+        # time; the hostname is still used for the Host header, SNI and verification.
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        self.timing["connected"] = time.perf_counter()
+        return sock
+
+    def connect(self) -> None:
+        self.timing = {}
+        super().connect()
+        if self.is_tls:
+            self.timing["tls_done"] = time.perf_counter()
+
+    def request(self, *args: object, **kwargs: object) -> None:
+        super().request(*args, **kwargs)
+        self.timing["request_sent"] = time.perf_counter()
+
+
+# urllib3 puts class names in its error messages, so the subclasses keep them.
+class HTTPConnection(_TimedConnection, connection.HTTPConnection):
+    pass
+
+
+class HTTPSConnection(_TimedConnection, connection.HTTPSConnection):
+    is_tls = True
+
+
+class HTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = HTTPConnection
+
+
+class HTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = HTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args: object, **kwargs: object) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": HTTPConnectionPool,
+            "https": HTTPSConnectionPool,
+        }
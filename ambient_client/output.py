@@ -0,0 +1,116 @@
+"""Bounded, batched output pipeline for streamed text."""
+from dataclasses import dataclass
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .utils import is_enabled
+
+_CLOSE = object()
+
+
+@dataclass(frozen=True)
+class OutputSettings:
+    enabled: bool = True
+    queue_size: int = 1024
+    batch_chars: int = 4096
+    flush_interval_seconds: float = 0.05
+
+
+def _positive_env(key: str, default: float) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default
+    return value if value > 0 else default
+
+
+def load_output_settings() -> OutputSettings:
+    return OutputSettings(
+        enabled=is_enabled(os.getenv("OUTPUT_BATCHING"), default=True),
+        queue_size=int(_positive_env("OUTPUT_QUEUE_SIZE", 1024)),
+        batch_chars=int(_positive_env("OUTPUT_BATCH_CHARS", 4096)),
+        flush_interval_seconds=_positive_env("OUTPUT_FLUSH_MS", 50) / 1000.0,
+    )
+
+
+class BatchedWriter:
+    """Hands text to a consumer thread that writes it in size/time-bounded batches.
+
+    The producer only blocks when the bounded queue is full; that wait is the
+    backpressure the consumer added and is accumulated in ``backpressure_seconds``.
+    """
+
+    def __init__(self, write: Callable[[str], None], settings: OutputSettings) -> None:
+        self._write = write
+        self._settings = settings
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=settings.queue_size)
+        self._failed = False
+        self.backpressure_seconds = 0.0
+        self.backpressure_count = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="stream-output", daemon=True)
+        self._thread.start()
+
+    def __call__(self, text: str) -> None:
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            waited_from = time.perf_counter()
+            self._queue.put(text)
+            self.backpressure_seconds += time.perf_counter() - waited_from
+            self.backpressure_count += 1
+
+    def flush(self) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self) -> float:
+        """Drains pending output, stops the consumer and returns the drain time."""
+        started = time.perf_counter()
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        return time.perf_counter() - started
+
+    def _emit(self, pending: List[str]) -> None:
+        if not pending or self._failed:
+            return
+        try:
+            self._write("".join(pending))
+            self.batches += 1
+        except Exception as exc:  # keep draining so the producer never blocks forever
+            self._failed = True
+            print(f"Warning: Output writer failed: {exc}")
+
+    def _run(self) -> None:
+        pending: List[str] = []
+        size = 0
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, str):
+                pending.append(item)
+                size += len(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self._settings.flush_interval_seconds
+                if size < self._settings.batch_chars:
+                    continue
+            self._emit(pending)
+            pending = []
+            size = 0
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _CLOSE:
+                return
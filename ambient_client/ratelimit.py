@@ -0,0 +1,239 @@
+"""Per-provider/per-model token buckets for requests-per-minute and tokens-per-minute limits."""
+from dataclasses import dataclass
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+KIND_REQUESTS = "requests"
+KIND_TOKENS = "tokens"
+
+CHARS_PER_TOKEN = 4.0
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    burst_fraction: float = 0.1
+    completion_tokens: int = 1024
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "burst_fraction": self.burst_fraction,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def load_rate_limit_settings() -> RateLimitSettings:
+    burst = RateLimitSettings.burst_fraction
+    raw_burst = os.getenv("RATE_LIMIT_BURST", "").strip()
+    if raw_burst:
+        try:
+            burst = float(raw_burst)
+        except ValueError:
+            print(f"Warning: Invalid RATE_LIMIT_BURST='{raw_burst}', using default.")
+        if not 0 < burst < 1:
+            print("Warning: RATE_LIMIT_BURST must be between 0 and 1, using default.")
+            burst = RateLimitSettings.burst_fraction
+    completion = RateLimitSettings.completion_tokens
+    raw_completion = os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "").strip()
+    if raw_completion:
+        try:
+            completion = max(0, int(raw_completion))
+        except ValueError:
+            print(f"Warning: Invalid RATE_LIMIT_COMPLETION_TOKENS='{raw_completion}', using default.")
+    return RateLimitSettings(burst_fraction=burst, completion_tokens=completion)
+
+
+def _env_token(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_").upper() or "MODEL"
+
+
+def _limit_env(key: str) -> Optional[float]:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', ignoring.")
+        return None
+    if value <= 0:
+        print(f"Warning: {key} must be > 0, ignoring.")
+        return None
+    return value
+
+
+def estimate_tokens(
+    prompt: str,
+    request_params: Optional[Dict[str, object]],
+    settings: RateLimitSettings,
+) -> int:
+    """Prompt tokens (about four characters each) plus the completion the request may use."""
+    completion = (request_params or {}).get("max_tokens")
+    if not isinstance(completion, int) or completion <= 0:
+        completion = settings.completion_tokens
+    return math.ceil(len(prompt) / CHARS_PER_TOKEN) + completion
+
+
+class TokenBucket:
+    """Admits at most ``limit`` units in any 60 s window.
+
+    A small burst (``burst_fraction`` of the limit) is available up front and the
+    rest refills evenly, so the burst plus a minute of refill equals the limit.
+    Reservations may drive the level negative; the caller then waits until
+    the refill pays the debt, which queues concurrent callers in order.
+    """
+
+    def __init__(self, scope: str, kind: str, limit_per_minute: float, burst_fraction: float) -> None:
+        self.scope = scope
+        self.kind = kind
+        self.limit_per_minute = limit_per_minute
+        self.capacity = max(1.0, limit_per_minute * burst_fraction)
+        self.rate = max(limit_per_minute - self.capacity, limit_per_minute * 0.5) / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        self._refill(now)
+        self.level -= cost
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def credit(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "scope": self.scope,
+            "kind": self.kind,
+            "per_minute": self.limit_per_minute,
+            "burst": round(self.capacity, 3),
+        }
+
+
+class RateReservation:
+    def __init__(
+        self,
+        limiter: "RateLimiter",
+        buckets: List[TokenBucket],
+        estimated_tokens: int,
+        wait_seconds: float,
+    ) -> None:
+        self._limiter = limiter
+        self._buckets = buckets
+        self.estimated_tokens = estimated_tokens
+        self.wait_seconds = wait_seconds
+
+    def settle(
+        self,
+        usage: Optional[Dict[str, object]],
+        status_code: Optional[int],
+        got_tokens: bool,
+    ) -> None:
+        """Reconciles the token estimate with what the provider reported using."""
+        actual = _usage_tokens(usage)
+        if actual is None:
+            # Without usage, a stream that never produced output most likely
+            # consumed nothing; otherwise keep the estimate as the best guess.
+            actual = self.estimated_tokens if got_tokens else 0
+        self._limiter._settle(self._buckets, self.estimated_tokens - actual, status_code == 429)
+
+
+def _usage_tokens(usage: Optional[Dict[str, object]]) -> Optional[int]:
+    if not usage:
+        return None
+    total = usage.get("total_tokens")
+    if isinstance(total, int):
+        return total
+    parts = [usage.get("prompt_tokens"), usage.get("completion_tokens")]
+    if all(isinstance(part, int) for part in parts):
+        return int(parts[0]) + int(parts[1])
+    return None
+
+
+class RateLimiter:
+    """Buckets come from ``<PROVIDER>_RPM``/``_TPM`` and ``<PROVIDER>_MODEL_<NAME>_RPM``/``_TPM``.
+
+    Provider buckets are shared by all of that provider's models; a request must
+    fit every bucket that applies to it.
+    """
+
+    def __init__(self, settings: RateLimitSettings) -> None:
+        self.settings = settings
+        self._scopes: Dict[str, List[TokenBucket]] = {}
+        self._buckets: Dict[Tuple[str, str], List[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _scope(self, scope: str, env_prefix: str) -> List[TokenBucket]:
+        if scope not in self._scopes:
+            buckets: List[TokenBucket] = []
+            for kind, suffix in ((KIND_REQUESTS, "RPM"), (KIND_TOKENS, "TPM")):
+                limit = _limit_env(f"{env_prefix}_{suffix}")
+                if limit is not None:
+                    buckets.append(TokenBucket(scope, kind, limit, self.settings.burst_fraction))
+            self._scopes[scope] = buckets
+        return self._scopes[scope]
+
+    def buckets_for(self, provider: str, model: str) -> List[TokenBucket]:
+        if not provider:
+            return []
+        key = (provider, model)
+        prefix = _env_token(provider)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = self._scope(provider, prefix) + self._scope(
+                    f"{provider}/{model}", f"{prefix}_MODEL_{_env_token(model)}"
+                )
+            return self._buckets[key]
+
+    def reserve(
+        self,
+        provider: str,
+        model: str,
+        prompt: str,
+        request_params: Optional[Dict[str, object]],
+    ) -> Optional[RateReservation]:
+        """Takes budget for one request; the caller must wait ``wait_seconds`` before sending."""
+        buckets = self.buckets_for(provider, model)
+        if not buckets:
+            return None
+        tokens = estimate_tokens(prompt, request_params, self.settings)
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                bucket.reserve(1 if bucket.kind == KIND_REQUESTS else tokens, now)
+                for bucket in buckets
+            )
+        return RateReservation(self, buckets, tokens, wait)
+
+    def _settle(self, buckets: List[TokenBucket], token_refund: float, throttled: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for bucket in buckets:
+                if bucket.kind == KIND_TOKENS and token_refund:
+                    bucket.credit(token_refund, now)
+                if throttled:
+                    # The provider disagrees with our budget; stop bursting until it refills.
+                    bucket.drain(now)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter(load_rate_limit_settings())
+        return _default_limiter
@@ -0,0 +1,178 @@
+"""Receipt capture that spools stream events to disk as they arrive."""
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import re
+import tempfile
+from typing import Dict, IO, Optional, TextIO
+
+from shared.hashes import CanonicalListHasher
+
+
+def _safe_slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")
+
+
+def _receipt_path(receipt_dir: Path, label: str, model: str) -> Path:
+    """Reserves a unique receipt name by creating it empty; ``finalize`` replaces it.
+
+    Concurrent streams finishing in the same second for the same label and model
+    would otherwise pick the same name, so the file is created with O_EXCL.
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    label_slug = _safe_slug(label) or "stream"
+    model_slug = _safe_slug(model) or "model"
+    path = receipt_dir / f"receipt_{timestamp}_{label_slug}_{model_slug}.json"
+    suffix = 2
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return path
+        except FileExistsError:
+            path = receipt_dir / f"receipt_{timestamp}_{label_slug}_{model_slug}_{suffix}.json"
+            suffix += 1
+
+
+class _Spool:
+    def __init__(self, receipt_dir: Path, suffix: str) -> None:
+        self.handle: TextIO = tempfile.NamedTemporaryFile(
+            mode="w+",
+            encoding="utf-8",
+            dir=receipt_dir,
+            prefix=".receipt_",
+            suffix=suffix,
+            delete=False,
+        )
+        self.hasher = CanonicalListHasher()
+
+    @property
+    def count(self) -> int:
+        return self.hasher.count
+
+    def append(self, value: object) -> None:
+        self.handle.write(self.hasher.update(value))
+        self.handle.write("\n")
+
+    def sha256(self) -> str:
+        return self.hasher.hexdigest()
+
+    def copy_into(self, target: IO[str], indent: str) -> None:
+        self.handle.seek(0)
+        for index, line in enumerate(self.handle):
+            target.write(",\n" if index else "\n")
+            target.write(indent)
+            target.write(line.rstrip("\n"))
+        if self.count:
+            target.write("\n  ")
+
+    def discard(self) -> None:
+        name = self.handle.name
+        self.handle.close()
+        try:
+            os.unlink(name)
+        except OSError:
+            pass
+
+
+class ReceiptWriter:
+    """Appends events to temp files during the stream and assembles the receipt at the end.
+
+    Peak memory stays flat regardless of stream length; the final file has the
+    same ``meta``/``events``/``raw_events`` layout that ``verify_receipt.py`` reads.
+    """
+
+    def __init__(self, receipt_dir: Path, label: str, model: str) -> None:
+        self.receipt_dir = Path(receipt_dir)
+        self.label = label
+        self.model = model
+        self._events: Optional[_Spool] = None
+        self._raw_events: Optional[_Spool] = None
+        try:
+            self.receipt_dir.mkdir(parents=True, exist_ok=True)
+            self._events = _Spool(self.receipt_dir, ".events.jsonl")
+            self._raw_events = _Spool(self.receipt_dir, ".raw.jsonl")
+        except OSError as exc:
+            self._fail(exc)
+
+    @property
+    def active(self) -> bool:
+        return self._events is not None and self._raw_events is not None
+
+    @property
+    def event_count(self) -> int:
+        return self._events.count if self._events is not None else 0
+
+    @property
+    def raw_event_count(self) -> int:
+        return self._raw_events.count if self._raw_events is not None else 0
+
+    def _fail(self, exc: OSError) -> None:
+        print(f"Warning: Unable to write receipt: {exc}")
+        self.discard()
+
+    def add_event(self, event: Dict[str, object]) -> None:
+        if self._events is None:
+            return
+        try:
+            self._events.append(event)
+        except OSError as exc:
+            self._fail(exc)
+
+    def add_raw_event(self, data: str) -> None:
+        if self._raw_events is None:
+            return
+        try:
+            self._raw_events.append(data)
+        except OSError as exc:
+            self._fail(exc)
+
+    def finalize(self, meta: Dict[str, object]) -> Optional[str]:
+        if self._events is None or self._raw_events is None:
+            return None
+        events, raw_events = self._events, self._raw_events
+        try:
+            path = _receipt_path(self.receipt_dir, self.label, self.model)
+        except OSError as exc:
+            self.discard()
+            print(f"Warning: Unable to write receipt: {exc}")
+            return None
+        partial = path.with_name(f".{path.name}.partial")
+        try:
+            meta = dict(meta)
+            meta.update(
+                {
+                    "event_count": events.count,
+                    "raw_event_count": raw_events.count,
+                    "events_sha256": events.sha256(),
+                    "raw_events_sha256": raw_events.sha256(),
+                }
+            )
+            meta_json = json.dumps(meta, indent=2, sort_keys=True).replace("\n", "\n  ")
+            with partial.open("w", encoding="utf-8") as target:
+                target.write('{\n  "events": [')
+                events.copy_into(target, "    ")
+                target.write('],\n  "meta": ')
+                target.write(meta_json)
+                target.write(',\n  "raw_events": [')
+                raw_events.copy_into(target, "    ")
+                target.write("]\n}\n")
+            os.replace(partial, path)
+        except OSError as exc:
+            print(f"Warning: Unable to write receipt: {exc}")
+            for leftover in (partial, path):
+                try:
+                    leftover.unlink()
+                except OSError:
+                    pass
+            return None
+        finally:
+            self.discard()
+        return str(path)
+
+    def discard(self) -> None:
+        for spool in (self._events, self._raw_events):
+            if spool is not None:
+                spool.discard()
+        self._events = None
+        self._raw_events = None
@@ -0,0 +1,103 @@
+"""Retry policy with jittered exponential backoff for failed streams."""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import os
+import random
+from typing import Dict, Optional
+
+from .utils import is_enabled
+
+PHASE_BEFORE_FIRST_TOKEN = "before_first_token"
+PHASE_MID_STREAM = "mid_stream"
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Returns the wait in seconds for a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # email.utils is only worth importing once a server actually sends a date.
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 1
+    base_delay_seconds: float = 0.5
+    max_delay_seconds: float = 30.0
+    retry_mid_stream: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_attempts > 1
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "max_attempts": self.max_attempts,
+            "base_ms": round(self.base_delay_seconds * 1000, 3),
+            "max_ms": round(self.max_delay_seconds * 1000, 3),
+            "retry_mid_stream": self.retry_mid_stream,
+        }
+
+    def next_delay(
+        self,
+        attempt: int,
+        status_code: Optional[int],
+        phase: str,
+        retry_after: Optional[str] = None,
+    ) -> Optional[float]:
+        """Seconds to wait before attempt ``attempt + 1``, or None to give up."""
+        if attempt >= self.max_attempts:
+            return None
+        if phase == PHASE_MID_STREAM and not self.retry_mid_stream:
+            return None
+        # Below 400 (or no status at all) the failure was in transport, not an HTTP error.
+        if status_code is not None and status_code >= 400 and status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        server_wait = parse_retry_after(retry_after)
+        if server_wait is not None:
+            return min(server_wait, self.max_delay_seconds)
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * (2 ** (attempt - 1)))
+        return random.uniform(0.0, ceiling)
+
+
+def _ms_env(key: str, default_ms: float) -> float:
+    raw = os.getenv(key, "").strip()
+    if not raw:
+        return default_ms / 1000.0
+    try:
+        value = float(raw)
+    except ValueError:
+        print(f"Warning: Invalid {key}='{raw}', using default.")
+        return default_ms / 1000.0
+    return max(0.0, value) / 1000.0
+
+
+def load_retry_policy() -> RetryPolicy:
+    raw_attempts = os.getenv("RETRY_MAX_ATTEMPTS", "").strip()
+    max_attempts = 1
+    if raw_attempts:
+        try:
+            max_attempts = max(1, int(raw_attempts))
+        except ValueError:
+            print(f"Warning: Invalid RETRY_MAX_ATTEMPTS='{raw_attempts}', retries disabled.")
+    return RetryPolicy(
+        max_attempts=max_attempts,
+        base_delay_seconds=_ms_env("RETRY_BASE_MS", 500),
+        max_delay_seconds=_ms_env("RETRY_MAX_MS", 30000),
+        retry_mid_stream=is_enabled(os.getenv("RETRY_MID_STREAM"), default=False),
+    )
@@ -0,0 +1,113 @@
+"""Pooled HTTP sessions shared by every stream_chat caller."""
+from dataclasses import dataclass
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+from .utils import is_enabled
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_POOL_SIZE = 10
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    pool_size: int = DEFAULT_POOL_SIZE
+    keepalive: bool = True
+    fresh_connection: bool = False
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "pool_size": self.pool_size,
+            "keepalive": self.keepalive,
+            "fresh_connection": self.fresh_connection,
+        }
+
+
+def load_pool_settings() -> PoolSettings:
+    raw_size = os.getenv("HTTP_POOL_SIZE", "").strip()
+    pool_size = DEFAULT_POOL_SIZE
+    if raw_size:
+        try:
+            pool_size = max(1, int(raw_size))
+        except ValueError:
+            print(f"Warning: Invalid HTTP_POOL_SIZE='{raw_size}', using default.")
+    return PoolSettings(
+        pool_size=pool_size,
+        keepalive=is_enabled(os.getenv("HTTP_KEEPALIVE"), default=True),
+        fresh_connection=is_enabled(os.getenv("HTTP_FRESH_CONNECTION"), default=False),
+    )
+
+
+def _origin(api_url: str) -> str:
+    parts = urlsplit(api_url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _response_connection(response: "requests.Response") -> Optional[object]:
+    raw = getattr(response, "raw", None)
+    connection = getattr(raw, "connection", None)
+    if connection is None:
+        connection = getattr(raw, "_connection", None)
+    return connection
+
+
+def connection_timing(response: "requests.Response") -> Dict[str, float]:
+    """Copies the connection's timing marks (see ``net_timing``); empty if it has none."""
+    timing = getattr(_response_connection(response), "timing", None)
+    return dict(timing) if isinstance(timing, dict) else {}
+
+
+class SessionPool:
+    def __init__(self, settings: Optional[PoolSettings] = None) -> None:
+        self.settings = settings or load_pool_settings()
+        self._sessions: Dict[str, "requests.Session"] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self, keepalive: bool) -> "requests.Session":
+        # requests is imported on first use so offline callers never load the HTTP stack.
+        import requests
+
+        from .net_timing import TimedHTTPAdapter
+
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=self.settings.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not keepalive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def session_for(self, api_url: str) -> "requests.Session":
+        origin = _origin(api_url)
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = self._new_session(self.settings.keepalive)
+                self._sessions[origin] = session
+            return session
+
+    def fresh_session(self) -> "requests.Session":
+        return self._new_session(keepalive=False)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+_default_pool: Optional[SessionPool] = None
+_default_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool()
+        return _default_pool
@@ -0,0 +1,135 @@
+"""Incremental byte-level Server-Sent Events framer."""
+from dataclasses import dataclass
+import re
+import time
+from typing import List, Optional
+
+_LINE_END_RE = re.compile(rb"\r\n|\r|\n")
+_CR = 0x0D
+_LF = 0x0A
+
+
+@dataclass(frozen=True)
+class SSEEvent:
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+    received_at: float = 0.0
+
+
+class SSEParser:
+    """Frames SSE events from raw bytes as they arrive off the socket.
+
+    Handles multi-line ``data:`` fields, ``event:``/``id:``/``retry:`` fields,
+    comments and CR, LF or CRLF line endings split across chunk boundaries.
+    Each event is stamped with the arrival time of the chunk that completed it.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._data = bytearray()
+        self._has_data = False
+        self._event_type = ""
+        self._last_id: Optional[str] = None
+        self._retry: Optional[int] = None
+        self._skip_lf = False
+
+    def feed(self, chunk: bytes, received_at: Optional[float] = None) -> List[SSEEvent]:
+        if received_at is None:
+            received_at = time.perf_counter()
+        buffer = self._buffer
+        buffer += chunk
+        events: List[SSEEvent] = []
+        start = 0
+        if self._skip_lf and buffer and buffer[0] == _LF:
+            start = 1
+        self._skip_lf = False
+        length = len(buffer)
+        while start < length:
+            match = _LINE_END_RE.search(buffer, start)
+            if match is None:
+                break
+            end = match.start()
+            if match.end() == length and match.end() - end == 1 and buffer[end] == _CR:
+                # A CR at the end of a chunk may be the first half of a CRLF.
+                self._skip_lf = True
+            event = self._process_line(buffer, start, end, received_at)
+            if event is not None:
+                events.append(event)
+            start = match.end()
+        if start:
+            del buffer[:start]
+        return events
+
+    def flush(self, received_at: Optional[float] = None) -> List[SSEEvent]:
+        if received_at is None:
+            received_at = time.perf_counter()
+        events: List[SSEEvent] = []
+        if self._buffer:
+            self._process_line(self._buffer, 0, len(self._buffer), received_at)
+            self._buffer.clear()
+        # Be lenient with servers that close the stream without a final blank line.
+        event = self._dispatch(received_at)
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(
+        self,
+        buffer: bytearray,
+        start: int,
+        end: int,
+        received_at: float,
+    ) -> Optional[SSEEvent]:
+        if start == end:
+            return self._dispatch(received_at)
+        if buffer.startswith(b"data:", start, end):
+            value_start = start + 5
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+            self._data += buffer[value_start:end]
+            self._data.append(_LF)
+            self._has_data = True
+            return None
+        if buffer[start] == 0x3A:
+            return None
+        colon = buffer.find(b":", start, end)
+        if colon == -1:
+            field = bytes(buffer[start:end])
+            value = b""
+        else:
+            field = bytes(buffer[start:colon])
+            value_start = colon + 1
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+            value = bytes(buffer[value_start:end])
+        if field == b"data":
+            self._data += value
+            self._data.append(_LF)
+            self._has_data = True
+        elif field == b"event":
+            self._event_type = value.decode("utf-8", errors="replace")
+        elif field == b"id":
+            if b"\x00" not in value:
+                self._last_id = value.decode("utf-8", errors="replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self._retry = int(value)
+        return None
+
+    def _dispatch(self, received_at: float) -> Optional[SSEEvent]:
+        event_type = self._event_type or "message"
+        self._event_type = ""
+        if not self._has_data:
+            return None
+        data = self._data[:-1].decode("utf-8", errors="replace")
+        self._data.clear()
+        self._has_data = False
+        return SSEEvent(
+            data=data,
+            event=event_type,
+            id=self._last_id,
+            retry=self._retry,
+            received_at=received_at,
+        )
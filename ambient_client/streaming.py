@@ -1,16 +1,50 @@
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 import hashlib
 import json
 from pathlib import Path
-import re
 import sys
 import time
-from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
+from .cache import (
+    CACHE_HIT,
+    CACHE_MISS,
+    REPLAY_TIMING,
+    CachedResponse,
+    CacheRecorder,
+    ResponseCache,
+    get_response_cache,
+)
+from .circuit import STATE_OPEN, CircuitBreakers, CircuitTicket, get_circuit_breakers
+from .deadlines import (
+    CANCEL_CLIENT_CLOSED,
+    StreamDeadlines,
+    StreamWatchdog,
+    cancel_message,
+    load_stream_deadlines,
+)
+from .metrics import MetricsRegistry, get_metrics_registry
+from .output import BatchedWriter, OutputSettings, load_output_settings
+from .ratelimit import RateLimiter, RateReservation, get_rate_limiter
+from .receipts import ReceiptWriter
+from .retry import (
+    PHASE_BEFORE_FIRST_TOKEN,
+    PHASE_MID_STREAM,
+    RetryPolicy,
+    load_retry_policy,
+)
+from .sessions import SessionPool, connection_timing, get_session_pool
+from .sse import SSEEvent, SSEParser
+from .timing import ChunkTrace, completion_tokens
+
+if TYPE_CHECKING:
+    import requests
+
+READ_TIMEOUT_SECONDS = 60
 
-from shared.hashes import sha256_json
 
 @dataclass(frozen=True)
 class StreamResult:
@@ -28,11 +62,32 @@ class StreamResult:
     error: Optional[str] = None
     status_code: Optional[int] = None
     started_at: Optional[str] = None
+    connection_reused: Optional[bool] = None
+    chunk_trace: Optional[ChunkTrace] = None
+    output_backpressure_seconds: float = 0.0
+    output_drain_seconds: float = 0.0
+    cancel_reason: Optional[str] = None
+    attempts: int = 1
+    backoff_seconds: float = 0.0
+    retry_errors: Optional[List[str]] = None
+    # HTTP status of each retried attempt, None where it failed without one.
+    retry_statuses: Optional[List[Optional[int]]] = None
+    failure_phase: Optional[str] = None
+    cache: Optional[str] = None
+    rate_limit_wait_seconds: float = 0.0
+    # Circuit state at admission: closed, half_open (a probe) or open (short-circuited).
+    circuit: Optional[str] = None
+    # Milliseconds spent in each phase before the first token; see ``_StreamState.network_phases``.
+    phases: Optional[Dict[str, Optional[float]]] = None
 
     @property
     def success(self) -> bool:
         return self.error is None
 
+    @property
+    def short_circuited(self) -> bool:
+        return self.circuit == STATE_OPEN
+
 
 def _safe_write(text: str) -> None:
     try:
@@ -74,10 +129,11 @@ def _build_payload(
     model: str,
     prompt: str,
     request_params: Optional[Dict[str, object]],
+    messages: Optional[List[Dict[str, object]]] = None,
 ) -> Dict[str, object]:
     payload: Dict[str, object] = {
         "model": model,
-        "messages": [{"role": "user", "content": prompt}],
+        "messages": messages or [{"role": "user", "content": prompt}],
         "stream": True,
     }
     if request_params:
@@ -119,43 +175,581 @@ def _update_usage_from_event(
     return usage
 
 
-def _iter_sse_data(
-    response: requests.Response,
-    raw_events: Optional[List[str]],
-) -> Iterable[str]:
-    for raw_line in response.iter_lines(decode_unicode=True):
-        if not raw_line:
-            continue
-        line = raw_line.strip()
-        if not line.startswith("data:"):
-            continue
-        data = line[len("data:"):].strip()
-        if raw_events is not None:
-            raw_events.append(data)
-        yield data
+def _iter_sse_events(
+    response: "requests.Response",
+    receipt: Optional[ReceiptWriter],
+) -> Iterator[SSEEvent]:
+    parser = SSEParser()
+    for chunk in response.iter_content(chunk_size=None):
+        received_at = time.perf_counter()
+        for event in parser.feed(chunk, received_at):
+            if receipt is not None:
+                receipt.add_raw_event(event.data)
+            yield event
+    for event in parser.flush():
+        if receipt is not None:
+            receipt.add_raw_event(event.data)
+        yield event
+
+
+class _StreamState:
+    def __init__(
+        self,
+        content_mode: str,
+        stall_threshold_seconds: Optional[float],
+        receipt: Optional[ReceiptWriter],
+        emit: Callable[[str], None],
+        trace_chunks: bool = False,
+        output: Optional[BatchedWriter] = None,
+        on_first_token: Optional[Callable[[], None]] = None,
+        on_event: Optional[Callable[[str], bool]] = None,
+        collect_gaps: bool = False,
+    ) -> None:
+        self.content_mode = content_mode
+        self.on_event = on_event
+        self.gaps = array("d") if collect_gaps else None
+        self.stall_threshold_seconds = stall_threshold_seconds
+        self.receipt = receipt
+        self.emit = emit
+        self.output = output
+        self.on_first_token = on_first_token
+        self.output_drain_seconds = 0.0
+        self.start = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.end: Optional[float] = None
+        self.stall_count = 0
+        self.stall_max_gap = 0.0
+        self.chunks: List[str] = []
+        self.parse_errors = 0
+        self.output_chars = 0
+        self.content_chars = 0
+        self.reasoning_chars = 0
+        self.usage: Optional[Dict[str, object]] = None
+        self.status_code: Optional[int] = None
+        self.connection_reused: Optional[bool] = None
+        self.cancel_reason: Optional[str] = None
+        self.retry_after: Optional[str] = None
+        self.failure_phase: Optional[str] = None
+        self.cache: Optional[str] = None
+        self.recorder: Optional[CacheRecorder] = None
+        self.done = False
+        self.chunk_trace = ChunkTrace() if trace_chunks else None
+        self.connection_timing: Dict[str, float] = {}
+        self.headers_at: Optional[float] = None
+        self.first_event_at: Optional[float] = None
+
+    @property
+    def opened_connection(self) -> Optional[bool]:
+        """Whether this attempt connected itself; None when the connection has no marks."""
+        dns_started = self.connection_timing.get("dns_started")
+        return None if dns_started is None else dns_started >= self.start
+
+    def feed(self, data: str, received_at: Optional[float] = None) -> bool:
+        if self.first_event_at is None:
+            self.first_event_at = received_at if received_at is not None else time.perf_counter()
+        if self.recorder is not None:
+            offset = (received_at if received_at is not None else time.perf_counter()) - self.start
+            self.recorder.add(offset, data)
+        if self.on_event is not None and not self.on_event(data):
+            self.cancel_reason = CANCEL_CLIENT_CLOSED
+            return False
+        if data == "[DONE]":
+            self.done = True
+            # TTC stops here, not after the rest of the body is drained.
+            self.end = received_at if received_at is not None else time.perf_counter()
+            return False
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            self.parse_errors += 1
+            return True
+        if self.receipt is not None and isinstance(event, dict):
+            self.receipt.add_event(event)
+        self.usage = _update_usage_from_event(event, self.usage)
+        content, reasoning = _extract_content_parts(event)
+        if content:
+            self.content_chars += len(content)
+        if reasoning:
+            self.reasoning_chars += len(reasoning)
+        emitted_text = _select_emitted_text(content, reasoning, self.content_mode)
+        if not emitted_text:
+            return True
+        now = received_at if received_at is not None else time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            if self.on_first_token is not None:
+                self.on_first_token()
+        if self.last_token_at is not None:
+            gap = now - self.last_token_at
+            if gap > self.stall_max_gap:
+                self.stall_max_gap = gap
+            if self.stall_threshold_seconds is not None and gap >= self.stall_threshold_seconds:
+                self.stall_count += 1
+            if self.gaps is not None:
+                self.gaps.append(gap)
+        self.last_token_at = now
+        if self.chunk_trace is not None:
+            self.chunk_trace.add(now - self.start, len(emitted_text))
+        self.chunks.append(emitted_text)
+        self.output_chars += len(emitted_text)
+        self.emit(emitted_text)
+        return True
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = self.end
+        self.emit("\n")
+
+    def check_deadlines(self, deadlines: StreamDeadlines) -> Optional[str]:
+        if self.cancel_reason is None:
+            self.cancel_reason = deadlines.expired(
+                self.start,
+                self.first_token_at,
+                self.last_token_at,
+                time.perf_counter(),
+            )
+        return self.cancel_reason
+
+    def flush_output(self) -> None:
+        if self.output is not None:
+            self.output.flush()
+
+    def close_output(self) -> None:
+        if self.output is not None:
+            self.output_drain_seconds = self.output.close()
+
+    @property
+    def phase(self) -> str:
+        return PHASE_BEFORE_FIRST_TOKEN if self.first_token_at is None else PHASE_MID_STREAM
+
+    @property
+    def ttfb_seconds(self) -> float:
+        return (self.first_token_at or self.start) - self.start
+
+    @property
+    def ttc_seconds(self) -> float:
+        return (self.end or self.start) - self.start
+
+    def network_phases(self) -> Optional[Dict[str, Optional[float]]]:
+        """Each phase runs from the previous milestone to its own, in ms.
+
+        ``dns``, ``connect`` and ``tls`` are set only when this request opened
+        the connection. ``send`` ends when the request is written, ``headers``
+        when the response headers arrive, ``first_event`` at the first SSE event
+        and ``first_token`` at the first emitted text. Unknown phases are None.
+        """
+        if self.cache == CACHE_HIT or self.headers_at is None:
+            return None
+        marks = self.connection_timing
+        # Connect marks older than this attempt belong to the request that opened the connection.
+        opened = bool(self.opened_connection)
+        dns_started = marks.get("dns_started") if opened else None
+        resolved = marks.get("resolved") if opened else None
+        connected = marks.get("connected") if opened else None
+        tls_done = marks.get("tls_done") if opened else None
+        sent = marks.get("request_sent")
+        if sent is not None and sent < self.start:
+            sent = None
+        first_token = self.first_token_at if self.last_token_at is not None else None
+
+        def span(begin: Optional[float], end: Optional[float]) -> Optional[float]:
+            return None if begin is None or end is None else round((end - begin) * 1000, 3)
+
+        setup_done = (tls_done or connected) if opened else self.start
+        return {
+            "dns_ms": span(dns_started, resolved),
+            "connect_ms": span(resolved, connected),
+            "tls_ms": span(connected, tls_done),
+            "send_ms": span(setup_done, sent),
+            "headers_ms": span(sent or setup_done, self.headers_at),
+            "first_event_ms": span(self.headers_at, self.first_event_at),
+            "first_token_ms": span(self.first_event_at, first_token),
+        }
+
+    def receipt_meta(
+        self,
+        receipt_label: str,
+        model: str,
+        api_url: str,
+        prompt: str,
+    ) -> Dict[str, object]:
+        return {
+            "label": receipt_label or "stream",
+            "model": model,
+            "api_url": api_url,
+            "started_at": self.started_at,
+            "ttfb_seconds": self.ttfb_seconds,
+            "ttc_seconds": self.ttc_seconds,
+            "parse_errors": self.parse_errors,
+            "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        }
+
+    def result(
+        self,
+        error: Optional[str] = None,
+        receipt_path: Optional[str] = None,
+    ) -> StreamResult:
+        return StreamResult(
+            text="".join(self.chunks),
+            ttfb_seconds=self.ttfb_seconds,
+            ttc_seconds=self.ttc_seconds,
+            receipt_path=receipt_path,
+            output_chars=self.output_chars,
+            content_chars=self.content_chars,
+            reasoning_chars=self.reasoning_chars,
+            parse_errors=self.parse_errors,
+            stall_count=self.stall_count,
+            stall_max_gap_seconds=self.stall_max_gap,
+            usage=self.usage,
+            error=error,
+            status_code=self.status_code,
+            started_at=self.started_at,
+            connection_reused=self.connection_reused,
+            chunk_trace=self.chunk_trace,
+            output_backpressure_seconds=(
+                self.output.backpressure_seconds if self.output is not None else 0.0
+            ),
+            output_drain_seconds=self.output_drain_seconds,
+            cancel_reason=self.cancel_reason,
+            failure_phase=self.failure_phase,
+            cache=self.cache,
+            phases=self.network_phases(),
+        )
+
+
+def _provider_name(provider: Optional[str], api_url: str) -> str:
+    # Rate limits, circuit breakers and metrics are keyed by provider; the API
+    # host stands in when the caller does not name one.
+    return provider or urlsplit(api_url).hostname or "stream"
+
+
+def _build_headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+    }
+
+
+def _header_read_timeout(deadlines: StreamDeadlines) -> float:
+    # The watchdog cannot interrupt requests before the response object exists,
+    # so the wait for response headers is capped by the nearest deadline instead.
+    limits = [
+        limit
+        for limit in (deadlines.ttft_seconds, deadlines.total_seconds)
+        if limit is not None
+    ]
+    return min([READ_TIMEOUT_SECONDS, *limits])
+
+
+def _restore_read_timeout(response: "requests.Response") -> None:
+    connection = getattr(response.raw, "connection", None) or getattr(
+        response.raw, "_connection", None
+    )
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.settimeout(READ_TIMEOUT_SECONDS)
+        except OSError:
+            pass
+
+
+def _open_output(
+    output_handler: Optional[Callable[[str], None]],
+    output_settings: Optional[OutputSettings],
+) -> Optional[BatchedWriter]:
+    if output_handler is not None:
+        return None
+    settings = output_settings or load_output_settings()
+    if not settings.enabled:
+        return None
+    return BatchedWriter(_safe_write, settings)
+
+
+def _open_receipt(
+    receipt_dir: Optional[Path],
+    receipt_label: str,
+    model: str,
+) -> Optional[ReceiptWriter]:
+    if receipt_dir is None:
+        return None
+    return ReceiptWriter(Path(receipt_dir), receipt_label, model)
+
+
+def _finish_stream(
+    state: _StreamState,
+    receipt_label: str,
+    model: str,
+    api_url: str,
+    prompt: str,
+) -> StreamResult:
+    state.finish()
+    state.close_output()
+    receipt_path = None
+    if state.receipt is not None:
+        meta = state.receipt_meta(receipt_label, model, api_url, prompt)
+        receipt_path = state.receipt.finalize(meta)
+    if state.recorder is not None:
+        state.recorder.commit()
+    return state.result(receipt_path=receipt_path)
+
+
+def _fail_stream(
+    state: _StreamState,
+    error: str,
+    emit_error: Callable[[str], None],
+) -> StreamResult:
+    state.failure_phase = state.phase
+    state.flush_output()
+    emit_error(f"Error: {error}")
+    state.finish()
+    state.close_output()
+    if state.receipt is not None:
+        state.receipt.discard()
+    if state.recorder is not None:
+        state.recorder.discard()
+    return state.result(error=error)
+
+
+def _retry_delay(
+    state: _StreamState,
+    policy: RetryPolicy,
+    attempt: int,
+) -> Optional[float]:
+    # Deadline and hedge cancellations are deliberate, so they are never retried.
+    if state.cancel_reason is not None:
+        return None
+    return policy.next_delay(attempt, state.status_code, state.phase, state.retry_after)
+
+
+def _abandon_attempt(
+    state: _StreamState,
+    error: str,
+    delay: float,
+    attempt: int,
+    policy: RetryPolicy,
+    emit_error: Callable[[str], None],
+    metrics: MetricsRegistry,
+    provider: str,
+    model: str,
+) -> None:
+    # Retried attempts are errors too; the final outcome is counted by ``_observe_metrics``.
+    _count_error(metrics, provider, model, state.status_code, state.cancel_reason)
+    if state.first_token_at is not None:
+        state.emit("\n")
+    state.flush_output()
+    emit_error(
+        f"Retrying in {delay:.2f}s (attempt {attempt + 1}/{policy.max_attempts}) "
+        f"after {state.phase.replace('_', ' ')} error: {error}"
+    )
+    if state.receipt is not None:
+        state.receipt.discard()
+    if state.recorder is not None:
+        state.recorder.discard()
+
+
+def _with_attempts(
+    result: StreamResult,
+    attempt: int,
+    backoff_seconds: float,
+    retry_errors: List[str],
+    retry_statuses: List[Optional[int]],
+    rate_limit_wait_seconds: float = 0.0,
+) -> StreamResult:
+    if attempt == 1 and not rate_limit_wait_seconds:
+        return result
+    return replace(
+        result,
+        attempts=attempt,
+        backoff_seconds=backoff_seconds,
+        retry_errors=retry_errors or None,
+        retry_statuses=retry_statuses or None,
+        rate_limit_wait_seconds=rate_limit_wait_seconds,
+    )
+
+
+def _settle_reservation(reservation: Optional[RateReservation], state: _StreamState) -> None:
+    if reservation is not None:
+        reservation.settle(state.usage, state.status_code, state.first_token_at is not None)
+
+
+def _admit_circuit(
+    breakers: CircuitBreakers,
+    provider: str,
+    model: str,
+    emit_error: Callable[[str], None],
+) -> Optional[CircuitTicket]:
+    ticket, note = breakers.admit(provider, model)
+    if note is not None:
+        emit_error(note)
+    return ticket
+
+
+def _short_circuit(
+    breakers: CircuitBreakers,
+    ticket: CircuitTicket,
+    state: _StreamState,
+    emit_error: Callable[[str], None],
+) -> StreamResult:
+    return replace(_fail_stream(state, breakers.rejection(ticket), emit_error), circuit=STATE_OPEN)
+
+
+def _record_circuit(
+    breakers: CircuitBreakers,
+    ticket: Optional[CircuitTicket],
+    result: StreamResult,
+    emit_error: Callable[[str], None],
+) -> StreamResult:
+    if ticket is None:
+        return result
+    note = breakers.record(ticket, result.error, result.status_code, result.cancel_reason)
+    if note is not None:
+        emit_error(note)
+    return replace(result, circuit=ticket.admitted)
 
 
-def _safe_slug(value: str) -> str:
-    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")
+def _count_error(
+    metrics: MetricsRegistry,
+    provider: str,
+    model: str,
+    status_code: Optional[int],
+    cancel_reason: Optional[str],
+    short_circuited: bool = False,
+) -> None:
+    if not metrics.enabled:
+        return
+    if short_circuited:
+        status = "circuit_open"
+    elif status_code is not None and status_code >= 400:
+        status = str(status_code)
+    else:
+        status = cancel_reason or "transport"
+    metrics.inc("ambient_stream_errors", (provider, model, status))
 
 
-def _write_receipt(
-    receipt_dir: Path,
-    label: str,
+def _observe_metrics(
+    metrics: MetricsRegistry,
+    provider: str,
     model: str,
+    state: _StreamState,
+    result: StreamResult,
+) -> None:
+    if not metrics.enabled or result.cache == CACHE_HIT:
+        # Replayed cache entries say nothing about the provider.
+        return
+    labels = (provider, model)
+    metrics.inc("ambient_stream_requests", labels + ("success" if result.success else "error",))
+    metrics.inc("ambient_stream_parse_errors", labels, result.parse_errors)
+    metrics.inc("ambient_stream_stalls", labels, result.stall_count)
+    if state.receipt is not None:
+        metrics.inc("ambient_receipt_writes", labels + ("ok" if result.receipt_path else "failed",))
+    if not result.success:
+        _count_error(
+            metrics, provider, model, result.status_code, result.cancel_reason, result.short_circuited
+        )
+        return
+    metrics.observe("ambient_stream_ttft_seconds", labels, [result.ttfb_seconds])
+    metrics.observe("ambient_stream_ttc_seconds", labels, [result.ttc_seconds])
+    metrics.observe("ambient_stream_chunk_gap_seconds", labels, list(state.gaps or ()))
+    tokens = completion_tokens(result.usage)
+    if tokens is not None and tokens > 1 and state.first_token_at is not None and state.last_token_at is not None:
+        decode_seconds = state.last_token_at - state.first_token_at
+        if decode_seconds > 0:
+            metrics.observe("ambient_stream_decode_tokens_per_second", labels, [(tokens - 1) / decode_seconds])
+
+
+def _cache_header(api_url: str, model: str, state: _StreamState) -> Dict[str, object]:
+    return {"api_url": api_url, "model": model, "started_at": state.started_at}
+
+
+def _replay_cached(
+    state: _StreamState,
+    cached: CachedResponse,
+    replay: str,
+) -> None:
+    state.cache = CACHE_HIT
+    state.status_code = 200
+    for offset, data in cached.events():
+        if replay == REPLAY_TIMING:
+            wait = state.start + offset - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        if not state.feed(data, time.perf_counter()):
+            break
+
+
+def _stream_attempt(
+    session: "requests.Session",
+    api_url: str,
+    headers: Dict[str, str],
     payload: Dict[str, object],
+    state: _StreamState,
+    deadlines: StreamDeadlines,
 ) -> Optional[str]:
+    # Already loaded by the session pool; imported here to keep module import light.
+    import requests
+
+    watchdog = StreamWatchdog(state, deadlines) if deadlines.enabled else None
     try:
-        receipt_dir.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        label_slug = _safe_slug(label) or "stream"
-        model_slug = _safe_slug(model) or "model"
-        path = receipt_dir / f"receipt_{timestamp}_{label_slug}_{model_slug}.json"
-        path.write_text(json.dumps(payload, indent=2, sort_keys=True))
-        return str(path)
-    except OSError as exc:
-        print(f"Warning: Unable to write receipt: {exc}")
-        return None
+        with session.post(
+            api_url,
+            headers=headers,
+            json=payload,
+            stream=True,
+            timeout=(READ_TIMEOUT_SECONDS, _header_read_timeout(deadlines)),
+        ) as response:
+            state.headers_at = time.perf_counter()
+            state.connection_timing = connection_timing(response)
+            if watchdog is not None:
+                watchdog.arm(response)
+                _restore_read_timeout(response)
+            state.status_code = response.status_code
+            state.retry_after = response.headers.get("Retry-After")
+            opened = state.opened_connection
+            state.connection_reused = None if opened is None else not opened
+            response.raise_for_status()
+            events = _iter_sse_events(response, state.receipt)
+            for event in events:
+                if not state.feed(event.data, event.received_at):
+                    break
+            if state.done:
+                # Reading to the end of the body lets urllib3 return the connection
+                # to the pool; closing a half-read response drops it.
+                for _ in events:
+                    pass
+    except requests.RequestException as exc:
+        response = getattr(exc, "response", None)
+        if response is not None:
+            state.status_code = response.status_code
+        if state.done:
+            # The stream finished; only the drain after [DONE] failed.
+            state.cancel_reason = None
+            return None
+        if state.check_deadlines(deadlines) is not None:
+            return cancel_message(state.cancel_reason, deadlines)
+        return str(exc)
+    except (OSError, ValueError):
+        # Shutting the socket down from the watchdog can surface as a raw socket/SSL
+        # error or a read on a closed file; anything else is a real failure.
+        if state.done:
+            # As above: the stream finished and only the drain failed.
+            state.cancel_reason = None
+            return None
+        if state.cancel_reason is None:
+            raise
+        return cancel_message(state.cancel_reason, deadlines)
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+
+    if state.cancel_reason is not None and not state.done:
+        return cancel_message(state.cancel_reason, deadlines)
+    state.cancel_reason = None
+    return None
 
 
 def stream_chat(
@@ -170,145 +764,131 @@ def stream_chat(
     content_mode: str = "content_or_reasoning",
     output_handler: Optional[Callable[[str], None]] = None,
     error_handler: Optional[Callable[[str], None]] = None,
+    session_pool: Optional[SessionPool] = None,
+    fresh_connection: Optional[bool] = None,
+    trace_chunks: bool = False,
+    output_settings: Optional[OutputSettings] = None,
+    deadlines: Optional[StreamDeadlines] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    response_cache: Optional[ResponseCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breakers: Optional[CircuitBreakers] = None,
+    messages: Optional[List[Dict[str, object]]] = None,
+    event_handler: Optional[Callable[[str], bool]] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    first_token_handler: Optional[Callable[[], None]] = None,
+    attempt_handler: Optional[Callable[[int], None]] = None,
+    provider: Optional[str] = None,
 ) -> StreamResult:
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "text/event-stream",
-    }
-    payload = _build_payload(model, prompt, request_params)
-
-    start = time.perf_counter()
-    started_at = datetime.now(timezone.utc).isoformat()
-    first_token_at = None
-    last_token_at = None
-    stall_count = 0
-    stall_max_gap = 0.0
-    chunks = []
-    events: List[Dict[str, object]] = []
-    raw_events: List[str] = []
-    parse_errors = 0
-    output_chars = 0
-    usage: Optional[Dict[str, object]] = None
-    status_code: Optional[int] = None
-    content_chars = 0
-    reasoning_chars = 0
-    if receipt_dir is not None:
-        receipt_dir = Path(receipt_dir)
-    emit = output_handler or _safe_write
-    emit_error = error_handler or (lambda msg: print(msg))
+    """Streams one chat completion.
 
-    try:
-        with requests.post(
-            api_url,
-            headers=headers,
-            json=payload,
-            stream=True,
-            timeout=60,
-        ) as response:
-            status_code = response.status_code
-            response.raise_for_status()
-            for data in _iter_sse_data(
-                response,
-                raw_events if receipt_dir is not None else None,
-            ):
-                if data == "[DONE]":
-                    break
-                try:
-                    event = json.loads(data)
-                except json.JSONDecodeError:
-                    parse_errors += 1
-                    continue
-                if receipt_dir is not None and isinstance(event, dict):
-                    events.append(event)
-                usage = _update_usage_from_event(event, usage)
-                content, reasoning = _extract_content_parts(event)
-                if content:
-                    content_chars += len(content)
-                if reasoning:
-                    reasoning_chars += len(reasoning)
-                emitted_text = _select_emitted_text(content, reasoning, content_mode)
-                if not emitted_text:
-                    continue
-                now = time.perf_counter()
-                if first_token_at is None:
-                    first_token_at = now
-                if last_token_at is not None:
-                    gap = now - last_token_at
-                    if gap > stall_max_gap:
-                        stall_max_gap = gap
-                    if stall_threshold_seconds is not None and gap >= stall_threshold_seconds:
-                        stall_count += 1
-                last_token_at = now
-                chunks.append(emitted_text)
-                output_chars += len(emitted_text)
-                emit(emitted_text)
-    except requests.RequestException as exc:
-        error = str(exc)
-        response = getattr(exc, "response", None)
-        if response is not None:
-            status_code = response.status_code
-        emit_error(f"Error: {error}")
-        end = time.perf_counter()
-        if first_token_at is None:
-            first_token_at = end
-        emit("\n")
-        return StreamResult(
-            text="".join(chunks),
-            ttfb_seconds=first_token_at - start,
-            ttc_seconds=end - start,
-            receipt_path=None,
-            output_chars=output_chars,
-            content_chars=content_chars,
-            reasoning_chars=reasoning_chars,
-            parse_errors=parse_errors,
-            stall_count=stall_count,
-            stall_max_gap_seconds=stall_max_gap,
-            usage=usage,
-            error=error,
-            status_code=status_code,
-            started_at=started_at,
+    ``provider`` (e.g. ``Ambient``) selects the ``<PROVIDER>_RPM``/``_TPM`` rate
+    limits and keys the circuit breaker and metrics; it defaults to the API host.
+    ``receipt_label`` only names receipts.
+
+    ``messages`` replaces the single user message built from ``prompt``; the
+    prompt still names the request for receipts, the cache and rate limits.
+    ``event_handler`` sees every raw SSE data payload (including ``[DONE]``)
+    as it arrives; returning False cancels the stream as ``client_closed``.
+    ``attempt_handler`` is called with the attempt number before each upstream
+    attempt, so consumers of ``event_handler`` can drop a retried attempt's events.
+    """
+    headers = _build_headers(api_key)
+    payload = _build_payload(model, prompt, request_params, messages)
+    provider = _provider_name(provider, api_url)
+    output = _open_output(output_handler, output_settings)
+    emit = output or output_handler or _safe_write
+    emit_error = error_handler or (lambda msg: print(msg))
+    pool = session_pool or get_session_pool()
+    if fresh_connection is None:
+        fresh_connection = pool.settings.fresh_connection
+    if deadlines is None:
+        deadlines = load_stream_deadlines()
+    policy = retry_policy or load_retry_policy()
+    cache = response_cache or get_response_cache()
+    cache_key = cache.key_for(api_url, model, prompt, request_params)
+    cached = cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        state = _StreamState(
+            content_mode,
+            stall_threshold_seconds,
+            receipt=None,
+            emit=emit,
+            trace_chunks=trace_chunks,
+            output=output,
+            on_first_token=first_token_handler,
+            on_event=event_handler,
         )
+        try:
+            _replay_cached(state, cached, cache.settings.replay)
+        except (OSError, ValueError) as exc:
+            return _fail_stream(state, f"Unreadable cache entry {cached.path}: {exc}", emit_error)
+        return _finish_stream(state, receipt_label, model, api_url, prompt)
 
-    end = time.perf_counter()
-    if first_token_at is None:
-        first_token_at = end
-    emit("\n")
-    receipt_path = None
-    if receipt_dir is not None:
-        events_hash = sha256_json(events)
-        raw_events_hash = sha256_json(raw_events)
-        receipt_payload = {
-            "meta": {
-                "label": receipt_label or "stream",
-                "model": model,
-                "api_url": api_url,
-                "started_at": started_at,
-                "ttfb_seconds": first_token_at - start,
-                "ttc_seconds": end - start,
-                "event_count": len(events),
-                "raw_event_count": len(raw_events),
-                "parse_errors": parse_errors,
-                "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
-                "events_sha256": events_hash,
-                "raw_events_sha256": raw_events_hash,
-            },
-            "events": events,
-            "raw_events": raw_events,
-        }
-        receipt_path = _write_receipt(receipt_dir, receipt_label, model, receipt_payload)
-    return StreamResult(
-        text="".join(chunks),
-        ttfb_seconds=first_token_at - start,
-        ttc_seconds=end - start,
-        receipt_path=receipt_path,
-        output_chars=output_chars,
-        content_chars=content_chars,
-        reasoning_chars=reasoning_chars,
-        parse_errors=parse_errors,
-        stall_count=stall_count,
-        stall_max_gap_seconds=stall_max_gap,
-        usage=usage,
-        status_code=status_code,
-        started_at=started_at,
-    )
+    registry = metrics or get_metrics_registry()
+    breakers = circuit_breakers or get_circuit_breakers()
+    ticket = _admit_circuit(breakers, provider, model, emit_error)
+    if ticket is not None and ticket.rejected:
+        # Fail fast without a request, a rate-limit reservation or a receipt.
+        state = _StreamState(content_mode, stall_threshold_seconds, receipt=None, emit=emit, output=output)
+        result = _short_circuit(breakers, ticket, state, emit_error)
+        _observe_metrics(registry, provider, model, state, result)
+        return result
+    limiter = rate_limiter or get_rate_limiter()
+    session = pool.fresh_session() if fresh_connection else pool.session_for(api_url)
+    attempt = 1
+    backoff_seconds = 0.0
+    rate_limit_wait = 0.0
+    retry_errors: List[str] = []
+    retry_statuses: List[Optional[int]] = []
+    try:
+        while True:
+            reservation = limiter.reserve(provider, model, prompt, request_params)
+            if reservation is not None and reservation.wait_seconds > 0:
+                time.sleep(reservation.wait_seconds)
+                rate_limit_wait += reservation.wait_seconds
+            if attempt_handler is not None:
+                attempt_handler(attempt)
+            # Each attempt gets fresh timing, so TTFT/TTC never include backoff
+            # or rate-limit waits.
+            state = _StreamState(
+                content_mode,
+                stall_threshold_seconds,
+                receipt=_open_receipt(receipt_dir, receipt_label, model),
+                emit=emit,
+                trace_chunks=trace_chunks,
+                output=output,
+                on_first_token=first_token_handler,
+                on_event=event_handler,
+                collect_gaps=registry.enabled,
+            )
+            if cache_key is not None:
+                state.cache = CACHE_MISS
+                state.recorder = cache.recorder(cache_key, _cache_header(api_url, model, state))
+            error = _stream_attempt(session, api_url, headers, payload, state, deadlines)
+            _settle_reservation(reservation, state)
+            if error is None:
+                result = _finish_stream(state, receipt_label, model, api_url, prompt)
+                break
+            delay = _retry_delay(state, policy, attempt)
+            if delay is None:
+                result = _fail_stream(state, error, emit_error)
+                break
+            _abandon_attempt(
+                state, error, delay, attempt, policy, emit_error, registry, provider, model
+            )
+            retry_errors.append(error)
+            retry_statuses.append(state.status_code)
+            time.sleep(delay)
+            backoff_seconds += delay
+            attempt += 1
+    except BaseException:
+        # Without this a half-open circuit would keep its probe slot forever.
+        breakers.release(ticket)
+        raise
+    finally:
+        if fresh_connection:
+            session.close()
+    result = _record_circuit(breakers, ticket, result, emit_error)
+    _observe_metrics(registry, provider, model, state, result)
+    return _with_attempts(result, attempt, backoff_seconds, retry_errors, retry_statuses, rate_limit_wait)
@@ -0,0 +1,74 @@
+"""Compact per-chunk timing trace for streamed output."""
+from array import array
+import math
+from typing import Dict, List, Optional
+
+from shared.stats import percentile
+
+
+def completion_tokens(usage: Optional[Dict[str, object]]) -> Optional[float]:
+    """Output token count from a provider usage block (OpenAI or Responses naming)."""
+    if not usage:
+        return None
+    for key in ("completion_tokens", "output_tokens"):
+        value = usage.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return None
+
+
+def _round_ms(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 3)
+
+
+class ChunkTrace:
+    """Arrival offset (seconds from request start) and size of each emitted chunk."""
+
+    def __init__(self) -> None:
+        self.offsets = array("d")
+        self.sizes = array("L")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def add(self, offset_seconds: float, size: int) -> None:
+        self.offsets.append(offset_seconds)
+        self.sizes.append(size)
+
+    def gaps(self) -> List[float]:
+        offsets = self.offsets
+        return [offsets[index] - offsets[index - 1] for index in range(1, len(offsets))]
+
+    def metrics(self, usage: Optional[Dict[str, object]] = None) -> Dict[str, Optional[float]]:
+        gaps = self.gaps()
+        decode_seconds = self.offsets[-1] - self.offsets[0] if len(self.offsets) > 1 else 0.0
+        chars_per_second = None
+        tokens_per_second = None
+        if decode_seconds > 0:
+            # The first chunk marks the start of the decode window, so it is not counted.
+            chars_per_second = round((sum(self.sizes) - self.sizes[0]) / decode_seconds, 3)
+            tokens = completion_tokens(usage)
+            if tokens is not None and tokens > 1:
+                tokens_per_second = round((tokens - 1) / decode_seconds, 3)
+        jitter = None
+        if len(gaps) > 1:
+            mean = sum(gaps) / len(gaps)
+            jitter = math.sqrt(sum((gap - mean) ** 2 for gap in gaps) / (len(gaps) - 1))
+        return {
+            "chunk_count": len(self.offsets),
+            "decode_ms": _round_ms(decode_seconds) if len(self.offsets) > 1 else None,
+            "decode_chars_per_s": chars_per_second,
+            "decode_tokens_per_s": tokens_per_second,
+            "gap_ms_p50": _round_ms(percentile(gaps, 0.5)),
+            "gap_ms_p90": _round_ms(percentile(gaps, 0.9)),
+            "gap_ms_p99": _round_ms(percentile(gaps, 0.99)),
+            "jitter_ms": _round_ms(jitter),
+        }
+
+    def as_dict(self) -> Dict[str, List[float]]:
+        return {
+            "offsets_ms": [round(offset * 1000, 3) for offset in self.offsets],
+            "sizes": list(self.sizes),
+        }
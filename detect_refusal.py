@@ -179,7 +179,18 @@ def main() -> int:
     parser.add_argument("--model", default="")
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Request seed; with --temperature 0 the response is cacheable (RESPONSE_CACHE=1).",
+    )
     parser.add_argument("--show-response", action="store_true")
+    parser.add_argument(
+        "--fresh-connection",
+        action="store_true",
+        help="Open a new HTTP connection instead of reusing the pooled one.",
+    )
     parser.add_argument(
         "--review-file",
         default=str(DEFAULT_REVIEW_PATH),
@@ -212,10 +223,13 @@ def main() -> int:
         request_params={
             "temperature": args.temperature,
             "max_tokens": args.max_tokens,
+            "seed": args.seed,
         },
         content_mode="content",
         output_handler=lambda _: None,
         error_handler=lambda msg: print(msg, file=sys.stderr),
+        fresh_connection=True if args.fresh_connection else None,
+        provider="Ambient",
     )
 
     if not result.success:
@@ -238,6 +252,8 @@ def main() -> int:
 
     print(f"TTFT: {result.ttfb_seconds * 1000:.0f} ms")
     print(f"TTC: {result.ttc_seconds * 1000:.0f} ms")
+    if result.cache is not None:
+        print(f"Cache: {result.cache}")
     print(f"Decision: {decision.state} (confidence={decision.confidence:.2f})")
     print(f"Reasons: {', '.join(decision.reasons)}")
 
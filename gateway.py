@@ -0,0 +1,83 @@
+import argparse
+from datetime import datetime, timezone
+import os
+from pathlib import Path
+import sys
+
+from ambient_client.app.ambient import get_ambient_settings
+from ambient_client.app.bench import BenchRecorder
+from ambient_client.app.openai import get_openai_settings
+from ambient_client.app.openrouter import get_openrouter_settings
+from ambient_client.config import load_env_file
+from ambient_client.metrics import start_metrics_exporter
+from gateway_tools.server import CHAT_PATH, Gateway, make_server
+
+
+def _bench_path(value: str) -> Path:
+    if value:
+        return Path(value)
+    bench_dir = Path(os.getenv("BENCH_OUTPUT_DIR", "data").strip() or "data")
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    return bench_dir / f"gateway_{timestamp}.jsonl"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve the configured providers behind one local OpenAI-compatible endpoint."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument(
+        "--receipts",
+        action="store_true",
+        help="Save Ambient receipts for gateway traffic (AMBIENT_RECEIPT_DIR, default data).",
+    )
+    parser.add_argument(
+        "--bench",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Append a bench record per request (default: data/gateway_<timestamp>.jsonl).",
+    )
+    args = parser.parse_args()
+
+    load_env_file()
+    providers = []
+    for settings in (get_ambient_settings(), get_openai_settings(), get_openrouter_settings()):
+        if not settings.enabled:
+            continue
+        error = settings.validation_error()
+        if error is not None:
+            print(f"Warning: Skipping {settings.name}. {error.removeprefix('Error: ')}")
+            continue
+        providers.append(settings)
+    if not providers:
+        print("Error: No providers configured. Set an API key and model in .env.", file=sys.stderr)
+        return 1
+
+    bench_recorder = None
+    if args.bench is not None:
+        bench_recorder = BenchRecorder(_bench_path(args.bench))
+    gateway = Gateway(providers, receipts=args.receipts, bench_recorder=bench_recorder)
+    server = make_server(gateway, args.host, args.port)
+    if bench_recorder is not None:
+        bench_recorder.write(gateway.meta(args.host, args.port))
+        print(f"Bench output: {bench_recorder.path}")
+    for route in gateway.routes:
+        print(f"Route: {route.key}{' (receipts)' if route.receipt_dir is not None else ''}")
+    print(f"Endpoint: http://{args.host}:{args.port}{CHAT_PATH}")
+    exporter = start_metrics_exporter()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if exporter is not None:
+            exporter.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Utilities for gateway CLI."""
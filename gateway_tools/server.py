@@ -0,0 +1,448 @@
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from ambient_client.app.bench import (
+    BenchRecorder,
+    RunSpec,
+    attach_result_metrics,
+    build_bench_meta,
+    build_bench_record,
+)
+from ambient_client.app.provider_utils import ProviderSettings, receipt_dir_for
+from ambient_client.cache import get_response_cache
+from ambient_client.circuit import get_circuit_breakers
+from ambient_client.deadlines import load_stream_deadlines
+from ambient_client.retry import load_retry_policy
+from ambient_client.sessions import get_session_pool
+from ambient_client.streaming import StreamResult, stream_chat
+from shared.sse import sse_event
+
+CHAT_PATH = "/v1/chat/completions"
+MODELS_PATH = "/v1/models"
+
+CONTENT_MODE = "content_or_reasoning"
+
+# Keys the gateway fills in itself; everything else is forwarded upstream as-is.
+GATEWAY_KEYS = ("model", "messages", "stream")
+
+
+@dataclass(frozen=True)
+class GatewayRoute:
+    settings: ProviderSettings
+    model: str
+    receipt_dir: Optional[Path] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.settings.name}:{self.model}"
+
+
+def prompt_for(messages: List[Dict[str, object]]) -> str:
+    """Names a conversation for receipts, the response cache and rate limits.
+
+    A lone user message is its own text (so it matches what ``main.py`` sends);
+    anything else is the canonical JSON of the messages.
+    """
+    if len(messages) == 1 and messages[0].get("role") == "user":
+        content = messages[0].get("content")
+        if isinstance(content, str):
+            return content
+    return json.dumps(messages, sort_keys=True, separators=(",", ":"))
+
+
+class Gateway:
+    """Routes OpenAI-style requests to the configured providers' models.
+
+    Upstream streams go through ``stream_chat`` with the shared session pool,
+    so connections are reused and retries, deadlines, the response cache, rate
+    limits and circuit breakers apply exactly as they do for ``main.py``.
+    """
+
+    def __init__(
+        self,
+        providers: List[ProviderSettings],
+        receipts: bool = False,
+        bench_recorder: Optional[BenchRecorder] = None,
+    ) -> None:
+        self.routes = [
+            GatewayRoute(settings, model, receipt_dir_for(settings) if receipts else None)
+            for settings in providers
+            for model in settings.models
+        ]
+        self.bench_recorder = bench_recorder
+        # Events are forwarded from the first token on, so a retry after it
+        # would repeat text the client already has.
+        self.retry_policy = replace(load_retry_policy(), retry_mid_stream=False)
+        self.deadlines = load_stream_deadlines()
+        self._served = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, requested: str) -> Optional[GatewayRoute]:
+        """Matches ``Provider:model`` exactly, else the first provider serving ``model``."""
+        for route in self.routes:
+            if route.key == requested:
+                return route
+        for route in self.routes:
+            if route.model == requested:
+                return route
+        return None
+
+    def next_index(self) -> int:
+        with self._lock:
+            self._served += 1
+            return self._served
+
+    def meta(self, host: str, port: int) -> Dict[str, object]:
+        circuit_settings = get_circuit_breakers().settings
+        return build_bench_meta(
+            0,
+            0,
+            0,
+            "",
+            {},
+            CONTENT_MODE,
+            "continue",
+            None,
+            http_pool=get_session_pool().settings.as_dict(),
+            deadlines=self.deadlines.as_dict(),
+            retry=self.retry_policy.as_dict(),
+            response_cache=get_response_cache().settings.as_dict(),
+            circuit_breaker=circuit_settings.as_dict() if circuit_settings.enabled else None,
+            gateway={
+                "endpoint": f"http://{host}:{port}{CHAT_PATH}",
+                "routes": [route.key for route in self.routes],
+                "receipts": any(route.receipt_dir is not None for route in self.routes),
+            },
+        )
+
+    def record(
+        self,
+        route: GatewayRoute,
+        prompt: str,
+        result: StreamResult,
+        details: Dict[str, object],
+    ) -> None:
+        if self.bench_recorder is None:
+            return
+        run_spec = RunSpec(index=self.next_index(), total=0, is_warmup=False, label_suffix="")
+        prompt_sha256 = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        record = build_bench_record(route.settings, route.model, prompt_sha256, run_spec)
+        record["gateway"] = details
+        self.bench_recorder.write(attach_result_metrics(record, result, CONTENT_MODE))
+
+
+class _CompletionBuilder:
+    """Folds streamed chunks back into one ``chat.completion`` for stream=false clients."""
+
+    def __init__(self) -> None:
+        self.reset(1)
+
+    def reset(self, attempt: int) -> None:
+        # A retried attempt starts the completion over.
+        self.id: Optional[str] = None
+        self.created: Optional[int] = None
+        self.content: List[str] = []
+        self.reasoning: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, object]] = {}
+        self.finish_reason: Optional[str] = None
+
+    def __call__(self, data: str) -> bool:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return True
+        if not isinstance(event, dict):
+            return True
+        self.id = self.id or event.get("id")
+        self.created = self.created or event.get("created")
+        for choice in event.get("choices") or []:
+            if not isinstance(choice, dict) or choice.get("index", 0) != 0:
+                continue
+            delta = choice.get("delta") or {}
+            if isinstance(delta.get("content"), str):
+                self.content.append(delta["content"])
+            if isinstance(delta.get("reasoning_content"), str):
+                self.reasoning.append(delta["reasoning_content"])
+            for call in delta.get("tool_calls") or []:
+                self._add_tool_call(call)
+            self.finish_reason = choice.get("finish_reason") or self.finish_reason
+        return True
+
+    def _add_tool_call(self, call: Dict[str, object]) -> None:
+        merged = self.tool_calls.setdefault(
+            int(call.get("index") or 0),
+            {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+        )
+        merged["id"] = call.get("id") or merged["id"]
+        function = call.get("function") or {}
+        for key in ("name", "arguments"):
+            if isinstance(function.get(key), str):
+                merged["function"][key] += function[key]
+
+    def response(self, model: str, usage: Optional[Dict[str, object]]) -> Dict[str, object]:
+        message: Dict[str, object] = {"role": "assistant", "content": "".join(self.content)}
+        if self.reasoning:
+            message["reasoning_content"] = "".join(self.reasoning)
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return {
+            "id": self.id or f"chatcmpl-gateway-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": self.created or int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": self.finish_reason or "stop"}],
+            "usage": usage,
+        }
+
+
+def _discard(_: str) -> None:
+    return
+
+
+def _handler_class(gateway: Gateway) -> Type[BaseHTTPRequestHandler]:
+    class GatewayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "ambient-gateway"
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+        def _send_json(self, status: int, body: Dict[str, object]) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, message: str, kind: str = "gateway_error") -> None:
+            self._send_json(status, {"error": {"message": message, "type": kind}})
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != MODELS_PATH:
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            models = [
+                {"id": route.key, "object": "model", "owned_by": route.settings.name}
+                for route in gateway.routes
+            ]
+            self._send_json(200, {"object": "list", "data": models})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != CHAT_PATH:
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            payload, error = self._read_payload()
+            if payload is None:
+                self._send_error(400, error or "Invalid request body.")
+                return
+            messages = payload.get("messages")
+            if not isinstance(messages, list) or not messages or not all(
+                isinstance(message, dict) for message in messages
+            ):
+                self._send_error(400, "'messages' must be a non-empty list of objects.")
+                return
+            requested = str(payload.get("model") or "")
+            route = gateway.resolve(requested)
+            if route is None:
+                self._send_error(404, f"No configured provider serves model '{requested}'.")
+                return
+            request_params = {key: value for key, value in payload.items() if key not in GATEWAY_KEYS}
+            if payload.get("stream"):
+                self._relay_stream(route, messages, request_params)
+            else:
+                # Usage comes from the final chunk, which providers only send when asked.
+                request_params.setdefault("stream_options", {"include_usage": True})
+                self._relay_completion(route, messages, request_params)
+
+        def _upstream(
+            self,
+            route: GatewayRoute,
+            prompt: str,
+            messages: List[Dict[str, object]],
+            request_params: Dict[str, object],
+            event_handler: Callable[[str], bool],
+            attempt_handler: Callable[[int], None],
+            first_token_handler: Optional[Callable[[], None]] = None,
+        ) -> StreamResult:
+            return stream_chat(
+                route.settings.api_url,
+                route.settings.api_key,
+                prompt,
+                route.model,
+                receipt_dir=route.receipt_dir,
+                receipt_label=route.settings.name,
+                provider=route.settings.name,
+                request_params=request_params or None,
+                content_mode=CONTENT_MODE,
+                output_handler=_discard,
+                error_handler=lambda message: print(f"[{route.key}] {message}"),
+                deadlines=gateway.deadlines,
+                retry_policy=gateway.retry_policy,
+                messages=messages,
+                event_handler=event_handler,
+                first_token_handler=first_token_handler,
+                attempt_handler=attempt_handler,
+            )
+
+        def _relay_stream(
+            self,
+            route: GatewayRoute,
+            messages: List[Dict[str, object]],
+            request_params: Dict[str, object],
+        ) -> None:
+            prompt = prompt_for(messages)
+            relay = _SSERelay(self)
+            result = self._upstream(
+                route, prompt, messages, request_params, relay, relay.reset, relay.flush
+            )
+            if relay.started or result.success:
+                status = 200
+                relay.finish(result.error)
+            else:
+                status = self._send_failure(route, result)
+            self._finish(route, prompt, result, status, stream=True, client_closed=relay.closed)
+
+        def _relay_completion(
+            self,
+            route: GatewayRoute,
+            messages: List[Dict[str, object]],
+            request_params: Dict[str, object],
+        ) -> None:
+            prompt = prompt_for(messages)
+            builder = _CompletionBuilder()
+            result = self._upstream(route, prompt, messages, request_params, builder, builder.reset)
+            if result.success:
+                status = 200
+                self._send_json(status, builder.response(route.model, result.usage))
+            else:
+                status = self._send_failure(route, result)
+            self._finish(route, prompt, result, status, stream=False, client_closed=False)
+
+        def _send_failure(self, route: GatewayRoute, result: StreamResult) -> int:
+            if result.short_circuited:
+                status = 503
+            elif result.status_code is not None and result.status_code >= 400:
+                status = result.status_code
+            else:
+                status = 502
+            try:
+                self._send_error(status, f"{route.key}: {result.error}", "upstream_error")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            return status
+
+        def _finish(
+            self,
+            route: GatewayRoute,
+            prompt: str,
+            result: StreamResult,
+            status: int,
+            stream: bool,
+            client_closed: bool,
+        ) -> None:
+            note = " (client closed)" if client_closed else ""
+            print(
+                f"{self.client_address[0]} POST {CHAT_PATH} {route.key} "
+                f"stream={str(stream).lower()} {status} "
+                f"ttft {result.ttfb_seconds * 1000:.0f} ms ttc {result.ttc_seconds * 1000:.0f} ms"
+                f"{note}"
+            )
+            gateway.record(
+                route,
+                prompt,
+                result,
+                {"stream": stream, "status": status, "client_closed": client_closed},
+            )
+
+        def _read_payload(self) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as exc:
+                return None, f"Invalid JSON body: {exc}"
+            if not isinstance(payload, dict):
+                return None, "Request body must be a JSON object."
+            return payload, None
+
+    return GatewayHandler
+
+
+class _SSERelay:
+    """Forwards upstream SSE payloads to the client, starting at the first token.
+
+    Events before it (the role chunk, for instance) are held back until then,
+    since a retry before the first token would otherwise send them twice;
+    headers go out with the first forwarded event.
+    """
+
+    def __init__(self, handler: BaseHTTPRequestHandler) -> None:
+        self.handler = handler
+        self.started = False
+        self.closed = False
+        self.sent_done = False
+        self.pending: List[str] = []
+
+    def reset(self, attempt: int) -> None:
+        self.pending = []
+
+    def __call__(self, data: str) -> bool:
+        if self.closed:
+            return False
+        self.pending.append(data)
+        # Returning False cancels the upstream stream instead of reading it to the end.
+        return self.flush() if self.started else True
+
+    def flush(self) -> bool:
+        events, self.pending = self.pending, []
+        try:
+            if not self.started:
+                self.handler.send_response(200)
+                self.handler.send_header("Content-Type", "text/event-stream")
+                self.handler.send_header("Cache-Control", "no-cache")
+                self.handler.send_header("Transfer-Encoding", "chunked")
+                self.handler.end_headers()
+                self.started = True
+            for data in events:
+                self.handler._write_chunk(sse_event(data))
+                self.sent_done = data == "[DONE]"
+        except (BrokenPipeError, ConnectionResetError):
+            self.closed = True
+            self.handler.close_connection = True
+            return False
+        return True
+
+    def finish(self, error: Optional[str]) -> None:
+        # A stream without text (tool calls only, say) is still pending here.
+        if self.closed or not self.flush():
+            return
+        try:
+            if error is not None and not self.sent_done:
+                body = json.dumps({"error": {"message": error, "type": "upstream_error"}})
+                self.handler._write_chunk(sse_event(body))
+            if not self.sent_done:
+                self.handler._write_chunk(b"data: [DONE]\n\n")
+            self.handler.wfile.write(b"0\r\n\r\n")
+            self.handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.handler.close_connection = True
+
+
+def make_server(
+    gateway: Gateway,
+    host: str = "127.0.0.1",
+    port: int = 8790,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _handler_class(gateway))
+    server.daemon_threads = True
+    return server
@@ -1,8 +1,17 @@
+import argparse
+
 from ambient_client.app.runner import run
 
 
 def main() -> None:
-    run()
+    parser = argparse.ArgumentParser(description="Stream a prompt from the configured providers.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Resolve config and print the run plan (and bench meta) without sending requests.",
+    )
+    args = parser.parse_args()
+    run(dry_run=args.dry_run)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import argparse
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import sys
+from typing import Callable, Dict, List, TypeVar
+
+from perf_tools.suite import build_cases, build_meta, compare_cases, render_markdown, run_case
+
+T = TypeVar("T")
+
+
+def _parse_list(raw: str, convert: Callable[[str], T]) -> List[T]:
+    return [convert(item.strip()) for item in raw.split(",") if item.strip()]
+
+
+def _parse_switch(value: str) -> bool:
+    value = value.lower()
+    if value not in ("on", "off"):
+        raise ValueError(f"expected on/off, got '{value}'")
+    return value == "on"
+
+
+def _load_records(path: str) -> List[Dict[str, object]]:
+    records = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            records.append(json.loads(line))
+    return records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure client-side CPU cost of the streaming hot path on synthetic SSE."
+    )
+    parser.add_argument("--events", default="1000,10000", help="Comma list of SSE event counts.")
+    parser.add_argument(
+        "--read-sizes",
+        default="256,4096",
+        help="Comma list of bytes handed to the parser per network read.",
+    )
+    parser.add_argument(
+        "--reasoning",
+        default="0,0.5",
+        help="Comma list of reasoning_content ratios (0 = all content, 1 = all reasoning).",
+    )
+    parser.add_argument("--receipts", default="off,on", help="Comma list of receipt capture switches (off, on).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median reported).")
+    parser.add_argument("--no-chunk-trace", action="store_true", help="Disable the per-chunk timing trace.")
+    parser.add_argument(
+        "--no-allocations",
+        action="store_true",
+        help="Skip the extra tracemalloc pass per case.",
+    )
+    parser.add_argument(
+        "--output",
+        default="",
+        help="JSONL output path (default: data/microbench_<timestamp>.jsonl).",
+    )
+    parser.add_argument("--compare", default="", help="Earlier microbench JSONL to compare against.")
+    parser.add_argument(
+        "--format",
+        choices=["markdown", "json"],
+        default="markdown",
+        help="Stdout format.",
+    )
+    args = parser.parse_args()
+
+    try:
+        cases = build_cases(
+            _parse_list(args.events, int),
+            _parse_list(args.read_sizes, int),
+            _parse_list(args.reasoning, float),
+            _parse_list(args.receipts, _parse_switch),
+        )
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if not cases or args.repeat < 1 or any(case.events < 1 or case.read_size < 1 for case in cases):
+        print("Error: events, read sizes and --repeat must be positive.", file=sys.stderr)
+        return 1
+
+    output = Path(args.output) if args.output else None
+    if output is None:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        output = Path("data") / f"microbench_{timestamp}.jsonl"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    trace_chunks = not args.no_chunk_trace
+    results: List[Dict[str, object]] = []
+    with output.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(build_meta(trace_chunks, args.repeat)) + "\n")
+        for index, case in enumerate(cases, start=1):
+            print(f"[{index}/{len(cases)}] {case.key}", file=sys.stderr)
+            record = run_case(case, args.repeat, trace_chunks, not args.no_allocations)
+            handle.write(json.dumps(record) + "\n")
+            handle.flush()
+            results.append(record)
+
+    comparison = compare_cases(results, _load_records(args.compare)) if args.compare else None
+    if args.format == "json":
+        print(json.dumps({"cases": results, "comparison": comparison}, indent=2))
+    else:
+        print(render_markdown(results, comparison))
+    print(f"\nResults saved to: {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Utilities for microbench CLI."""
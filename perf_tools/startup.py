@@ -0,0 +1,181 @@
+"""Cold-start cost of the CLIs: fresh-process wall time and an import-time breakdown."""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from shared.stats import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that mean a path pulled in the HTTP client or the asyncio engine.
+HTTP_STACK = ("requests", "urllib3", "asyncio", "ambient_client.aio_http")
+
+
+@dataclass(frozen=True)
+class StartupCase:
+    name: str
+    argv: List[str]
+    budget_ms: float
+    forbidden: Tuple[str, ...] = HTTP_STACK
+
+
+# Budgets are milliseconds above a bare `python -c pass` on the same machine,
+# so they hold across machines with different interpreter startup costs.
+DEFAULT_CASES = [
+    StartupCase("main --dry-run", ["main.py", "--dry-run"], budget_ms=120.0),
+    StartupCase("verify_receipt --help", ["verify_receipt.py", "--help"], budget_ms=60.0),
+    StartupCase("report_bench --help", ["report_bench.py", "--help"], budget_ms=60.0),
+]
+
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Without cached bytecode every run would measure compilation, not startup.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def _run(argv: List[str], env: Dict[str, str], extra: Optional[List[str]] = None) -> Tuple[float, str]:
+    command = [sys.executable, *(extra or []), *argv]
+    start = time.perf_counter()
+    completed = subprocess.run(
+        command,
+        cwd=ROOT,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return (time.perf_counter() - start) * 1000, completed.stderr
+
+
+def _wall_times(argv: List[str], repeat: int, env: Dict[str, str]) -> List[float]:
+    _run(argv, env)  # untimed: writes bytecode caches
+    return [_run(argv, env)[0] for _ in range(repeat)]
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, object]]:
+    """Parses ``-X importtime`` lines into ``{"module", "self_us", "cumulative_us", "depth"}``."""
+    entries: List[Dict[str, object]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        entries.append(
+            {
+                "module": stripped,
+                "self_us": int(parts[0]),
+                "cumulative_us": int(parts[1]),
+                "depth": (len(name) - len(stripped) - 1) // 2,
+            }
+        )
+    return entries
+
+
+def _stats(values: List[float]) -> Dict[str, Optional[float]]:
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 3)
+
+    return {
+        "p50": rounded(percentile(values, 0.5)),
+        "min": rounded(min(values)) if values else None,
+        "max": rounded(max(values)) if values else None,
+    }
+
+
+def measure_baseline(repeat: int) -> Dict[str, Optional[float]]:
+    return _stats(_wall_times(["-c", "pass"], repeat, _child_env()))
+
+
+def run_case(
+    case: StartupCase,
+    repeat: int,
+    baseline_ms: float,
+    top: int = 8,
+) -> Dict[str, object]:
+    env = _child_env()
+    wall = _stats(_wall_times(case.argv, repeat, env))
+    _, stderr = _run(case.argv, env, extra=["-X", "importtime"])
+    own = _script_imports(parse_importtime(stderr))
+    imported = {str(entry["module"]) for entry in own}
+    top_level = sorted(
+        (entry for entry in own if entry["depth"] == 0),
+        key=lambda entry: int(entry["cumulative_us"]),
+        reverse=True,
+    )
+    overhead = None if wall["p50"] is None else round(float(wall["p50"]) - baseline_ms, 3)
+    violations = sorted(
+        name
+        for name in case.forbidden
+        if any(module == name or module.startswith(f"{name}.") for module in imported)
+    )
+    return {
+        "type": "case",
+        "name": case.name,
+        "argv": case.argv,
+        "wall_ms": wall,
+        "overhead_ms": overhead,
+        "budget_ms": case.budget_ms,
+        "modules": len(own),
+        "import_ms": round(sum(int(entry["cumulative_us"]) for entry in top_level) / 1000, 3),
+        "top_imports": [
+            {"module": entry["module"], "cumulative_ms": round(int(entry["cumulative_us"]) / 1000, 3)}
+            for entry in top_level[:top]
+        ],
+        "forbidden_imports": violations,
+        "ok": overhead is not None and overhead <= case.budget_ms and not violations,
+    }
+
+
+def _script_imports(entries: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    # importtime lists children before their parent, so everything up to the
+    # top-level "site" entry (including .pth hooks) is interpreter startup.
+    for index, entry in enumerate(entries):
+        if entry["module"] == "site" and entry["depth"] == 0:
+            return entries[index + 1:]
+    return entries
+
+
+def build_meta(repeat: int, baseline: Dict[str, Optional[float]]) -> Dict[str, object]:
+    return {
+        "type": "meta",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "baseline_ms": baseline,
+        "budget_basis": "p50 wall time above bare interpreter startup",
+    }
+
+
+def render_markdown(results: List[Dict[str, object]], baseline: Dict[str, Optional[float]]) -> str:
+    lines = [
+        f"Bare interpreter: p50 {baseline['p50']} ms",
+        "",
+        "| CLI | Wall p50 (ms) | Over bare (ms) | Budget (ms) | Modules | Forbidden imports | Result |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for row in results:
+        wall = row["wall_ms"]
+        lines.append(
+            f"| {row['name']} | {wall['p50']} | {row['overhead_ms']} | {row['budget_ms']:g} | "
+            f"{row['modules']} | {', '.join(row['forbidden_imports']) or '-'} | "
+            f"{'ok' if row['ok'] else 'FAIL'} |"
+        )
+    for row in results:
+        lines.extend(["", f"Top imports for {row['name']}:"])
+        for item in row["top_imports"]:
+            lines.append(f"- {item['module']}: {item['cumulative_ms']} ms")
+    return "\n".join(lines)
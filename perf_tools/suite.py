@@ -0,0 +1,225 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import itertools
+import os
+from pathlib import Path
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from ambient_client.cache import CacheSettings, ResponseCache
+from ambient_client.deadlines import StreamDeadlines
+from ambient_client.retry import RetryPolicy
+from ambient_client.streaming import StreamResult, stream_chat
+from shared.stats import percentile
+
+from .synthetic import SYNTHETIC_URL, SyntheticPool, build_sse_payload
+
+
+@dataclass(frozen=True)
+class Case:
+    events: int
+    read_size: int
+    reasoning_ratio: float
+    receipts: bool
+
+    @property
+    def key(self) -> str:
+        receipts = "on" if self.receipts else "off"
+        return (
+            f"events={self.events} read={self.read_size} "
+            f"reasoning={self.reasoning_ratio:g} receipts={receipts}"
+        )
+
+
+def build_cases(
+    events: List[int],
+    read_sizes: List[int],
+    reasoning_ratios: List[float],
+    receipts: List[bool],
+) -> List[Case]:
+    return [
+        Case(*values)
+        for values in itertools.product(events, read_sizes, reasoning_ratios, receipts)
+    ]
+
+
+def _discard(_: str) -> None:
+    return None
+
+
+def _stream_once(
+    pool: SyntheticPool,
+    receipt_dir: Optional[Path],
+    trace_chunks: bool,
+) -> Tuple[float, float, StreamResult]:
+    errors: List[str] = []
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = stream_chat(
+        SYNTHETIC_URL,
+        "synthetic",
+        "microbench",
+        model="synthetic",
+        receipt_dir=receipt_dir,
+        receipt_label="microbench",
+        output_handler=_discard,
+        error_handler=errors.append,
+        session_pool=pool,
+        trace_chunks=trace_chunks,
+        deadlines=StreamDeadlines(),
+        retry_policy=RetryPolicy(),
+        response_cache=ResponseCache(CacheSettings()),
+    )
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if result.receipt_path:
+        os.unlink(result.receipt_path)
+    return wall, cpu, result
+
+
+def _peak_allocation_bytes(
+    pool: SyntheticPool,
+    receipt_dir: Optional[Path],
+    trace_chunks: bool,
+) -> int:
+    # Traced separately: tracemalloc slows the hot path far too much to time it.
+    tracemalloc.start()
+    try:
+        _stream_once(pool, receipt_dir, trace_chunks)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_case(
+    case: Case,
+    repeat: int,
+    trace_chunks: bool = True,
+    allocations: bool = True,
+) -> Dict[str, object]:
+    payload = build_sse_payload(case.events, case.reasoning_ratio)
+    pool = SyntheticPool(payload, case.read_size)
+    walls: List[float] = []
+    cpus: List[float] = []
+    errors: List[str] = []
+    peak_bytes: Optional[int] = None
+    with tempfile.TemporaryDirectory(prefix="microbench_") as tmp:
+        receipt_dir = Path(tmp) if case.receipts else None
+        _stream_once(pool, receipt_dir, trace_chunks)  # warm imports and caches
+        for _ in range(repeat):
+            wall, cpu, result = _stream_once(pool, receipt_dir, trace_chunks)
+            walls.append(wall)
+            cpus.append(cpu)
+            if result.error:
+                errors.append(result.error)
+        if allocations:
+            peak_bytes = _peak_allocation_bytes(pool, receipt_dir, trace_chunks)
+    raw = pool.adapter.last_raw
+    wall_p50 = percentile(walls, 0.5) or 0.0
+    cpu_p50 = percentile(cpus, 0.5) or 0.0
+    return {
+        "type": "case",
+        "case": case.key,
+        "events": case.events,
+        "read_size": case.read_size,
+        "reasoning_ratio": case.reasoning_ratio,
+        "receipts": case.receipts,
+        "chunk_trace": trace_chunks,
+        "payload_bytes": len(payload),
+        "reads": raw.reads if raw is not None else None,
+        "repeat": repeat,
+        "wall_ms_p50": round(wall_p50 * 1000, 3),
+        "wall_ms_min": round(min(walls) * 1000, 3),
+        "cpu_ms_p50": round(cpu_p50 * 1000, 3),
+        "chunks_per_s": round(case.events / wall_p50, 1) if wall_p50 else None,
+        "us_per_chunk": round(wall_p50 / case.events * 1e6, 3),
+        "cpu_us_per_chunk": round(cpu_p50 / case.events * 1e6, 3),
+        "alloc_peak_kib": round(peak_bytes / 1024, 1) if peak_bytes is not None else None,
+        "alloc_peak_bytes_per_chunk": (
+            round(peak_bytes / case.events, 1) if peak_bytes is not None else None
+        ),
+        "errors": errors or None,
+    }
+
+
+def build_meta(trace_chunks: bool, repeat: int) -> Dict[str, object]:
+    return {
+        "type": "meta",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "chunk_trace": trace_chunks,
+    }
+
+
+def compare_cases(
+    current: List[Dict[str, object]],
+    baseline: List[Dict[str, object]],
+) -> List[Dict[str, object]]:
+    previous = {record.get("case"): record for record in baseline if record.get("type") == "case"}
+    rows: List[Dict[str, object]] = []
+    for record in current:
+        before = previous.get(record.get("case"))
+        if before is None or not before.get("us_per_chunk"):
+            continue
+        old = float(before["us_per_chunk"])
+        new = float(record["us_per_chunk"])
+        rows.append(
+            {
+                "case": record["case"],
+                "us_per_chunk_before": old,
+                "us_per_chunk_after": new,
+                "change_pct": round((new - old) / old * 100, 1),
+            }
+        )
+    return rows
+
+
+def _cell(value: object) -> str:
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def render_markdown(
+    cases: List[Dict[str, object]],
+    comparison: Optional[List[Dict[str, object]]] = None,
+) -> str:
+    headers = ["Case", "Chunks/s", "us/chunk", "CPU us/chunk", "Reads", "Peak alloc (KiB)"]
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join("---" for _ in headers) + " |",
+    ]
+    for record in cases:
+        row = [
+            record["case"],
+            record["chunks_per_s"],
+            record["us_per_chunk"],
+            record["cpu_us_per_chunk"],
+            record["reads"],
+            record["alloc_peak_kib"],
+        ]
+        lines.append("| " + " | ".join(_cell(value) for value in row) + " |")
+    if comparison:
+        lines.extend(
+            [
+                "",
+                "| Case | us/chunk before | us/chunk after | Change |",
+                "| --- | --- | --- | --- |",
+            ]
+        )
+        for row in comparison:
+            lines.append(
+                f"| {row['case']} | {row['us_per_chunk_before']:.2f} | "
+                f"{row['us_per_chunk_after']:.2f} | {row['change_pct']:+.1f}% |"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+import json
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ambient_client.sessions import PoolSettings, SessionPool
+
+SYNTHETIC_URL = "http://synthetic.invalid/v1/chat/completions"
+
+
+def _event(field: str, text: str) -> bytes:
+    event = {
+        "id": "chatcmpl-synthetic",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "synthetic",
+        "choices": [{"index": 0, "delta": {field: text}, "finish_reason": None}],
+    }
+    return b"data: " + json.dumps(event).encode("utf-8") + b"\n\n"
+
+
+def build_sse_payload(events: int, reasoning_ratio: float = 0.0, token: str = "tok ") -> bytes:
+    """A provider-shaped SSE body: reasoning deltas first, then content, usage and [DONE]."""
+    reasoning_events = int(round(events * min(max(reasoning_ratio, 0.0), 1.0)))
+    reasoning = _event("reasoning_content", token)
+    content = _event("content", token)
+    usage = {
+        "id": "chatcmpl-synthetic",
+        "object": "chat.completion.chunk",
+        "choices": [],
+        "usage": {"prompt_tokens": 8, "completion_tokens": events, "total_tokens": events + 8},
+    }
+    return b"".join(
+        [
+            reasoning * reasoning_events,
+            content * (events - reasoning_events),
+            b"data: " + json.dumps(usage).encode("utf-8") + b"\n\n",
+            b"data: [DONE]\n\n",
+        ]
+    )
+
+
+class _SyntheticRaw:
+    """Stands in for urllib3's response: hands out the body in fixed-size reads."""
+
+    def __init__(self, payload: bytes, read_size: int) -> None:
+        self._payload = payload
+        self._read_size = read_size
+        self.reads = 0
+
+    def stream(self, amt: Optional[int] = None, decode_content: bool = True) -> Iterator[bytes]:
+        payload = self._payload
+        size = self._read_size
+        for offset in range(0, len(payload), size):
+            self.reads += 1
+            # Slicing copies, like a socket read allocating a fresh buffer.
+            yield payload[offset:offset + size]
+
+    def close(self) -> None:
+        return None
+
+
+class SyntheticAdapter(BaseAdapter):
+    def __init__(self, payload: bytes, read_size: int) -> None:
+        super().__init__()
+        self._payload = payload
+        self._read_size = read_size
+        self.last_raw: Optional[_SyntheticRaw] = None
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict({"Content-Type": "text/event-stream"})
+        response.raw = self.last_raw = _SyntheticRaw(self._payload, self._read_size)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        return None
+
+
+class SyntheticPool(SessionPool):
+    """Session pool whose sessions answer every request with the synthetic payload."""
+
+    def __init__(self, payload: bytes, read_size: int) -> None:
+        super().__init__(PoolSettings())
+        self.adapter = SyntheticAdapter(payload, read_size)
+
+    def _new_session(self, keepalive: bool) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        return session
@@ -0,0 +1,54 @@
+import argparse
+import sys
+
+from replay_tools.recordings import RecordingIndex, load_recordings
+from replay_tools.server import make_server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve saved receipts as an OpenAI-compatible streaming endpoint."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Receipt JSON file(s), response cache entries, or a directory of them.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Pacing multiplier: 1 = recorded timing, 2 = twice as fast, 0 = no delay.",
+    )
+    parser.add_argument(
+        "--strict-model",
+        action="store_true",
+        help="Return 404 for models with no recording instead of replaying any recording.",
+    )
+    args = parser.parse_args()
+    if args.speed < 0:
+        print("Error: --speed must be >= 0.", file=sys.stderr)
+        return 1
+
+    recordings = load_recordings(args.paths)
+    if not recordings:
+        print("Error: No receipts found.", file=sys.stderr)
+        return 1
+    index = RecordingIndex(recordings, strict_model=args.strict_model)
+    server = make_server(index, args.host, args.port, args.speed)
+    pacing = "no delay" if args.speed == 0 else f"{args.speed:g}x recorded timing"
+    print(f"Replaying {len(recordings)} recording(s) for {len(index.models)} model(s), {pacing}.")
+    print(f"Endpoint: http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Utilities for replay_server CLI."""
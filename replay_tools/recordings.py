@@ -0,0 +1,157 @@
+import functools
+import hashlib
+import itertools
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+KIND_RECEIPT = "receipt"
+KIND_CACHE = "cache"
+
+
+@dataclass(frozen=True)
+class Recording:
+    path: Path
+    kind: str
+    model: str
+    prompt_sha256: Optional[str]
+    ttfb_seconds: float
+    ttc_seconds: float
+
+
+def iter_paths(values: List[str]) -> Iterable[Path]:
+    for raw in values:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(path.glob("receipt_*.json"))
+            # Response cache entries; bench output sharing the directory is not a recording.
+            yield from sorted(
+                entry for entry in path.glob("*.jsonl") if not entry.name.startswith("bench_")
+            )
+        else:
+            yield path
+
+
+def _load_receipt(path: Path) -> Optional[Recording]:
+    with path.open("r", encoding="utf-8") as handle:
+        receipt = json.load(handle)
+    meta = receipt.get("meta") if isinstance(receipt, dict) else None
+    if not isinstance(meta, dict) or not isinstance(receipt.get("raw_events"), list):
+        return None
+    return Recording(
+        path=path,
+        kind=KIND_RECEIPT,
+        model=str(meta.get("model") or ""),
+        prompt_sha256=meta.get("prompt_sha256"),
+        ttfb_seconds=float(meta.get("ttfb_seconds") or 0.0),
+        ttc_seconds=float(meta.get("ttc_seconds") or 0.0),
+    )
+
+
+def _load_cache_entry(path: Path) -> Optional[Recording]:
+    # Response cache entries (RESPONSE_CACHE) carry exact per-event offsets.
+    with path.open("r", encoding="utf-8") as handle:
+        header = json.loads(handle.readline())
+        if not isinstance(header, dict) or "key" not in header:
+            return None
+        offsets = [float(json.loads(line)[0]) for line in handle if line.strip()]
+    return Recording(
+        path=path,
+        kind=KIND_CACHE,
+        model=str(header.get("model") or ""),
+        prompt_sha256=None,
+        ttfb_seconds=offsets[0] if offsets else 0.0,
+        ttc_seconds=offsets[-1] if offsets else 0.0,
+    )
+
+
+def load_recordings(paths: List[str]) -> List[Recording]:
+    recordings: List[Recording] = []
+    for path in iter_paths(paths):
+        if not path.exists():
+            print(f"Warning: {path} does not exist, skipping.")
+            continue
+        loader = _load_cache_entry if path.suffix == ".jsonl" else _load_receipt
+        try:
+            recording = loader(path)
+        except (OSError, ValueError, TypeError, IndexError, KeyError):
+            recording = None
+        if recording is None:
+            print(f"Warning: {path} is not a receipt or cache entry, skipping.")
+            continue
+        recordings.append(recording)
+    return recordings
+
+
+@functools.lru_cache(maxsize=64)
+def _receipt_events(path: Path, ttfb_seconds: float, ttc_seconds: float) -> Tuple[Tuple[float, str], ...]:
+    with path.open("r", encoding="utf-8") as handle:
+        raw_events = json.load(handle)["raw_events"]
+    # Receipts only keep TTFT and TTC, so the first event lands at TTFT and the
+    # rest are spread evenly until TTC.
+    count = len(raw_events)
+    step = (ttc_seconds - ttfb_seconds) / (count - 1) if count > 1 else 0.0
+    return tuple(
+        (ttfb_seconds + index * max(0.0, step), str(data))
+        for index, data in enumerate(raw_events)
+    )
+
+
+def iter_events(recording: Recording) -> Iterator[Tuple[float, str]]:
+    """Yields ``(offset_seconds, data)`` for each SSE event of a recording."""
+    if recording.kind == KIND_RECEIPT:
+        yield from _receipt_events(recording.path, recording.ttfb_seconds, recording.ttc_seconds)
+        return
+    with recording.path.open("r", encoding="utf-8") as handle:
+        handle.readline()
+        for line in handle:
+            if line.strip():
+                offset, data = json.loads(line)
+                yield float(offset), data
+
+
+def prompt_sha256(payload: Dict[str, object]) -> Optional[str]:
+    messages = payload.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return None
+    content = messages[-1].get("content") if isinstance(messages[-1], dict) else None
+    if not isinstance(content, str):
+        return None
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class RecordingIndex:
+    """Picks a recording for a request: same model and prompt, then same model, then any."""
+
+    def __init__(self, recordings: List[Recording], strict_model: bool = False) -> None:
+        self.recordings = recordings
+        self.strict_model = strict_model
+        self._cycles: Dict[Tuple[str, Optional[str]], Iterator[Recording]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def models(self) -> List[str]:
+        return sorted({recording.model for recording in self.recordings if recording.model})
+
+    def _candidates(self, model: str, prompt: Optional[str]) -> List[Recording]:
+        same_model = [recording for recording in self.recordings if recording.model == model]
+        same_prompt = [recording for recording in same_model if prompt and recording.prompt_sha256 == prompt]
+        if same_prompt:
+            return same_prompt
+        if same_model or self.strict_model:
+            return same_model
+        return self.recordings
+
+    def pick(self, model: str, prompt: Optional[str]) -> Optional[Recording]:
+        with self._lock:
+            key = (model, prompt)
+            cycle = self._cycles.get(key)
+            if cycle is None:
+                candidates = self._candidates(model, prompt)
+                if not candidates:
+                    return None
+                cycle = itertools.cycle(candidates)
+                self._cycles[key] = cycle
+            return next(cycle)
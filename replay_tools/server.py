@@ -0,0 +1,106 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import time
+from typing import Dict, Optional, Tuple, Type
+
+from shared.sse import sse_event
+
+from .recordings import RecordingIndex, iter_events, prompt_sha256
+
+CHAT_PATH = "/v1/chat/completions"
+MODELS_PATH = "/v1/models"
+
+
+def _handler_class(index: RecordingIndex, speed: float) -> Type[BaseHTTPRequestHandler]:
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "ambient-replay"
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+        def _send_json(self, status: int, body: Dict[str, object]) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, message: str) -> None:
+            self._send_json(status, {"error": {"message": message, "type": "replay_error"}})
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != MODELS_PATH:
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            models = [{"id": model, "object": "model"} for model in index.models]
+            self._send_json(200, {"object": "list", "data": models})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != CHAT_PATH:
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            received_at = time.perf_counter()
+            payload, error = self._read_payload()
+            if payload is None:
+                self._send_error(400, error or "Invalid request body.")
+                return
+            if not payload.get("stream"):
+                self._send_error(400, "Only stream=true requests are replayed.")
+                return
+            model = str(payload.get("model") or "")
+            recording = index.pick(model, prompt_sha256(payload))
+            if recording is None:
+                self._send_error(404, f"No recording for model '{model}'.")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("X-Replay-Source", recording.path.name)
+            self.end_headers()
+            sent_done = False
+            try:
+                for offset, data in iter_events(recording):
+                    if speed > 0:
+                        wait = received_at + offset / speed - time.perf_counter()
+                        if wait > 0:
+                            time.sleep(wait)
+                    self._write_chunk(sse_event(data))
+                    sent_done = data == "[DONE]"
+                if not sent_done:
+                    self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away (e.g. a cancelled stream); nothing left to send.
+                self.close_connection = True
+
+        def _read_payload(self) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as exc:
+                return None, f"Invalid JSON body: {exc}"
+            if not isinstance(payload, dict):
+                return None, "Request body must be a JSON object."
+            return payload, None
+
+    return ReplayHandler
+
+
+def make_server(
+    index: RecordingIndex,
+    host: str = "127.0.0.1",
+    port: int = 8787,
+    speed: float = 1.0,
+) -> ThreadingHTTPServer:
+    """Builds a threaded server; ``speed`` scales recorded pacing (0 streams without delay)."""
+    server = ThreadingHTTPServer((host, port), _handler_class(index, speed))
+    server.daemon_threads = True
+    return server
@@ -2,8 +2,8 @@ import argparse
 import json
 from typing import Dict, List
 
-from report_tools.format_utils import render_markdown
-from report_tools.io_utils import load_run_records
+from report_tools.format_utils import render_load_markdown, render_markdown
+from report_tools.io_utils import load_level_records, load_run_records
 from report_tools.sorting import sort_summaries
 from report_tools.summary import summarize
 
@@ -17,16 +17,38 @@ def main() -> int:
         action="store_true",
         help="Include content/reasoning character columns.",
     )
+    parser.add_argument(
+        "--include-timing",
+        action="store_true",
+        help="Include decode rate, inter-chunk gap and jitter columns.",
+    )
+    parser.add_argument(
+        "--include-phases",
+        action="store_true",
+        help="Include network phase columns (DNS, connect, TLS, send, headers, first event, first token).",
+    )
     parser.add_argument(
         "--sort",
         default="provider",
         help=(
             "Sort by: provider, model, success_rate, ttfb_p50, ttfb_p90, "
             "ttc_p50, ttc_p90, stall_avg, stall_p90, output_p50, tokens_p50, "
-            "content_p50, reasoning_p50."
+            "content_p50, reasoning_p50, decode_p50, decode_tokens_p50, "
+            "gap_p90, jitter_p50, connect_p50, tls_p50, headers_p50, first_event_p50, "
+            "first_token_p50."
         ),
     )
     parser.add_argument("--desc", action="store_true", help="Sort descending.")
+    parser.add_argument(
+        "--by-tag",
+        action="store_true",
+        help="Split each model's row by workload prompt tag (BENCH_WORKLOAD runs).",
+    )
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Show per-level load-test results (LOAD_MODE runs) instead of per-model summaries.",
+    )
     parser.add_argument(
         "--format",
         choices=["markdown", "json"],
@@ -35,13 +57,21 @@ def main() -> int:
     )
     args = parser.parse_args()
 
+    if args.load:
+        levels = load_level_records(args.paths)
+        if args.format == "json":
+            print(json.dumps({"load_levels": levels}, indent=2))
+            return 0
+        print(render_load_markdown(levels))
+        return 0
+
     records: List[Dict[str, object]] = load_run_records(args.paths, args.include_warmup)
-    summaries = summarize(records)
+    summaries = summarize(records, by_tag=args.by_tag)
     summaries = sort_summaries(summaries, args.sort, args.desc)
     if args.format == "json":
         print(json.dumps({"summaries": summaries}, indent=2))
         return 0
-    print(render_markdown(summaries, args.include_content))
+    print(render_markdown(summaries, args.include_content, args.include_timing, args.include_phases))
     return 0
 
 
@@ -1,5 +1,7 @@
 from typing import Dict, List, Optional
 
+from .summary import PHASE_FIELDS
+
 
 def format_pair(value: Optional[float]) -> str:
     if value is None:
@@ -14,6 +16,17 @@ def format_rate(success: int, total: int) -> str:
     return f"{success}/{total} ({percent:.0f}%)"
 
 
+def format_success(row: Dict[str, object]) -> str:
+    cell = format_rate(int(row["runs_success"]), int(row["runs_total"]))
+    short_circuited = int(row.get("runs_short_circuited") or 0)
+    if short_circuited:
+        cell += f", {short_circuited} short-circuited"
+    cache_hits = int(row.get("cache_hits") or 0)
+    if cache_hits:
+        cell += f", {cache_hits} cached (not timed)"
+    return cell
+
+
 def format_value(value: Optional[float], extra: Optional[str] = None) -> str:
     if value is None:
         return "n/a"
@@ -22,7 +35,12 @@ def format_value(value: Optional[float], extra: Optional[str] = None) -> str:
     return f"{value:.0f}"
 
 
-def render_markdown(summaries: List[Dict[str, object]], include_content: bool) -> str:
+def render_markdown(
+    summaries: List[Dict[str, object]],
+    include_content: bool,
+    include_timing: bool = False,
+    include_phases: bool = False,
+) -> str:
     headers = [
         "Provider",
         "Model",
@@ -37,6 +55,29 @@ def render_markdown(summaries: List[Dict[str, object]], include_content: bool) -
     ]
     if include_content:
         headers.extend(["Content chars p50", "Reasoning chars p50"])
+    if include_timing:
+        headers.extend(
+            [
+                "Decode chars/s p50",
+                "Decode tok/s p50",
+                "Gap p50/p90 (ms)",
+                "Jitter p50 (ms)",
+                "Rate-limit wait p90 (ms)",
+            ]
+        )
+    if include_phases:
+        headers.extend(
+            [
+                "New conns",
+                "DNS p50 (ms)",
+                "Connect p50 (ms)",
+                "TLS p50 (ms)",
+                "Send p50 (ms)",
+                "Headers p50 (ms)",
+                "First event p50 (ms)",
+                "First token p50 (ms)",
+            ]
+        )
     lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
     for row in summaries:
         ttfb = f"{format_pair(row['ttfb_ms_p50'])}/{format_pair(row['ttfb_ms_p90'])}"
@@ -48,7 +89,7 @@ def render_markdown(summaries: List[Dict[str, object]], include_content: bool) -
             row["provider"],
             row["model"],
             str(row["runs_total"]),
-            format_rate(row["runs_success"], row["runs_total"]),
+            format_success(row),
             ttfb,
             ttc,
             format_value(row["stall_count_avg"]),
@@ -63,5 +104,57 @@ def render_markdown(summaries: List[Dict[str, object]], include_content: bool) -
                     format_pair(row["reasoning_chars_p50"]),
                 ]
             )
+        if include_timing:
+            gaps = f"{format_pair(row['gap_ms_p50_p50'])}/{format_pair(row['gap_ms_p90_p50'])}"
+            cells.extend(
+                [
+                    format_pair(row["decode_chars_per_s_p50"]),
+                    format_pair(row["decode_tokens_per_s_p50"]),
+                    gaps,
+                    format_pair(row["jitter_ms_p50"]),
+                    format_pair(row.get("rate_limit_wait_ms_p90")),
+                ]
+            )
+        if include_phases:
+            cells.append(f"{row.get('new_connections', 0)}/{row['runs_success']}")
+            cells.extend(format_pair(row.get(f"{field}_p50")) for field in PHASE_FIELDS)
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def _format_rps(value: Optional[float]) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value:.2f}"
+
+
+def render_load_markdown(levels: List[Dict[str, object]]) -> str:
+    headers = [
+        "Provider",
+        "Model",
+        "Load",
+        "Requests",
+        "Offered rps",
+        "Achieved rps",
+        "Error rate",
+        "Queue p50/p90 (ms)",
+        "TTFT p50/p90 (ms)",
+        "TTC p50/p90 (ms)",
+    ]
+    lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
+    for row in levels:
+        error_rate = row.get("error_rate")
+        cells = [
+            str(row.get("provider") or "Unknown"),
+            str(row.get("model") or "Unknown"),
+            str(row.get("label") or "n/a"),
+            str(row.get("requests", 0)),
+            _format_rps(row.get("offered_rps")),
+            _format_rps(row.get("achieved_rps")),
+            "n/a" if error_rate is None else f"{float(error_rate) * 100:.1f}%",
+            f"{format_pair(row.get('queue_ms_p50'))}/{format_pair(row.get('queue_ms_p90'))}",
+            f"{format_pair(row.get('ttfb_ms_p50'))}/{format_pair(row.get('ttfb_ms_p90'))}",
+            f"{format_pair(row.get('ttc_ms_p50'))}/{format_pair(row.get('ttc_ms_p90'))}",
+        ]
         lines.append("| " + " | ".join(cells) + " |")
     return "\n".join(lines)
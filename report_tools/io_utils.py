@@ -12,8 +12,7 @@ def iter_paths(values: List[str]) -> Iterable[Path]:
             yield path
 
 
-def load_run_records(paths: List[str], include_warmup: bool) -> List[Dict[str, object]]:
-    records: List[Dict[str, object]] = []
+def _iter_records(paths: List[str]) -> Iterable[Dict[str, object]]:
     for path in iter_paths(paths):
         if not path.exists():
             print(f"Warning: {path} does not exist, skipping.")
@@ -26,9 +25,19 @@ def load_run_records(paths: List[str], include_warmup: bool) -> List[Dict[str, o
             except json.JSONDecodeError:
                 print(f"Warning: Invalid JSON in {path}, skipping line.")
                 continue
-            if record.get("type") != "run":
-                continue
-            if not include_warmup and record.get("warmup"):
-                continue
-            records.append(record)
+            yield record
+
+
+def load_run_records(paths: List[str], include_warmup: bool) -> List[Dict[str, object]]:
+    records: List[Dict[str, object]] = []
+    for record in _iter_records(paths):
+        if record.get("type") != "run":
+            continue
+        if not include_warmup and record.get("warmup"):
+            continue
+        records.append(record)
     return records
+
+
+def load_level_records(paths: List[str]) -> List[Dict[str, object]]:
+    return [record for record in _iter_records(paths) if record.get("type") == "load_level"]
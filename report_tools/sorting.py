@@ -26,6 +26,15 @@ def sort_summaries(
         "tokens_p50": "usage_tokens_p50",
         "content_p50": "content_chars_p50",
         "reasoning_p50": "reasoning_chars_p50",
+        "decode_p50": "decode_chars_per_s_p50",
+        "decode_tokens_p50": "decode_tokens_per_s_p50",
+        "gap_p90": "gap_ms_p90_p50",
+        "jitter_p50": "jitter_ms_p50",
+        "connect_p50": "connect_ms_p50",
+        "tls_p50": "tls_ms_p50",
+        "headers_p50": "headers_ms_p50",
+        "first_event_p50": "first_event_ms_p50",
+        "first_token_p50": "first_token_ms_p50",
     }
     field = field_map.get(sort_by, "ttc_ms_p50")
 
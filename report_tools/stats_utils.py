@@ -1,19 +1,8 @@
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 
+from shared.stats import percentile
 
-def percentile(values: List[float], quantile: float) -> Optional[float]:
-    if not values:
-        return None
-    if quantile <= 0:
-        return min(values)
-    if quantile >= 1:
-        return max(values)
-    sorted_values = sorted(values)
-    rank = (len(sorted_values) - 1) * quantile
-    lower = int(rank)
-    upper = min(lower + 1, len(sorted_values) - 1)
-    weight = rank - lower
-    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+__all__ = ["percentile", "usage_total"]
 
 
 def usage_total(usage: Optional[Dict[str, object]]) -> Optional[float]:
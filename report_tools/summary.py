@@ -2,27 +2,53 @@ from typing import Dict, List, Tuple
 
 from .stats_utils import percentile, usage_total
 
+# Per-run network phase durations (ms) written by attach_result_metrics.
+PHASE_FIELDS = (
+    "dns_ms",
+    "connect_ms",
+    "tls_ms",
+    "send_ms",
+    "headers_ms",
+    "first_event_ms",
+    "first_token_ms",
+)
 
-def summarize(records: List[Dict[str, object]]) -> List[Dict[str, object]]:
+
+def _success_values(items: List[Dict[str, object]], key: str) -> List[float]:
+    return [float(item[key]) for item in items if item.get(key) is not None]
+
+
+def summarize(records: List[Dict[str, object]], by_tag: bool = False) -> List[Dict[str, object]]:
     grouped: Dict[Tuple[str, str], List[Dict[str, object]]] = {}
     for record in records:
         provider = record.get("provider") or "Unknown"
         model = record.get("model") or "Unknown"
-        grouped.setdefault((str(provider), str(model)), []).append(record)
+        load = record.get("load")
+        if isinstance(load, dict) and load.get("label"):
+            # Each load level is its own population; mixing them hides the knee.
+            model = f"{model} [{load['label']}]"
+        if not by_tag:
+            grouped.setdefault((str(provider), str(model)), []).append(record)
+            continue
+        # A run with several workload tags counts toward each of them.
+        for tag in record.get("prompt_tags") or ["untagged"]:
+            grouped.setdefault((str(provider), f"{model} #{tag}"), []).append(record)
 
     summaries = []
     for (provider, model), items in sorted(grouped.items()):
         total_runs = len(items)
         success_runs = [item for item in items if item.get("success")]
         success_count = len(success_runs)
-        ttfb_ms = [float(item["ttfb_ms"]) for item in success_runs if item.get("ttfb_ms") is not None]
-        ttc_ms = [float(item["ttc_ms"]) for item in success_runs if item.get("ttc_ms") is not None]
+        # Cache hits are local replays; their timing says nothing about the provider.
+        measured_runs = [item for item in success_runs if item.get("cache") != "hit"]
+        ttfb_ms = [float(item["ttfb_ms"]) for item in measured_runs if item.get("ttfb_ms") is not None]
+        ttc_ms = [float(item["ttc_ms"]) for item in measured_runs if item.get("ttc_ms") is not None]
         stall_counts = [
-            float(item["stall_count"]) for item in success_runs if item.get("stall_count") is not None
+            float(item["stall_count"]) for item in measured_runs if item.get("stall_count") is not None
         ]
         stall_gaps = [
             float(item["stall_max_gap_ms"])
-            for item in success_runs
+            for item in measured_runs
             if item.get("stall_max_gap_ms") is not None
         ]
         output_chars = [
@@ -34,12 +60,23 @@ def summarize(records: List[Dict[str, object]]) -> List[Dict[str, object]]:
         reasoning_chars = [
             float(item["reasoning_chars"]) for item in success_runs if item.get("reasoning_chars") is not None
         ]
+        decode_chars = _success_values(measured_runs, "decode_chars_per_s")
+        decode_tokens = _success_values(measured_runs, "decode_tokens_per_s")
+        gap_p50 = _success_values(measured_runs, "gap_ms_p50")
+        gap_p90 = _success_values(measured_runs, "gap_ms_p90")
+        jitter = _success_values(measured_runs, "jitter_ms")
+        retried = [item for item in items if int(item.get("attempts") or 1) > 1]
+        backoff_ms = sum(float(item.get("backoff_ms") or 0.0) for item in items)
+        cache_hits = sum(1 for item in items if item.get("cache") == "hit")
+        short_circuited = sum(1 for item in items if item.get("short_circuited"))
+        rate_limit_waits = [float(item.get("rate_limit_wait_ms") or 0.0) for item in items]
         usage_tokens = []
         for item in success_runs:
             total_tokens = usage_total(item.get("usage"))
             if total_tokens is not None:
                 usage_tokens.append(float(total_tokens))
 
+        phases = {f"{field}_p50": percentile(_success_values(measured_runs, field), 0.5) for field in PHASE_FIELDS}
         summaries.append(
             {
                 "provider": provider,
@@ -47,6 +84,13 @@ def summarize(records: List[Dict[str, object]]) -> List[Dict[str, object]]:
                 "runs_total": total_runs,
                 "runs_success": success_count,
                 "success_rate": success_count / total_runs if total_runs else 0.0,
+                "runs_retried": len(retried),
+                "backoff_ms_total": round(backoff_ms, 3),
+                "cache_hits": cache_hits,
+                "runs_measured": len(measured_runs),
+                "runs_short_circuited": short_circuited,
+                "rate_limit_wait_ms_total": round(sum(rate_limit_waits), 3),
+                "rate_limit_wait_ms_p90": percentile(rate_limit_waits, 0.9),
                 "ttfb_ms_p50": percentile(ttfb_ms, 0.5),
                 "ttfb_ms_p90": percentile(ttfb_ms, 0.9),
                 "ttc_ms_p50": percentile(ttc_ms, 0.5),
@@ -57,9 +101,16 @@ def summarize(records: List[Dict[str, object]]) -> List[Dict[str, object]]:
                 "content_chars_p50": percentile(content_chars, 0.5),
                 "reasoning_chars_p50": percentile(reasoning_chars, 0.5),
                 "usage_tokens_p50": percentile(usage_tokens, 0.5),
+                "decode_chars_per_s_p50": percentile(decode_chars, 0.5),
+                "decode_tokens_per_s_p50": percentile(decode_tokens, 0.5),
+                "gap_ms_p50_p50": percentile(gap_p50, 0.5),
+                "gap_ms_p90_p50": percentile(gap_p90, 0.5),
+                "jitter_ms_p50": percentile(jitter, 0.5),
                 "usage_tokens_coverage": f"{len(usage_tokens)}/{success_count}"
                 if success_count
                 else "0/0",
+                "new_connections": sum(1 for item in success_runs if item.get("dns_ms") is not None),
+                **phases,
             }
         )
     return summaries
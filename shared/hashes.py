@@ -9,3 +9,24 @@ def canonical_json(value: object) -> str:
 def sha256_json(value: object) -> str:
     data = canonical_json(value).encode("utf-8")
     return hashlib.sha256(data).hexdigest()
+
+
+class CanonicalListHasher:
+    """Running sha256 that matches sha256_json() of the list of items fed to it."""
+
+    def __init__(self) -> None:
+        self._digest = hashlib.sha256(b"[")
+        self.count = 0
+
+    def update(self, value: object) -> str:
+        encoded = canonical_json(value)
+        if self.count:
+            self._digest.update(b",")
+        self._digest.update(encoded.encode("utf-8"))
+        self.count += 1
+        return encoded
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(b"]")
+        return digest.hexdigest()
@@ -0,0 +1,9 @@
+import re
+
+_LINE_END_RE = re.compile(r"\r\n|\r|\n")
+
+
+def sse_event(data: str) -> bytes:
+    """Frames ``data`` as one SSE event, with a ``data:`` line per line of the payload."""
+    lines = "".join(f"data: {line}\n" for line in _LINE_END_RE.split(data))
+    return f"{lines}\n".encode("utf-8")
@@ -0,0 +1,16 @@
+from typing import List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], quantile: float) -> Optional[float]:
+    if not values:
+        return None
+    if quantile <= 0:
+        return min(values)
+    if quantile >= 1:
+        return max(values)
+    sorted_values: List[float] = sorted(values)
+    rank = (len(sorted_values) - 1) * quantile
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = rank - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
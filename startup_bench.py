@@ -0,0 +1,72 @@
+import argparse
+from dataclasses import replace
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import sys
+from typing import Dict, List
+
+from perf_tools.startup import DEFAULT_CASES, build_meta, measure_baseline, render_markdown, run_case
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure CLI cold-start time and imports; fail when a CLI is over budget."
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="Fresh processes per CLI (median reported).")
+    parser.add_argument(
+        "--budget-scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget, e.g. 2 on slow CI machines.",
+    )
+    parser.add_argument("--only", default="", help="Comma list of CLI names to run (e.g. main).")
+    parser.add_argument(
+        "--output",
+        default="",
+        help="JSONL output path (default: data/startup_<timestamp>.jsonl).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["markdown", "json"],
+        default="markdown",
+        help="Stdout format.",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1 or args.budget_scale <= 0:
+        print("Error: --repeat and --budget-scale must be positive.", file=sys.stderr)
+        return 1
+
+    wanted = {name.strip() for name in args.only.split(",") if name.strip()}
+    cases = [case for case in DEFAULT_CASES if not wanted or case.name.split()[0] in wanted]
+    if not cases:
+        print(f"Error: no CLI matches --only '{args.only}'.", file=sys.stderr)
+        return 1
+
+    output = Path(args.output) if args.output else None
+    if output is None:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        output = Path("data") / f"startup_{timestamp}.jsonl"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    baseline = measure_baseline(args.repeat)
+    results: List[Dict[str, object]] = []
+    with output.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(build_meta(args.repeat, baseline)) + "\n")
+        for index, case in enumerate(cases, start=1):
+            print(f"[{index}/{len(cases)}] {case.name}", file=sys.stderr)
+            case = replace(case, budget_ms=case.budget_ms * args.budget_scale)
+            record = run_case(case, args.repeat, float(baseline["p50"] or 0.0))
+            handle.write(json.dumps(record) + "\n")
+            results.append(record)
+
+    if args.format == "json":
+        print(json.dumps({"baseline_ms": baseline, "cases": results}, indent=2))
+    else:
+        print(render_markdown(results, baseline))
+    print(f"\nResults saved to: {output}", file=sys.stderr)
+    return 0 if all(record["ok"] for record in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+from dataclasses import replace
+
+from ambient_client.circuit import (
+    OUTCOME_FAILURE,
+    OUTCOME_NEUTRAL,
+    OUTCOME_SUCCESS,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    Circuit,
+    CircuitBreakers,
+    CircuitSettings,
+    classify_outcome,
+)
+from ambient_client.deadlines import CANCEL_HEDGE_LOST
+
+SETTINGS = CircuitSettings(
+    enabled=True,
+    consecutive_failures=3,
+    error_rate=0.5,
+    window=4,
+    open_seconds=10.0,
+    probes=2,
+)
+
+
+def _breakers(clock):
+    breakers = CircuitBreakers(SETTINGS)
+    breakers._now = lambda: clock[0]
+    return breakers
+
+
+def _run(breakers, error=None, status_code=None, cancel_reason=None):
+    ticket, _ = breakers.admit("p", "m")
+    if not ticket.rejected:
+        breakers.record(ticket, error, status_code, cancel_reason)
+    return ticket
+
+
+def test_classify_outcome():
+    assert classify_outcome(None, 200, None) == OUTCOME_SUCCESS
+    assert classify_outcome("boom", 503, None) == OUTCOME_FAILURE
+    assert classify_outcome("boom", None, None) == OUTCOME_FAILURE
+    assert classify_outcome("bad request", 400, None) == OUTCOME_NEUTRAL
+    assert classify_outcome("throttled", 429, None) == OUTCOME_FAILURE
+    assert classify_outcome("Cancelled", None, CANCEL_HEDGE_LOST) == OUTCOME_NEUTRAL
+
+
+def test_consecutive_failures_open_the_circuit():
+    circuit = Circuit("p", "m", SETTINGS)
+    for now in range(2):
+        assert circuit.record(STATE_CLOSED, OUTCOME_FAILURE, now) is None
+    assert "3 consecutive failures" in circuit.record(STATE_CLOSED, OUTCOME_FAILURE, 2.0)
+    assert circuit.state == STATE_OPEN
+
+
+def test_success_resets_the_consecutive_count():
+    circuit = Circuit("p", "m", replace(SETTINGS, window=20))
+    for outcome in (OUTCOME_FAILURE, OUTCOME_FAILURE, OUTCOME_SUCCESS, OUTCOME_FAILURE, OUTCOME_FAILURE):
+        circuit.record(STATE_CLOSED, outcome, 0.0)
+    assert circuit.state == STATE_CLOSED
+    assert circuit.consecutive == 2
+
+
+def test_error_rate_over_a_full_window_opens_the_circuit():
+    circuit = Circuit("p", "m", SETTINGS)
+    for outcome in (OUTCOME_FAILURE, OUTCOME_SUCCESS, OUTCOME_FAILURE):
+        assert circuit.record(STATE_CLOSED, outcome, 0.0) is None
+    assert "error rate 50%" in circuit.record(STATE_CLOSED, OUTCOME_SUCCESS, 0.0)
+    assert circuit.state == STATE_OPEN
+
+
+def test_neutral_outcomes_are_not_counted():
+    circuit = Circuit("p", "m", SETTINGS)
+    for _ in range(10):
+        circuit.record(STATE_CLOSED, OUTCOME_NEUTRAL, 0.0)
+    assert circuit.state == STATE_CLOSED
+    assert not circuit.outcomes
+
+
+def test_open_rejects_until_cooldown_then_probes_one_at_a_time():
+    clock = [0.0]
+    breakers = _breakers(clock)
+    for _ in range(3):
+        _run(breakers, error="boom", status_code=503)
+    assert _run(breakers).rejected
+    clock[0] = 10.0
+    probe, note = breakers.admit("p", "m")
+    assert probe.admitted == STATE_HALF_OPEN
+    assert "half-open" in note
+    second, _ = breakers.admit("p", "m")
+    assert second.rejected
+    assert probe.circuit.short_circuits == 2
+
+
+def test_probe_successes_close_the_circuit():
+    clock = [0.0]
+    breakers = _breakers(clock)
+    for _ in range(3):
+        _run(breakers, error="boom", status_code=503)
+    clock[0] = 10.0
+    assert _run(breakers).admitted == STATE_HALF_OPEN
+    ticket = _run(breakers)
+    assert ticket.admitted == STATE_HALF_OPEN
+    assert ticket.circuit.state == STATE_CLOSED
+    assert [move["to"] for move in ticket.circuit.transitions] == [STATE_OPEN, STATE_HALF_OPEN, STATE_CLOSED]
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = [0.0]
+    breakers = _breakers(clock)
+    for _ in range(3):
+        _run(breakers, error="boom", status_code=503)
+    clock[0] = 10.0
+    ticket = _run(breakers, error="boom", status_code=502)
+    assert ticket.circuit.state == STATE_OPEN
+    clock[0] = 15.0
+    assert _run(breakers).rejected
+
+
+def test_released_probe_frees_the_slot():
+    clock = [0.0]
+    breakers = _breakers(clock)
+    for _ in range(3):
+        _run(breakers, error="boom", status_code=503)
+    clock[0] = 10.0
+    probe, _ = breakers.admit("p", "m")
+    breakers.release(probe)
+    assert probe.circuit.state == STATE_HALF_OPEN
+    assert breakers.admit("p", "m")[0].admitted == STATE_HALF_OPEN
+
+
+def test_circuits_are_per_provider_and_model():
+    breakers = _breakers([0.0])
+    for _ in range(3):
+        _run(breakers, error="boom", status_code=503)
+    other, _ = breakers.admit("p", "other")
+    assert other.admitted == STATE_CLOSED
+
+
+def test_disabled_breakers_admit_everything():
+    breakers = CircuitBreakers(CircuitSettings())
+    assert breakers.admit("p", "m") == (None, None)
+    assert breakers.record(None, "boom", 503, None) is None
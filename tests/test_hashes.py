@@ -0,0 +1,36 @@
+from shared.hashes import CanonicalListHasher, canonical_json, sha256_json
+
+ITEMS = [
+    {"data": "hello", "t": 0.125},
+    {"b": [1, 2, {"z": None, "a": True}], "a": "ünïcode ✓"},
+    "[DONE]",
+    3.5,
+]
+
+
+def _hash_items(items):
+    hasher = CanonicalListHasher()
+    for item in items:
+        hasher.update(item)
+    return hasher.hexdigest()
+
+
+def test_matches_sha256_json_of_the_list():
+    assert _hash_items(ITEMS) == sha256_json(ITEMS)
+
+
+def test_empty_list():
+    assert _hash_items([]) == sha256_json([])
+
+
+def test_hexdigest_can_be_read_mid_stream():
+    hasher = CanonicalListHasher()
+    for count, item in enumerate(ITEMS, start=1):
+        hasher.update(item)
+        assert hasher.hexdigest() == sha256_json(ITEMS[:count])
+    assert hasher.count == len(ITEMS)
+
+
+def test_update_returns_the_canonical_encoding():
+    hasher = CanonicalListHasher()
+    assert hasher.update({"b": 1, "a": 2}) == canonical_json({"a": 2, "b": 1}) == '{"a":2,"b":1}'
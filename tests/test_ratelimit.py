@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from ambient_client.ratelimit import (
+    KIND_REQUESTS,
+    KIND_TOKENS,
+    RateLimiter,
+    RateLimitSettings,
+    TokenBucket,
+)
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    # Buckets stamp their creation time; pin it so explicit ``now`` values line up.
+    monkeypatch.setattr(time, "monotonic", lambda: 0.0)
+
+
+def test_bucket_admits_burst_then_waits_for_refill():
+    bucket = TokenBucket("p", KIND_REQUESTS, 60, burst_fraction=0.1)
+    assert bucket.capacity == 6
+    assert bucket.rate == pytest.approx(0.9)
+    for _ in range(6):
+        assert bucket.reserve(1, now=0.0) == 0.0
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1 / 0.9)
+    # Queued callers wait behind the debt already taken.
+    assert bucket.reserve(1, now=0.0) == pytest.approx(2 / 0.9)
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket("p", KIND_TOKENS, 600, burst_fraction=0.1)
+    assert bucket.reserve(60, now=0.0) == 0.0
+    assert bucket.reserve(60, now=1000.0) == 0.0
+    assert bucket.level == 0.0
+
+
+def test_credit_and_drain():
+    bucket = TokenBucket("p", KIND_TOKENS, 600, burst_fraction=0.1)
+    bucket.reserve(60, now=0.0)
+    bucket.credit(40, now=0.0)
+    assert bucket.level == 40
+    bucket.credit(1000, now=0.0)
+    assert bucket.level == bucket.capacity
+    bucket.drain(now=0.0)
+    assert bucket.level == 0.0
+
+
+def test_small_limits_still_admit_one_request():
+    bucket = TokenBucket("p", KIND_REQUESTS, 2, burst_fraction=0.1)
+    assert bucket.capacity == 1.0
+    assert bucket.reserve(1, now=0.0) == 0.0
+
+
+def test_buckets_for_reads_provider_and_model_env(monkeypatch):
+    monkeypatch.setenv("AMBIENT_RPM", "30")
+    monkeypatch.setenv("AMBIENT_MODEL_ZAI_ORG_GLM_4_6_TPM", "1000")
+    monkeypatch.delenv("AMBIENT_TPM", raising=False)
+    monkeypatch.delenv("AMBIENT_MODEL_ZAI_ORG_GLM_4_6_RPM", raising=False)
+    limiter = RateLimiter(RateLimitSettings())
+    buckets = limiter.buckets_for("Ambient", "zai-org/GLM-4.6")
+    assert [(bucket.scope, bucket.kind, bucket.limit_per_minute) for bucket in buckets] == [
+        ("Ambient", KIND_REQUESTS, 30.0),
+        ("Ambient/zai-org/GLM-4.6", KIND_TOKENS, 1000.0),
+    ]
+    assert limiter.buckets_for("Ambient", "zai-org/GLM-4.6") is buckets
+
+
+def test_provider_bucket_is_shared_across_models(monkeypatch):
+    monkeypatch.setenv("AMBIENT_RPM", "30")
+    limiter = RateLimiter(RateLimitSettings())
+    (first,) = limiter.buckets_for("Ambient", "model-a")
+    (second,) = limiter.buckets_for("Ambient", "model-b")
+    assert first is second
+
+
+def test_provider_names_are_sanitized_for_env(monkeypatch):
+    monkeypatch.setenv("API_EXAMPLE_COM_RPM", "10")
+    limiter = RateLimiter(RateLimitSettings())
+    (bucket,) = limiter.buckets_for("api.example.com", "m")
+    assert bucket.limit_per_minute == 10.0
+
+
+def test_no_provider_or_no_limits_means_no_buckets(monkeypatch):
+    monkeypatch.delenv("NOLIMIT_RPM", raising=False)
+    monkeypatch.delenv("NOLIMIT_TPM", raising=False)
+    limiter = RateLimiter(RateLimitSettings())
+    assert limiter.buckets_for("", "m") == []
+    assert limiter.buckets_for("nolimit", "m") == []
+    assert limiter.reserve("nolimit", "m", "prompt", None) is None
+
+
+def test_reserve_refunds_unused_tokens(monkeypatch):
+    monkeypatch.setenv("TOKENS_TPM", "10000")
+    monkeypatch.delenv("TOKENS_RPM", raising=False)
+    limiter = RateLimiter(RateLimitSettings(burst_fraction=0.1, completion_tokens=100))
+    reservation = limiter.reserve("tokens", "m", "x" * 40, {"max_tokens": 200})
+    assert reservation.estimated_tokens == 210
+    assert reservation.wait_seconds == 0.0
+    (bucket,) = limiter.buckets_for("tokens", "m")
+    assert bucket.level == 1000 - 210
+    reservation.settle({"total_tokens": 60}, 200, got_tokens=True)
+    assert bucket.level == 1000 - 60
+
+
+def test_throttled_response_drains_the_burst(monkeypatch):
+    monkeypatch.setenv("THROTTLED_RPM", "60")
+    monkeypatch.delenv("THROTTLED_TPM", raising=False)
+    limiter = RateLimiter(RateLimitSettings())
+    limiter.reserve("throttled", "m", "prompt", None).settle(None, 429, got_tokens=False)
+    assert limiter.reserve("throttled", "m", "prompt", None).wait_seconds == pytest.approx(1 / 0.9)
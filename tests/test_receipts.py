@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from ambient_client import receipts
+from ambient_client.receipts import _receipt_path
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2026, 1, 29, 12, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def frozen_now(monkeypatch):
+    monkeypatch.setattr(receipts, "datetime", _FrozenDatetime)
+
+
+def test_name_uses_timestamp_and_slugs(tmp_path, frozen_now):
+    path = _receipt_path(tmp_path, "Open Router", "openai/gpt-5.2")
+    assert path.name == "receipt_20260129_120000_Open_Router_openai_gpt_5_2.json"
+    assert path.exists()
+
+
+def test_empty_slugs_fall_back(tmp_path, frozen_now):
+    assert _receipt_path(tmp_path, "", "//").name == "receipt_20260129_120000_stream_model.json"
+
+
+def test_same_second_names_get_suffixes(tmp_path, frozen_now):
+    names = [_receipt_path(tmp_path, "Ambient", "m").name for _ in range(3)]
+    assert names == [
+        "receipt_20260129_120000_Ambient_m.json",
+        "receipt_20260129_120000_Ambient_m_2.json",
+        "receipt_20260129_120000_Ambient_m_3.json",
+    ]
+
+
+def test_concurrent_reservations_are_unique(tmp_path, frozen_now):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        paths = list(pool.map(lambda _: _receipt_path(tmp_path, "Ambient", "m"), range(64)))
+    assert len(set(paths)) == 64
+    assert sorted(tmp_path.iterdir()) == sorted(paths)
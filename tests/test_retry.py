@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from ambient_client import retry
+from ambient_client.retry import (
+    PHASE_BEFORE_FIRST_TOKEN,
+    PHASE_MID_STREAM,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+POLICY = RetryPolicy(max_attempts=4, base_delay_seconds=0.5, max_delay_seconds=3.0)
+
+
+@pytest.fixture
+def ceiling(monkeypatch):
+    # Full jitter draws from [0, ceiling]; returning the ceiling makes delays exact.
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(when, usegmt=True)) == pytest.approx(30, abs=2)
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_parse_retry_after_missing_or_invalid():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+
+
+def test_backoff_doubles_up_to_the_cap(ceiling):
+    delays = [POLICY.next_delay(attempt, 503, PHASE_BEFORE_FIRST_TOKEN) for attempt in (1, 2, 3)]
+    assert delays == [0.5, 1.0, 2.0]
+    capped = RetryPolicy(max_attempts=10, base_delay_seconds=0.5, max_delay_seconds=3.0)
+    assert capped.next_delay(6, 503, PHASE_BEFORE_FIRST_TOKEN) == 3.0
+
+
+def test_jitter_stays_within_the_ceiling():
+    for _ in range(200):
+        assert 0.0 <= POLICY.next_delay(3, 503, PHASE_BEFORE_FIRST_TOKEN) <= 2.0
+
+
+def test_gives_up_after_max_attempts():
+    assert POLICY.next_delay(4, 503, PHASE_BEFORE_FIRST_TOKEN) is None
+    assert RetryPolicy().next_delay(1, 503, PHASE_BEFORE_FIRST_TOKEN) is None
+
+
+def test_only_retryable_statuses_and_transport_errors_retry(ceiling):
+    assert POLICY.next_delay(1, 429, PHASE_BEFORE_FIRST_TOKEN) == 0.5
+    assert POLICY.next_delay(1, None, PHASE_BEFORE_FIRST_TOKEN) == 0.5
+    assert POLICY.next_delay(1, 400, PHASE_BEFORE_FIRST_TOKEN) is None
+    assert POLICY.next_delay(1, 401, PHASE_BEFORE_FIRST_TOKEN) is None
+
+
+def test_mid_stream_failures_retry_only_when_enabled(ceiling):
+    assert POLICY.next_delay(1, None, PHASE_MID_STREAM) is None
+    mid_stream = RetryPolicy(max_attempts=2, retry_mid_stream=True)
+    assert mid_stream.next_delay(1, None, PHASE_MID_STREAM) == 0.5
+
+
+def test_retry_after_overrides_backoff_and_is_capped():
+    assert POLICY.next_delay(1, 429, PHASE_BEFORE_FIRST_TOKEN, retry_after="2") == 2.0
+    assert POLICY.next_delay(1, 429, PHASE_BEFORE_FIRST_TOKEN, retry_after="120") == 3.0
+    assert POLICY.next_delay(4, 429, PHASE_BEFORE_FIRST_TOKEN, retry_after="2") is None
@@ -0,0 +1,59 @@
+from ambient_client.sse import SSEParser
+
+STREAM = b'data: {"a": 1}\r\n\r\nevent: ping\r\nid: 7\r\ndata: one\r\ndata: two\r\n\r\n: comment\r\ndata: [DONE]\r\n\r\n'
+
+
+def _feed_all(chunks):
+    parser = SSEParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk, received_at=0.0))
+    events.extend(parser.flush(received_at=0.0))
+    return events
+
+
+def _summary(events):
+    return [(event.event, event.id, event.data) for event in events]
+
+
+def test_whole_stream():
+    assert _summary(_feed_all([STREAM])) == [
+        ("message", None, '{"a": 1}'),
+        ("ping", "7", "one\ntwo"),
+        ("message", "7", "[DONE]"),
+    ]
+
+
+def test_every_split_point_gives_the_same_events():
+    expected = _summary(_feed_all([STREAM]))
+    for split in range(1, len(STREAM)):
+        assert _summary(_feed_all([STREAM[:split], STREAM[split:]])) == expected, split
+
+
+def test_one_byte_chunks():
+    chunks = [STREAM[index:index + 1] for index in range(len(STREAM))]
+    assert _summary(_feed_all(chunks)) == _summary(_feed_all([STREAM]))
+
+
+def test_cr_then_lf_in_next_chunk_is_one_line_end():
+    events = _feed_all([b"data: a\r", b"\ndata: b\r", b"\n\r", b"\n"])
+    assert [event.data for event in events] == ["a\nb"]
+
+
+def test_bare_cr_and_lf_line_endings():
+    assert [event.data for event in _feed_all([b"data: a\r\rdata: b\n\n"])] == ["a", "b"]
+
+
+def test_multibyte_text_split_across_chunks():
+    body = "data: héllo ✓\n\n".encode("utf-8")
+    split = body.index("✓".encode("utf-8")) + 1
+    assert [event.data for event in _feed_all([body[:split], body[split:]])] == ["héllo ✓"]
+
+
+def test_flush_dispatches_unterminated_event():
+    assert [event.data for event in _feed_all([b"data: tail"])] == ["tail"]
+
+
+def test_retry_field():
+    (event,) = _feed_all([b"retry: 1500\ndata: x\n\n"])
+    assert event.retry == 1500